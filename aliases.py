@@ -0,0 +1,107 @@
+import bisect
+import unicodedata
+
+# Characters folded up front: Latin, Greek, Cyrillic, Armenian and general
+# punctuation. Anything else that appears in a name is added when an index
+# is built, so every character of every alias has an entry.
+FOLD_RANGES = [(0x0000, 0x0590), (0x1E00, 0x1F00), (0x2000, 0x2070)]
+
+# Apostrophes vanish ("Côte d'Ivoire" -> "cote divoire"); other punctuation
+# separates words, so "Guinea-Bissau" and "guinea bissau" fold the same.
+APOSTROPHES = "'‘’`ʻʼ"
+
+# Letters with no Unicode decomposition that players type without the mark.
+LETTERS = {'ø': 'o', 'đ': 'd', 'ł': 'l', 'ı': 'i', 'æ': 'ae', 'œ': 'oe', 'þ': 'th', 'ð': 'd', 'ß': 'ss'}
+
+SEPARATOR = '\0'
+
+_base_table = None
+
+
+def fold_char(ch) -> str:
+    # The slow path, run once per character when a table is built.
+    if ch in APOSTROPHES:
+        return ''
+    category = unicodedata.category(ch)
+    if category[0] == 'C':
+        return ''
+    if category[0] in 'PSZ':
+        return ' '
+    out = ''.join(c for c in unicodedata.normalize('NFKD', ch) if not unicodedata.combining(c))
+    out = out.casefold()
+    return ''.join(LETTERS.get(c, c) for c in out)
+
+
+def base_table():
+    global _base_table
+    if _base_table is None:
+        table = {}
+        for lo, hi in FOLD_RANGES:
+            for code in range(lo, hi):
+                table[code] = fold_char(chr(code))
+        _base_table = table
+    return _base_table
+
+
+class AliasIndex:
+    # Every row's canonical name and aliases, folded once and joined into a
+    # single NUL-separated string. Folding a query is one str.translate call
+    # against the precomputed table; a search is a run of str.find calls
+    # over the joined string, and a bisect maps each hit back to its row.
+    def __init__(self, rows):
+        self.table = dict(base_table())
+        self.names = [c.name for c in rows]
+        order = sorted(range(len(rows)), key=lambda i: self.names[i])
+        self._rank = [0] * len(rows)
+        for rank, i in enumerate(order):
+            self._rank[i] = rank
+        entries = [(c.name, i) for i, c in enumerate(rows)]
+        entries += [(alias, i) for i, c in enumerate(rows) for alias in c.aliases]
+        for text, _ in entries:
+            for ch in text:
+                if ord(ch) not in self.table:
+                    self.table[ord(ch)] = fold_char(ch)
+        # Canonical names are added first, so they win exact matches over an
+        # alias that folds to the same key.
+        self.exact = {}
+        starts, owners, keys = [], [], []
+        pos = 1
+        for text, i in entries:
+            key = self.fold(text)
+            if not key:
+                continue
+            self.exact.setdefault(key, i)
+            starts.append(pos)
+            owners.append(i)
+            keys.append(key)
+            pos += len(key) + 1
+        self._starts = starts
+        self._owners = owners
+        self._blob = SEPARATOR + SEPARATOR.join(keys) + SEPARATOR
+
+    def fold(self, text) -> str:
+        return ' '.join(text.translate(self.table).casefold().split())
+
+    def resolve(self, text):
+        # Row whose name or alias folds to exactly this text, or None.
+        return self.exact.get(self.fold(text))
+
+    def search(self, query, limit=10):
+        # Rows with a name or alias containing the query: an exact match
+        # first, the rest in canonical name order.
+        q = self.fold(query)
+        if not q:
+            return []
+        blob, starts, owners = self._blob, self._starts, self._owners
+        hits = set()
+        pos = blob.find(q)
+        while pos >= 0:
+            k = bisect.bisect_right(starts, pos) - 1
+            hits.add(owners[k])
+            if k + 1 >= len(starts):
+                break
+            pos = blob.find(q, starts[k + 1])
+        first = self.exact.get(q)
+        rest = sorted((i for i in hits if i != first), key=self._rank.__getitem__)
+        result = ([first] if first is not None else []) + rest
+        return result[:limit]
@@ -0,0 +1,121 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+from gameplay import CountryDatabase
+
+DEFAULT_TRIALS = 200
+MAX_GUESSES = 6
+
+# Each worker holds one CountryDatabase. With the fork start method the
+# parent's instance (rows and bitset indexes) is inherited copy-on-write and
+# never touched again, so all workers read the same pages; on spawn-only
+# platforms the initializer loads it once per worker.
+_DB = None
+
+
+def _init_worker(path):
+    global _DB
+    if _DB is None or _DB.path != path:
+        _DB = CountryDatabase(path)
+
+
+def play_target(db, row, trials, max_guesses, seed):
+    # Player model: every turn guess a uniformly random country that is
+    # still consistent with all hints so far, until the target is hit.
+    target = db.rows[row]
+    rng = random.Random(seed * 1000003 + row)
+    constraint = {}
+    first = db.rows
+    counts = []
+    for _ in range(trials):
+        mask = db.all_mask
+        pool = first
+        n = 0
+        while True:
+            n += 1
+            guess = rng.choice(pool)
+            if guess is target:
+                break
+            g = db.row_of[guess.name]
+            if g not in constraint:
+                constraint[g] = db.guess_constraint(guess, target)
+            mask &= constraint[g]
+            pool = db.rows_in(mask)
+        counts.append(n)
+    fails = sum(1 for n in counts if n > max_guesses)
+    return {
+        'expected_guesses': round(sum(counts) / float(len(counts)), 3),
+        'worst_case': max(counts),
+        'failure_rate': round(fails / float(len(counts)), 4),
+    }
+
+
+def _score(task):
+    row, trials, max_guesses, seed = task
+    return _DB.rows[row].name, play_target(_DB, row, trials, max_guesses, seed)
+
+
+def analyze(path=None, trials=DEFAULT_TRIALS, max_guesses=MAX_GUESSES, workers=None, seed=0):
+    global _DB
+    _DB = CountryDatabase(path)
+    tasks = [(row, trials, max_guesses, seed) for row in range(len(_DB.rows))]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        results = dict(map(_score, tasks))
+    else:
+        methods = multiprocessing.get_all_start_methods()
+        ctx = multiprocessing.get_context('fork' if 'fork' in methods else None)
+        chunk = max(1, len(tasks) // (workers * 8))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx,
+                                 initializer=_init_worker, initargs=(_DB.path,)) as pool:
+            results = dict(pool.map(_score, tasks, chunksize=chunk))
+    return {
+        'dataset': os.path.basename(_DB.path),
+        'dataset_hash': _DB.dataset_hash,
+        'max_guesses': max_guesses,
+        'trials': trials,
+        'seed': seed,
+        'countries': {name: results[name] for name in _DB.countries},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score every country as a daily target")
+    parser.add_argument('--dataset', default=None, help="dataset JSON (default: src/country.json)")
+    parser.add_argument('--out', default=None, help="difficulty table (default: <dataset>.difficulty.json next to the dataset)")
+    parser.add_argument('--trials', type=int, default=DEFAULT_TRIALS, help="simulated games per target")
+    parser.add_argument('--max-guesses', type=int, default=MAX_GUESSES)
+    parser.add_argument('--workers', type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    table = analyze(args.dataset, args.trials, args.max_guesses, args.workers, args.seed)
+    elapsed = time.perf_counter() - start
+
+    out = args.out or _DB.difficulty_path()
+    tmp = out + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(table, f, indent=2)
+    os.replace(tmp, out)
+
+    scores = sorted(table['countries'].items(), key=lambda kv: kv[1]['expected_guesses'])
+    print(f"Scored {len(scores)} targets x {args.trials} games in {elapsed:.1f}s -> {out}")
+    for label, items in (("Easiest", scores[:5]), ("Hardest", scores[-5:][::-1])):
+        print(f"{label}:")
+        for name, s in items:
+            print(f"  {name:<32} {s['expected_guesses']:>6.2f} avg  {s['worst_case']:>3} worst  "
+                  f"{s['failure_rate'] * 100:>5.1f}% fail")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+import os
+import weakref
+
+import pygame
+
+# UI draws through a small subset of the Surface API: blit, fill, copy and
+# the size getters. A backend supplies something with that subset as its
+# canvas and knows how to put a finished frame on screen.
+
+
+class SurfaceBackend:
+    # The original path: software blits onto the display surface, then
+    # display.flip. The canvas is the display surface itself.
+    name = 'surface'
+
+    def __init__(self, screen):
+        self.canvas = screen
+
+    def resize(self, size):
+        self.canvas = pygame.display.set_mode(size, pygame.RESIZABLE)
+        return self.canvas
+
+    def present(self):
+        pygame.display.flip()
+
+    def close(self):
+        pass
+
+
+class TextureCanvas:
+    # Stands in for the display surface on an SDL2 renderer. Each surface UI
+    # blits is uploaded as a texture the first time it is seen and kept for
+    # as long as the surface lives, so the shape atlas, cached guess rows,
+    # layout strips and cached text become texture copies after the first
+    # frame. Surfaces must not be drawn on after they have been blitted;
+    # everything UI caches is finished before its first use.
+    def __init__(self, renderer, window):
+        from pygame._sdl2 import video
+        self._from_surface = video.Texture.from_surface
+        self.renderer = renderer
+        self.window = window
+        self._textures = weakref.WeakKeyDictionary()
+        self.uploads = 0
+        self.copies = 0
+
+    def get_size(self):
+        return self.window.size
+
+    def get_width(self):
+        return self.window.size[0]
+
+    def get_height(self):
+        return self.window.size[1]
+
+    def get_rect(self, **kwargs):
+        rect = pygame.Rect((0, 0), self.window.size)
+        for name, value in kwargs.items():
+            setattr(rect, name, value)
+        return rect
+
+    def texture(self, surf):
+        tex = self._textures.get(surf)
+        if tex is None:
+            tex = self._from_surface(self.renderer, surf)
+            self._textures[surf] = tex
+            self.uploads += 1
+        return tex
+
+    def blit(self, surf, dest, area=None, special_flags=0):
+        w, h = surf.get_size()
+        x, y = (dest.x, dest.y) if isinstance(dest, pygame.Rect) else (int(dest[0]), int(dest[1]))
+        if area is not None:
+            area = pygame.Rect(area).clip(pygame.Rect(0, 0, w, h))
+            w, h = area.size
+        if w <= 0 or h <= 0:
+            return pygame.Rect(x, y, 0, 0)
+        self.texture(surf).draw(srcrect=area, dstrect=(x, y, w, h))
+        self.copies += 1
+        return pygame.Rect(x, y, w, h)
+
+    def fill(self, color, rect=None, special_flags=0):
+        color = pygame.Color(color)
+        self.renderer.draw_color = color
+        if rect is None:
+            self.renderer.clear()
+            return pygame.Rect((0, 0), self.window.size)
+        rect = pygame.Rect(rect)
+        self.renderer.fill_rect(rect)
+        return rect
+
+    def copy(self):
+        # Reads the frame drawn so far back into a surface. Slow, so UI only
+        # does it for layers it then caches (the end-of-game dialog).
+        return self.renderer.to_surface()
+
+
+class TextureBackend:
+    # Draws with pygame's SDL2 Renderer and Texture API. A hardware renderer
+    # is used when one is available; otherwise SDL's software renderer, so
+    # headless hosts and machines without a GPU still run it.
+    name = 'texture'
+
+    def __init__(self, size, title="Geodle", vsync=False):
+        from pygame._sdl2 import video
+        os.environ.setdefault('SDL_WINDOWS_DPI_AWARENESS', 'permonitorv2')
+        self.window = video.Window(title, size, resizable=True)
+        try:
+            self.renderer = video.Renderer(self.window, accelerated=1, vsync=vsync)
+            self.accelerated = True
+        except (pygame.error, RuntimeError):
+            # No accelerated driver for this window (SDL raises its own
+            # RuntimeError subclass here).
+            self.renderer = video.Renderer(self.window, accelerated=0)
+            self.accelerated = False
+        self.canvas = TextureCanvas(self.renderer, self.window)
+
+    def resize(self, size):
+        self.window.size = size
+        return self.canvas
+
+    def present(self):
+        self.renderer.present()
+
+    def close(self):
+        self.canvas = None
+        self.renderer = None
+        self.window.destroy()
+
+
+def create(name, size=None, title="Geodle"):
+    # The named backend with a window of `size`; 'surface' opens the usual
+    # pygame display window.
+    if name == 'texture':
+        return TextureBackend(size, title)
+    if name == 'surface':
+        screen = pygame.display.set_mode(size, pygame.RESIZABLE)
+        pygame.display.set_caption(title)
+        return SurfaceBackend(screen)
+    raise ValueError(f"unknown renderer {name!r}")
@@ -0,0 +1,329 @@
+import argparse
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+from gameplay import CountryDatabase, GeodleGame, hint_statuses
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_HISTORY = os.path.join(HERE, 'bench_history.json')
+SIZES = {'real': None, '1k': 1_000, '10k': 10_000, '100k': 100_000}
+DEFAULT_SIZES = ('real', '1k', '10k', '100k')
+DEFAULT_REPEAT = 9
+SAMPLE_S = 0.02        # each sample runs the case for at least this long
+MAX_CASE_S = 8.0       # ... but a case stops repeating after this long
+SLOWDOWN = 0.10        # changes smaller than this are within run-to-run noise
+ALPHA = 0.01
+
+SYLLABLES = ['ba', 'ka', 'la', 'ma', 'na', 'ra', 'ta', 'vo', 'ri', 'shi', 'en', 'ul', 'mon', 'gar',
+             'dor', 'les', 'tan', 'is', 'qua', 'zel', 'por', 'bur', 'ne', 'sia', 'dia', 'co', 'ge']
+
+
+def synthetic_dataset(n, seed=0):
+    # Rows shaped like src/country.json: categorical values drawn from the
+    # real dataset's, numeric ones from plausible ranges, pronounceable
+    # unique names and a couple of aliases each.
+    real = CountryDatabase().rows
+    rng = random.Random(seed)
+    names = set()
+    rows = []
+    while len(rows) < n:
+        name = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+        if rng.random() < 0.3:
+            name += ' ' + ''.join(rng.choice(SYLLABLES) for _ in range(2)).capitalize()
+        if name in names:
+            name += f' {len(rows)}'
+        names.add(name)
+        src = rng.choice(real)
+        rows.append({
+            'country': name,
+            'aliases': [name.upper()[:3], 'Républíque de ' + name],
+            'continent': src.continent,
+            'government': rng.choice(real).government,
+            'landlocked': '1' if rng.random() < 0.2 else '0',
+            'population': int(rng.lognormvariate(15, 2)),
+            'religion': rng.choice(real).religion,
+            'temperature': round(rng.uniform(-5, 30), 2),
+            'latitude': round(rng.uniform(-60, 75), 4),
+            'longitude': round(rng.uniform(-180, 180), 4),
+        })
+    return rows
+
+
+def write_dataset(rows, directory):
+    path = os.path.join(directory, 'country.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(rows, f, ensure_ascii=False)
+    return path
+
+
+def measure(fn, repeat):
+    # Per-call seconds for `repeat` samples; fast calls are looped until a
+    # sample lasts SAMPLE_S so timer resolution doesn't matter.
+    loops = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= SAMPLE_S:
+            break
+        loops *= 2 if elapsed <= 0 else max(2, min(10, int(SAMPLE_S / elapsed) + 1))
+    samples = [elapsed / loops]
+    deadline = time.perf_counter() + MAX_CASE_S
+    while len(samples) < repeat and time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - t0) / loops)
+    return samples
+
+
+def cases(db, path, size, seed=0):
+    # (name, callable) pairs for one dataset.
+    rng = random.Random(seed)
+    names = [c.name for c in db.rows]
+
+    def construct():
+        CountryDatabase(path)
+
+    def load_json():
+        bare = CountryDatabase.__new__(CountryDatabase)
+        bare.countries = {}
+        bare.load_from_country_json(path)
+
+    yield f'{size}/construct', construct
+    yield f'{size}/load_from_country_json', load_json
+
+    for length in (1, 2, 4, 8):
+        queries = []
+        for name in rng.sample(names, min(50, len(names))):
+            start = rng.randrange(max(1, len(name) - length + 1))
+            queries.append(name[start:start + length])
+        it = itertools.cycle(queries)
+
+        def search(it=it):
+            db.search_countries(next(it))
+        yield f'{size}/search_countries/len{length}', search
+
+    # A practice game (no guess limit) with 20 guesses on the board, so the
+    # duplicate scan has something to walk. Each call starts from that same
+    # state, candidates included, and guesses one more row; otherwise the
+    # mask soon empties and the case times a degenerate game.
+    game = GeodleGame(practice=True, database=db)
+    game.correct_country = db.rows[0]
+    pool = rng.sample(db.rows[1:], min(40, len(db.rows) - 1))
+    history, fresh = pool[:20], [c.name for c in pool[20:]]
+    game.guesses = list(history)
+    start_mask = game.candidates = db.candidate_mask(history, game.correct_country)
+    guesses_it = itertools.cycle(fresh)
+
+    def make_guess():
+        del game.guesses[len(history):]
+        game.candidates = start_mask
+        game.make_guess(next(guesses_it))
+    yield f'{size}/make_guess', make_guess
+
+    duplicate = history[-1].name
+
+    def make_guess_duplicate():
+        game.make_guess(duplicate)
+    yield f'{size}/make_guess/duplicate', make_guess_duplicate
+
+    pairs = [(rng.choice(db.rows), rng.choice(db.rows)) for _ in range(256)]
+    pairs_it = itertools.cycle(pairs)
+
+    def hints():
+        hint_statuses(*next(pairs_it))
+    yield f'{size}/hint_statuses', hints
+
+    def constraint():
+        db.guess_constraint(*next(pairs_it))
+    yield f'{size}/guess_constraint', constraint
+
+    yield f'{size}/get_country_of_day', db.get_country_of_day
+
+
+def run(sizes, repeat, pattern=None, log=print):
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            n = SIZES[size]
+            if n is None:
+                path = CountryDatabase().path
+            else:
+                t0 = time.perf_counter()
+                directory = os.path.join(tmp, size)
+                os.makedirs(directory)
+                path = write_dataset(synthetic_dataset(n), directory)
+                log(f"Generated {n:,} rows in {time.perf_counter() - t0:.1f}s")
+            db = CountryDatabase(path)
+            for name, fn in cases(db, path, size):
+                if pattern and not re.search(pattern, name):
+                    continue
+                results[name] = measure(fn, repeat)
+                log(f"  {name:<40} {format_time(median(results[name]))}")
+    return results
+
+
+def median(xs):
+    s = sorted(xs)
+    mid = len(s) // 2
+    return s[mid] if len(s) % 2 else (s[mid - 1] + s[mid]) / 2
+
+
+def mann_whitney(a, b):
+    # Two-sided Mann-Whitney U test, normal approximation with tie
+    # correction. Returns the p-value; None when there are too few samples
+    # for the approximation to mean anything.
+    n1, n2 = len(a), len(b)
+    if n1 < 3 or n2 < 3:
+        return None
+    ranked = sorted([(v, 0) for v in a] + [(v, 1) for v in b])
+    ranks = [0.0] * len(ranked)
+    ties = 0.0
+    i = 0
+    while i < len(ranked):
+        j = i
+        while j + 1 < len(ranked) and ranked[j + 1][0] == ranked[i][0]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[k] = (i + j) / 2.0 + 1
+        t = j - i + 1
+        ties += t ** 3 - t
+        i = j + 1
+    r1 = sum(r for r, (_, group) in zip(ranks, ranked) if group == 0)
+    u = r1 - n1 * (n1 + 1) / 2.0
+    n = n1 + n2
+    mean = n1 * n2 / 2.0
+    var = n1 * n2 / 12.0 * ((n + 1) - ties / (n * (n - 1)))
+    if var <= 0:
+        return 1.0
+    z = (abs(u - mean) - 0.5) / math.sqrt(var)
+    return math.erfc(max(0.0, z) / math.sqrt(2))
+
+
+def compare(current, baseline):
+    # (name, change, p, verdict) for every case present in both runs.
+    rows = []
+    for name, samples in current.items():
+        if name not in baseline:
+            continue
+        before, after = median(baseline[name]), median(samples)
+        change = after / before - 1 if before else 0.0
+        p = mann_whitney(baseline[name], samples)
+        verdict = ''
+        if p is not None and p < ALPHA and abs(change) >= SLOWDOWN:
+            verdict = 'REGRESSION' if change > 0 else 'faster'
+        rows.append((name, change, p, verdict))
+    return rows
+
+
+def format_time(seconds):
+    for unit, scale in (('s', 1.0), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+    return f"{seconds / 1e-9:8.1f} ns"
+
+
+def git_revision():
+    def git(*args):
+        return subprocess.run(['git', *args], cwd=HERE, capture_output=True, text=True, check=True).stdout.strip()
+    try:
+        rev = git('rev-parse', '--short', 'HEAD')
+        dirty = bool(git('status', '--porcelain', '--untracked-files=no'))
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown', False
+    return rev, dirty
+
+
+def load_history(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return []
+
+
+def save_history(path, history):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=1)
+    os.replace(tmp, path)
+
+
+def pick_baseline(history, revision, wanted=None):
+    # The newest run of `wanted`, or else the newest run of any other
+    # revision (a rerun of the same commit compares against the one before).
+    for entry in reversed(history):
+        if wanted is not None:
+            if entry['revision'].startswith(wanted):
+                return entry
+        elif entry['revision'] != revision or entry.get('dirty'):
+            return entry
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmarks for the data layer")
+    parser.add_argument('--sizes', default=','.join(DEFAULT_SIZES),
+                        help=f"comma-separated datasets from {', '.join(SIZES)} (default: all)")
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="samples per case")
+    parser.add_argument('--filter', default=None, metavar='REGEX', help="only run matching cases")
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help="results file (default: bench_history.json)")
+    parser.add_argument('--baseline', default=None, metavar='REV', help="compare against this revision")
+    parser.add_argument('--no-save', action='store_true', help="don't add this run to the history")
+    args = parser.parse_args(argv)
+
+    sizes = [s.strip() for s in args.sizes.split(',') if s.strip()]
+    unknown = [s for s in sizes if s not in SIZES]
+    if unknown:
+        parser.error(f"unknown size {unknown[0]!r}")
+    revision, dirty = git_revision()
+    print(f"Revision {revision}{' (modified)' if dirty else ''}, Python {platform.python_version()}")
+    results = run(sizes, args.repeat, args.filter)
+
+    history = load_history(args.history)
+    baseline = pick_baseline(history, revision, args.baseline)
+    regressions = 0
+    if baseline is None:
+        print("No baseline in the history yet")
+    else:
+        label = baseline['revision'] + (' (modified)' if baseline.get('dirty') else '')
+        print(f"\nCompared with {label} from {baseline['date']}:")
+        rows = compare(results, baseline['results'])
+        if not rows:
+            print("  no cases in common")
+        for name, change, p, verdict in rows:
+            p_text = '   n/a' if p is None else f"{p:6.4f}"
+            print(f"  {name:<40} {change * 100:+7.1f}%  p={p_text}  {verdict}")
+            regressions += verdict == 'REGRESSION'
+    if not args.no_save:
+        history.append({
+            'revision': revision,
+            'dirty': dirty,
+            'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'repeat': args.repeat,
+            'results': results,
+        })
+        save_history(args.history, history)
+    if regressions:
+        print(f"\n{regressions} significant regression{'s' if regressions != 1 else ''}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,287 @@
+import argparse
+import math
+import multiprocessing
+import os
+import random
+import re
+import struct
+import sys
+import time
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+# Cards never need a window; this keeps bulk runs working on headless hosts.
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+from categories import SCHEMA
+from gameplay import (BORDER, CountryDatabase, GEODLE_BG, GRAY, GREEN, INK_500, INK_700, INK_900, PRIMARY,
+                      RED, SHAPES, WHITE, hint_statuses)
+
+CARD_DIR = os.path.join(os.path.expanduser('~'), '.geodle', 'cards')
+TILE = 32
+GAP = 6
+PAD = 20
+HEADER_H = 86
+FOOTER_H = 34
+MAX_ROWS = 10
+MAX_TEXT = 512
+
+# One arrow tile per compass point, so every distance cell is a cached blit.
+ARROW_STEPS = 8
+
+
+def encode_png(surf, level=6) -> bytes:
+    # Plain RGB PNG with no row filters. Cards are large flat areas, so
+    # zlib alone compresses them well, and this is about twice as fast as
+    # pygame.image.save for files a little smaller.
+    w, h = surf.get_size()
+    raw = pygame.image.tobytes(surf, 'RGB')
+    stride = w * 3
+    rows = b''.join(b'\x00' + raw[y * stride:(y + 1) * stride] for y in range(h))
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack('>IIBBBBB', w, h, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(rows, level)) + chunk(b'IEND', b''))
+
+
+def slug(text) -> str:
+    return re.sub(r'[^A-Za-z0-9]+', '-', text).strip('-').lower() or 'card'
+
+
+def card_from_game(game, player=None, day=None):
+    # The picklable description of a finished game that render() takes.
+    return {
+        'target': game.correct_country.name,
+        'guesses': [g.name for g in game.guesses],
+        'won': game.won,
+        'max_guesses': game.max_guesses,
+        'player': player,
+        'day': game.database.day_number() if day is None else day,
+    }
+
+
+class CardRenderer:
+    # Draws result cards offscreen. Hint tiles come from the shared shape
+    # atlas, arrows are built once per compass point and text surfaces are
+    # kept in a small LRU, so a card for a common target is mostly blits.
+    def __init__(self, database=None):
+        pygame.font.init()
+        self.database = database or CountryDatabase()
+        self.columns = len(SCHEMA) + (1 if self.database.has_coordinates else 0)
+        self.width = 2 * PAD + self.columns * TILE + (self.columns - 1) * GAP
+        self.f_title = pygame.font.SysFont("Inter, Helvetica, Arial", 26, bold=True)
+        self.f_label = pygame.font.SysFont("Inter, Helvetica, Arial", 16, bold=True)
+        self.f_small = pygame.font.SysFont("Inter, Helvetica, Arial", 13)
+        self._text = OrderedDict()
+        self._arrows = {}
+
+    def text(self, font, s, color):
+        key = (id(font), s, color)
+        surf = self._text.get(key)
+        if surf is None:
+            surf = font.render(s, True, color)
+            self._text[key] = surf
+            if len(self._text) > MAX_TEXT:
+                self._text.popitem(last=False)
+        else:
+            self._text.move_to_end(key)
+        return surf
+
+    def arrow_tile(self, bearing):
+        step = int(round(bearing / (360.0 / ARROW_STEPS))) % ARROW_STEPS
+        tile = self._arrows.get(step)
+        if tile is None:
+            tile = SHAPES.round_rect((TILE, TILE), GRAY, 6).copy()
+            t = math.radians(step * 360.0 / ARROW_STEPS)
+            c, s = math.cos(t), math.sin(t)
+            r = TILE * 0.3
+            cx = cy = TILE / 2.0
+            # 0 degrees points up (north), matching the table's arrows.
+            pts = [(0, -r), (-r * 0.6, r * 0.7), (0, r * 0.35), (r * 0.6, r * 0.7)]
+            pygame.draw.polygon(tile, WHITE, [(cx + x * c - y * s, cy + x * s + y * c) for x, y in pts])
+            self._arrows[step] = tile
+        return tile
+
+    def rows(self, card):
+        # (statuses, distance hint) per guess, looked up in this renderer's
+        # dataset; guesses it doesn't know are skipped.
+        db = self.database
+        target = db.resolve(card['target'])
+        if target is None:
+            raise KeyError(f"unknown target {card['target']!r}")
+        out = []
+        for name in card['guesses']:
+            guess = db.resolve(name)
+            if guess is None:
+                continue
+            hint = None
+            if db.has_coordinates:
+                hint = db.geo().lookup(db.row_of[guess.name], db.row_of[target.name])
+            out.append((hint_statuses(guess, target), hint))
+        return target, out
+
+    def render(self, card):
+        target, rows = self.rows(card)
+        shown = rows[-MAX_ROWS:] if len(rows) > MAX_ROWS else rows
+        more = len(rows) - len(shown)
+        grid_h = len(shown) * (TILE + GAP) - GAP if shown else 0
+        height = HEADER_H + grid_h + (22 if more else 0) + FOOTER_H + PAD
+        surf = pygame.Surface((self.width, height))
+        surf.fill(GEODLE_BG)
+        surf.blit(SHAPES.panel((self.width, height), GEODLE_BG, BORDER, radius=12, border_width=2), (0, 0))
+
+        title = self.text(self.f_title, "Geodle", PRIMARY)
+        surf.blit(title, (PAD, PAD - 4))
+        day = card.get('day')
+        if day is not None:
+            label = self.text(self.f_small, f"#{day}", INK_500)
+            surf.blit(label, (PAD + title.get_width() + 8, PAD + title.get_height() - label.get_height() - 6))
+        if card['won']:
+            limit = card.get('max_guesses')
+            score = f"{len(rows)}/{limit}" if limit else f"{len(rows)} guesses"
+            color = GREEN
+        else:
+            score = f"X/{card.get('max_guesses') or len(rows)}"
+            color = RED
+        score_s = self.text(self.f_label, score, color)
+        surf.blit(score_s, (self.width - PAD - score_s.get_width(), PAD + 4))
+        target_s = self.text(self.f_small, target.name, INK_700)
+        surf.blit(target_s, (PAD, PAD + title.get_height() + 4))
+
+        y = HEADER_H
+        if more:
+            note = self.text(self.f_small, f"+{more} earlier guesses", INK_500)
+            surf.blit(note, (PAD, y))
+            y += 22
+        for statuses, hint in shown:
+            x = PAD
+            for status in statuses:
+                surf.blit(SHAPES.hint_tile(status, TILE), (x, y))
+                x += TILE + GAP
+            if self.columns > len(SCHEMA):
+                if hint is None:
+                    surf.blit(SHAPES.round_rect((TILE, TILE), BORDER, 6), (x, y))
+                elif hint[0] < 1.0:
+                    surf.blit(SHAPES.hint_tile('good', TILE), (x, y))
+                else:
+                    surf.blit(self.arrow_tile(hint[1]), (x, y))
+            y += TILE + GAP
+
+        player = card.get('player')
+        if player:
+            name = self.text(self.f_small, player, INK_900)
+            surf.blit(name, (PAD, height - PAD - name.get_height()))
+        return surf
+
+    def save(self, card, path=None):
+        path = path or os.path.join(CARD_DIR, f"geodle-{card.get('day')}-{slug(card['target'])}.png")
+        data = encode_png(self.render(card))
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+
+def card_path(directory, card, index=None):
+    parts = [str(card.get('day', 'day')), slug(card.get('player') or 'player')]
+    if index is not None:
+        parts.append(str(index))
+    return os.path.join(directory, '-'.join(parts) + '.png')
+
+
+# Each worker process builds one renderer and keeps it, so its tile and text
+# caches carry over between chunks. With fork the parent's dataset (rows,
+# indexes, distance matrix) is shared copy-on-write.
+_RENDERER = None
+
+
+def _init_worker(path):
+    global _RENDERER
+    if _RENDERER is None or _RENDERER.database.path != path:
+        _RENDERER = CardRenderer(CountryDatabase(path))
+
+
+def _render_chunk(task):
+    path, directory, items = task
+    _init_worker(path)
+    for index, card in items:
+        _RENDERER.save(card, card_path(directory, card, index))
+    return len(items)
+
+
+def render_all(cards, directory, database, workers=None, chunk=32):
+    # Renders and PNG-encodes every card into directory; returns the count.
+    global _RENDERER
+    if database.has_coordinates:
+        database.geo()  # before forking, so workers share one matrix
+    if _RENDERER is None or _RENDERER.database is not database:
+        _RENDERER = CardRenderer(database)
+    items = list(enumerate(cards))
+    tasks = [(database.path, directory, items[i:i + chunk]) for i in range(0, len(items), chunk)]
+    os.makedirs(directory, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) == 1:
+        return sum(map(_render_chunk, tasks))
+    methods = multiprocessing.get_all_start_methods()
+    ctx = multiprocessing.get_context('fork' if 'fork' in methods else None)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        return sum(pool.map(_render_chunk, tasks))
+
+
+def synthetic_cards(database, n, seed=0, max_guesses=6):
+    # Plausible finished games: random guesses that end on the target for
+    # about four in five players.
+    rng = random.Random(seed)
+    names = list(database.countries)
+    day = database.day_number()
+    cards = []
+    for i in range(n):
+        target = rng.choice(names)
+        won = rng.random() < 0.8
+        count = rng.randint(1, max_guesses) if won else max_guesses
+        guesses = rng.sample([x for x in names if x != target] if count > 1 else names, count - won)
+        if won:
+            guesses.append(target)
+        cards.append({'target': target, 'guesses': guesses, 'won': won, 'max_guesses': max_guesses,
+                      'player': f"player {i}", 'day': day})
+    return cards
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render PNG result cards")
+    parser.add_argument('--out', default=CARD_DIR, help="output directory (default: ~/.geodle/cards)")
+    parser.add_argument('--leaderboard', default=None, metavar='PATH', nargs='?', const='',
+                        help="render every stored game of a day from the leaderboard database")
+    parser.add_argument('--day', type=int, default=None, help="day number (default: today)")
+    parser.add_argument('--synthetic', type=int, default=0, metavar='N',
+                        help="render N generated games, to measure throughput")
+    parser.add_argument('--dataset', default=None, help="dataset JSON (default: src/country.json)")
+    parser.add_argument('--workers', type=int, default=None, help="processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    database = CountryDatabase(args.dataset)
+    if args.synthetic:
+        cards = synthetic_cards(database, args.synthetic)
+    elif args.leaderboard is not None:
+        from leaderboard import Leaderboard
+        store = Leaderboard(args.leaderboard or None)
+        day = args.day if args.day is not None else database.day_number()
+        cards = [dict(game, max_guesses=store.max_guesses) for game in store.games(day)]
+        store.close()
+    else:
+        parser.error("pass --leaderboard or --synthetic")
+    start = time.perf_counter()
+    count = render_all(cards, args.out, database, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"Rendered {count} cards to {args.out} in {elapsed:.2f}s ({rate:.0f} cards/s)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
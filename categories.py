@@ -0,0 +1,104 @@
+import operator
+
+# Statuses of a numeric hint in order of increasing target value: a target
+# well below the guess reads 'down', one within tolerance 'good', one well
+# above it 'up'. Categorical hints are only ever 'good' or 'bad'.
+STATUS_RANK = {'down': 0, 'good': 1, 'up': 2}
+
+
+class Category:
+    # One hint column: the CountryData field it compares, how values are
+    # compared, and how the column is titled and its values shown.
+    def __init__(self, field, title, name=None, kind='equal', tolerance=0.0, relative=False,
+                 fmt='{}', labels=None, width=120):
+        if kind not in ('equal', 'numeric'):
+            raise ValueError(f"unknown category kind {kind!r}")
+        self.field = field
+        self.title = title
+        self.name = name or title
+        self.kind = kind
+        self.tolerance = tolerance
+        self.relative = relative
+        self.fmt = fmt
+        self.labels = labels
+        self.width = width
+        self.compare = self._compile()
+
+    @property
+    def numeric(self) -> bool:
+        return self.kind == 'numeric'
+
+    def _compile(self):
+        # Resolve the rule once so per-guess evaluation is a single call with
+        # no branching on the category.
+        tol = self.tolerance
+        if self.kind == 'equal':
+            def compare(gv, tv):
+                return 'good' if gv == tv else 'bad'
+        elif self.relative:
+            def compare(gv, tv):
+                try:
+                    tv = float(tv)
+                    fv = (float(gv) - tv) / max(abs(tv), 1)
+                except (TypeError, ValueError):
+                    return 'bad'
+                if abs(fv) <= tol:
+                    return 'good'
+                return 'up' if fv < 0 else 'down'
+        else:
+            def compare(gv, tv):
+                try:
+                    gv, tv = float(gv), float(tv)
+                except (TypeError, ValueError):
+                    return 'bad'
+                if abs(gv - tv) <= tol:
+                    return 'good'
+                return 'up' if gv < tv else 'down'
+        return compare
+
+    def status(self, guess, target) -> str:
+        return self.compare(getattr(guess, self.field, None), getattr(target, self.field, None))
+
+    def describe(self, status) -> str:
+        # What ``status`` means for this category, for the help panel.
+        if status == 'good':
+            if not self.numeric:
+                return f"{self.name}: the same as the secret country's."
+            tol = f"{self.tolerance:.0%}" if self.relative else self.format(self.tolerance)
+            return f"{self.name}: within {tol} of the secret country's."
+        if status in ('up', 'down'):
+            return f"{self.name}: the secret country's is {'higher' if status == 'up' else 'lower'}."
+        return f"{self.name}: different from the secret country's."
+
+    def format(self, value) -> str:
+        if self.labels is not None:
+            return self.labels.get(value, str(value))
+        try:
+            return self.fmt.format(value)
+        except (TypeError, ValueError):
+            return str(value)
+
+
+SCHEMA = [
+    Category('continent', 'Continent'),
+    Category('population', 'Population', kind='numeric', tolerance=0.10, relative=True,
+             fmt='{:,}', width=110),
+    Category('landlocked', 'Landlocked', labels={True: 'Landlocked', False: 'Coastal'}),
+    Category('religion', 'Religion'),
+    Category('temperature', 'Avg. Temp.', name='Average temperature', kind='numeric', tolerance=0.5, fmt='{}°C', width=140),
+    Category('government', 'Gov.', name='Government', width=140),
+]
+
+
+def compile_statuses(schema):
+    # Returns statuses(guess, target) -> one status per category, reading
+    # every field with a single attrgetter call per country.
+    compares = [c.compare for c in schema]
+    getter = operator.attrgetter(*[c.field for c in schema])
+    if len(schema) == 1:
+        single = getter
+        getter = lambda obj: (single(obj),)
+
+    def statuses(guess, target):
+        return [cmp(gv, tv) for cmp, gv, tv in zip(compares, getter(guess), getter(target))]
+    return statuses
@@ -0,0 +1,137 @@
+import os
+import sys
+from collections import OrderedDict, namedtuple
+
+import geo
+from gameplay import CountryDatabase
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_NAME = 'countries'
+DEFAULT_BUDGET_MB = 256
+# Per-row cost is measured on this many rows and scaled up.
+SAMPLE_ROWS = 64
+
+Dataset = namedtuple('Dataset', 'name title path')
+
+
+def discover(base=None):
+    # The built-in src/country.json, then every JSON file in src/datasets/
+    # (same row format), named after the file: us_states.json -> us_states.
+    # Difficulty tables (us_states.difficulty.json) are not datasets.
+    base = base or os.path.join(HERE, 'src')
+    found = [Dataset(DEFAULT_NAME, 'Countries', os.path.join(base, 'country.json'))]
+    directory = os.path.join(base, 'datasets')
+    try:
+        files = sorted(os.listdir(directory))
+    except OSError:
+        files = []
+    for filename in files:
+        stem, ext = os.path.splitext(filename)
+        if ext.lower() != '.json' or stem == DEFAULT_NAME or stem.endswith('difficulty'):
+            continue
+        found.append(Dataset(stem, stem.replace('_', ' ').title(), os.path.join(directory, filename)))
+    return found
+
+
+def _size(obj, seen, depth=4):
+    # sys.getsizeof of obj and what it holds, a few levels down; shared
+    # objects are counted once.
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if depth == 0:
+        return size
+    if isinstance(obj, dict):
+        size += sum(_size(k, seen, depth - 1) + _size(v, seen, depth - 1) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_size(v, seen, depth - 1) for v in obj)
+    elif hasattr(obj, '__dict__'):
+        size += _size(vars(obj), seen, depth - 1)
+    return size
+
+
+def footprint(database) -> int:
+    # Estimated bytes held by a loaded dataset: its rows, bitset and sorted
+    # indexes, alias index and distance matrix. The matrix is counted before
+    # it is built, so the estimate taken at load time holds for good.
+    rows = database.rows
+    n = len(rows)
+    if not n:
+        return 0
+    sample = rows[:SAMPLE_ROWS]
+    seen = set()
+    per_row = sum(_size(c, seen) for c in sample) / len(sample)
+    total = per_row * n
+    # countries and row_of: two dict slots and a small int per row.
+    total += sys.getsizeof(database.countries) + sys.getsizeof(database.row_of) + 28 * n
+    for masks in database.value_masks.values():
+        total += sum(sys.getsizeof(m) for m in masks.values())
+    for values, order, prefix in database.sorted_index.values():
+        total += sys.getsizeof(values) + sys.getsizeof(order) + 24 * n
+        total += sum(sys.getsizeof(m) for m in prefix)
+    index = database.alias_index
+    total += sys.getsizeof(index._blob) + sys.getsizeof(index._starts) + sys.getsizeof(index._owners)
+    total += sys.getsizeof(index.exact) + 60 * len(index.exact) + sys.getsizeof(index.table)
+    if database.has_coordinates:
+        # Latitude and longitude lists, plus two n x n float32 matrices.
+        total += 2 * 24 * n
+        if geo.np is not None:
+            total += 2 * 4 * n * n
+    return int(total)
+
+
+class DatasetRegistry:
+    # Loads datasets on first use and keeps them, with their indexes and
+    # caches, in LRU order under a memory budget. get() of a resident
+    # dataset never reloads it and only updates the order; loading one may
+    # evict the coldest others, but never the dataset being returned.
+    def __init__(self, datasets=None, budget_mb=DEFAULT_BUDGET_MB):
+        self.datasets = OrderedDict((d.name, d) for d in (datasets or discover()))
+        self.budget = int(budget_mb * (1 << 20))
+        self._resident = OrderedDict()
+        self._sizes = {}
+        self.loads = 0
+        self.evictions = 0
+
+    def names(self):
+        return list(self.datasets)
+
+    def title(self, name):
+        return self.datasets[name].title
+
+    def resident(self):
+        return list(self._resident)
+
+    def used(self) -> int:
+        return sum(self._sizes.values())
+
+    def get(self, name):
+        database = self._resident.get(name)
+        if database is not None:
+            self._resident.move_to_end(name)
+            return database
+        if name not in self.datasets:
+            raise KeyError(f"unknown dataset {name!r}; available: {', '.join(self.datasets)}")
+        database = CountryDatabase(self.datasets[name].path)
+        self.loads += 1
+        self._insert(name, database)
+        return database
+
+    def replace(self, name, database):
+        # A hot-reloaded copy takes the old one's place.
+        if name in self._resident:
+            self._insert(name, database)
+
+    def next_name(self, name):
+        names = self.names()
+        return names[(names.index(name) + 1) % len(names)] if name in names else names[0]
+
+    def _insert(self, name, database):
+        # The only place a dataset is measured or anything is evicted.
+        self._resident[name] = database
+        self._sizes[name] = footprint(database)
+        while len(self._resident) > 1 and self.used() > self.budget:
+            key, _ = self._resident.popitem(last=False)
+            del self._sizes[key]
+            self.evictions += 1
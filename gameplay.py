@@ -1,12 +1,24 @@
+import hashlib
 import json
 import os
+from collections import OrderedDict
 from typing import Dict, List
 import random
 from datetime import datetime
 import math
+import struct
 import sys
+import time
+import zlib
 import pygame
 
+import geo
+import savegame
+from aliases import AliasIndex
+from categories import SCHEMA, STATUS_RANK, compile_statuses
+import latency
+import telemetry
+
 # Style tokens
 GEODLE_BG = (250, 250, 250)
 INK_900 = (22, 22, 22)
@@ -29,26 +41,123 @@ GRAY = (128, 128, 128)
 WINDOW_WIDTH = 1000
 WINDOW_HEIGHT = 700
 FPS = 60
+# The simulation (timers, confetti, easing) advances in fixed steps of real
+# time, however often frames are drawn. Timers such as error_timer count
+# steps. After a stall, at most MAX_SIM_STEPS are run and the rest dropped.
+SIM_HZ = 60
+SIM_DT = 1.0 / SIM_HZ
+MAX_SIM_STEPS = 10
+# With no input for IDLE_AFTER_MS and nothing animating, draw at IDLE_FPS.
+IDLE_FPS = 20
+IDLE_AFTER_MS = 2000
+SCROLL_EASE = 0.18
+# Frames slower than this are reported to telemetry.
+FRAME_SPIKE_MS = 2000.0 / FPS
+MAX_TEXT = 256
 
 CONFETTI_COLS = [
     (236, 99, 95), (255, 211, 102), (147, 221, 119),
     (123, 178, 255), (195, 155, 211)
 ]
 
+HINT_COLORS = {'good': GREEN, 'bad': RED, 'up': BLUE, 'down': BLUE}
+
+
+class ShapeAtlas:
+    # Rounded rectangles are built from a small nine-slice source per
+    # (colour, radius, border width) and composed once per size, so every
+    # call site after the first is a single blit.
+    def __init__(self, max_shapes=512):
+        self.max_shapes = max_shapes
+        self._slices = {}
+        self._shapes = OrderedDict()
+        self._tiles = {}
+
+    def _cache(self, key, surf):
+        self._shapes[key] = surf
+        if len(self._shapes) > self.max_shapes:
+            self._shapes.popitem(last=False)
+        return surf
+
+    def _slice(self, color, r, width):
+        key = (color, r, width)
+        src = self._slices.get(key)
+        if src is None:
+            n = 2 * r + 2
+            src = pygame.Surface((n, n), pygame.SRCALPHA)
+            pygame.draw.rect(src, color, src.get_rect(), width, border_radius=r)
+            self._slices[key] = src
+        return src
+
+    def round_rect(self, size, color, radius=8, width=0):
+        w, h = max(1, int(size[0])), max(1, int(size[1]))
+        r = max(0, min(radius, w // 2, h // 2))
+        color = tuple(color)
+        key = ('rect', w, h, color, r, width)
+        surf = self._shapes.get(key)
+        if surf is not None:
+            self._shapes.move_to_end(key)
+            return surf
+        surf = pygame.Surface((w, h), pygame.SRCALPHA)
+        if r == 0 or width > r:
+            pygame.draw.rect(surf, color, surf.get_rect(), width, border_radius=r)
+            return self._cache(key, surf)
+        src = self._slice(color, r, width)
+        n = src.get_width()
+        mid_w, mid_h = w - 2 * r, h - 2 * r
+        for sx, dx in ((0, 0), (n - r, w - r)):
+            for sy, dy in ((0, 0), (n - r, h - r)):
+                surf.blit(src, (dx, dy), (sx, sy, r, r))
+        if mid_w > 0:
+            surf.blit(pygame.transform.scale(src.subsurface((r, 0, 2, r)), (mid_w, r)), (r, 0))
+            surf.blit(pygame.transform.scale(src.subsurface((r, n - r, 2, r)), (mid_w, r)), (r, h - r))
+        if mid_h > 0:
+            surf.blit(pygame.transform.scale(src.subsurface((0, r, r, 2)), (r, mid_h)), (0, r))
+            surf.blit(pygame.transform.scale(src.subsurface((n - r, r, r, 2)), (r, mid_h)), (w - r, r))
+        if mid_w > 0 and mid_h > 0:
+            surf.blit(pygame.transform.scale(src.subsurface((r, r, 2, 2)), (mid_w, mid_h)), (r, r))
+        return self._cache(key, surf)
+
+    def panel(self, size, fill, border, radius=8, border_width=1):
+        w, h = max(1, int(size[0])), max(1, int(size[1]))
+        key = ('panel', w, h, tuple(fill), tuple(border), radius, border_width)
+        surf = self._shapes.get(key)
+        if surf is not None:
+            self._shapes.move_to_end(key)
+            return surf
+        surf = self.round_rect((w, h), fill, radius, 0).copy()
+        surf.blit(self.round_rect((w, h), border, radius, border_width), (0, 0))
+        return self._cache(key, surf)
+
+    def hint_tile(self, status, size, radius=6):
+        if status not in HINT_COLORS:
+            status = 'bad'
+        size = max(1, int(size))
+        key = (status, size, radius)
+        tile = self._tiles.get(key)
+        if tile is None:
+            tile = self.round_rect((size, size), HINT_COLORS[status], radius).copy()
+            if status in ('up', 'down'):
+                tri_h = size // 2
+                cx, cy = size // 2, size // 2
+                pts = ([(cx, cy - tri_h // 2), (cx - tri_h // 2, cy + tri_h // 2), (cx + tri_h // 2, cy + tri_h // 2)]
+                    if status == 'up'
+                    else [(cx, cy + tri_h // 2), (cx - tri_h // 2, cy - tri_h // 2), (cx + tri_h // 2, cy - tri_h // 2)])
+                pygame.draw.polygon(tile, WHITE, pts)
+            self._tiles[key] = tile
+        return tile
+
+
+SHAPES = ShapeAtlas()
+
+
 def draw_round_rect(surf, rect, color, radius=8, width=0):
     x, y, w, h = rect if not isinstance(rect, pygame.Rect) else (rect.x, rect.y, rect.width, rect.height)
-    r = min(radius, w//2, h//2)
-    if r <= 0:
-        pygame.draw.rect(surf, color, rect, width)
-        return
-    inner = pygame.Rect(x+r, y, w-2*r, h)
-    pygame.draw.rect(surf, color, inner, width)
-    inner = pygame.Rect(x, y+r, w, h-2*r)
-    pygame.draw.rect(surf, color, inner, width)
-    pygame.draw.circle(surf, color, (x+r, y+r), r, width)
-    pygame.draw.circle(surf, color, (x+w-r-1, y+r), r, width)
-    pygame.draw.circle(surf, color, (x+r, y+h-r-1), r, width)
-    pygame.draw.circle(surf, color, (x+w-r-1, y+h-r-1), r, width)
+    surf.blit(SHAPES.round_rect((w, h), color, radius, width), (x, y))
+
+def draw_panel(surf, rect, fill, border, radius=8, border_width=1):
+    x, y, w, h = rect if not isinstance(rect, pygame.Rect) else (rect.x, rect.y, rect.width, rect.height)
+    surf.blit(SHAPES.panel((w, h), fill, border, radius, border_width), (x, y))
 
 def clamp(n, a, b):
     return max(a, min(n, b))
@@ -66,45 +175,67 @@ def ui_init(self, screen, game):
     self.table_header_h = 36
     self.table_border = 1
     self.hover_row = -1
+    self.hover_col = -1
     self.show_help = True
-    self._input_rect = pygame.Rect(0,0,0,0)
-    self._submit_rect = pygame.Rect(0,0,0,0)
-    self._sugg_rects = []
+    self.table_scroll = 0
+    self.hover_widget = None
+    self.stats = None
+    # Replaces the local restart, e.g. when a race host decides new rounds.
+    self.restart_hook = None
+    self._opponents_surf = None
+    self._opponents_key = None
+    self.quit_requested = False
+    self.mouse_pos = (0, 0)
+    self.now_ms = pygame.time.get_ticks
+    self.show_candidates = False
+    self.show_latency = False
+    self._text = OrderedDict()
+    self._latency_panel = None
+    self._latency_at = None
+    self._table_follow = True
+    self._table_seen = 0
+    self._row_cache = OrderedDict()
     self.input_focused = False
     self.sugg_scroll_idx = 0
-    self._suggest_drop_rect = None
-    self._suggest_track_rect = None
     self._suggest_thumb_rect = None
     self._dragging_sugg_thumb = False
     self._drag_thumb_offset = 0
     self._sugg_wheel_accum = 0.0
     self._last_wheel_time = 0
     self._sugg_scroll_target = float(self.sugg_scroll_idx)
-    self._sugg_scroll = float(self.sugg_scroll_idx)
+    self._sugg_scroll = self._sugg_scroll_prev = float(self.sugg_scroll_idx)
+    self.alpha = 1.0
+    self._game_over_layer = None
+    self._game_over_key = None
+    self.layout = None
 
     self.logo_rect = pygame.Rect(16, 12, 140, 56)
     self.logo_surf = None
-    try:
-        base = os.path.dirname(__file__)
-        logo_candidates = [
-            os.path.join(base, 'img', 'logo.png'),
-            os.path.join(base, 'logo.png'),
-        ]
-        for path in logo_candidates:
-            if os.path.exists(path):
-                try:
-                    img = pygame.image.load(path).convert_alpha()
-                    self.logo_surf = img
-                    break
-                except Exception:
-                    self.logo_surf = None
-    except Exception:
-        self.logo_surf = None
+    self._load_logo()
+
+
+HINT_FIELDS = [c.field for c in SCHEMA]
+# The help panel's example guess and target, when the dataset has them.
+HELP_EXAMPLE = ('Australia', 'Yemen')
+HELP_EXAMPLE_SCAN = 256
+hint_statuses = compile_statuses(SCHEMA)
+RANGE_BLOCK = 64
+
+def _first_index(values, pred):
+    lo, hi = 0, len(values)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if pred(values[mid]):
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
 
 
 class CountryData:
     def __init__(self, name: str, continent: str, population: int, 
-                 landlocked: bool, religion: str, temperature: float, government: str):
+                 landlocked: bool, religion: str, temperature: float, government: str,
+                 latitude: float = None, longitude: float = None, aliases=()):
         self.name = name
         self.continent = continent
         self.population = population
@@ -112,28 +243,195 @@ class CountryData:
         self.religion = religion
         self.temperature = temperature  # Celsius
         self.government = government
+        # Centroid in degrees; optional, enables the distance hint.
+        self.latitude = latitude
+        self.longitude = longitude
+        # Other names players may type: short forms, former and local names.
+        self.aliases = tuple(aliases)
     
     def get_data_list(self):
-        return [self.continent, self.population, self.landlocked, 
-                self.religion, self.temperature, self.government]
+        return [getattr(self, c.field) for c in SCHEMA]
     
     @staticmethod
     def get_headers():
-        return ['Continent', 'Population', 'Landlocked', 'Religion', 'Avg. Temp.', 'Gov.']
+        return [c.title for c in SCHEMA]
 
 
 class CountryDatabase:
-    def __init__(self):
+    def __init__(self, path: str = None):
         self.countries = {}
         base = os.path.dirname(__file__)
         self.epoch = datetime(2022, 5, 9)
         loaded = False
-        path = os.path.join(base, 'src', 'country.json')
-        loaded = False
+        path = path or os.path.join(base, 'src', 'country.json')
+        self.path = path
+        self.dataset_hash = ""
+        self.difficulty = {}
         if os.path.exists(path):
-            loaded = self.load_from_country_json(os.path.dirname(path))
+            loaded = self.load_from_country_json(path)
+            with open(path, 'rb') as f:
+                self.dataset_hash = hashlib.sha1(f.read()).hexdigest()
         if not loaded:
-            raise RuntimeError(f"Failed to load country.json!")
+            raise RuntimeError(f"Failed to load {os.path.basename(path)}!")
+        self.build_indexes()
+        self.load_difficulty()
+
+    def difficulty_path(self) -> str:
+        # Each dataset has its own table next to it: country.json's is
+        # country.difficulty.json.
+        return os.path.splitext(self.path)[0] + '.difficulty.json'
+
+    def load_difficulty(self, path: str = None) -> bool:
+        # Written by analysis.py; ignored unless it was computed for this data.
+        path = path or self.difficulty_path()
+        table = self.load_json_file(os.path.dirname(path), os.path.basename(path))
+        if not isinstance(table, dict) or table.get('dataset_hash') != self.dataset_hash:
+            self.difficulty = {}
+            return False
+        self.difficulty = table.get('countries') or {}
+        return bool(self.difficulty)
+
+    def daily_order(self) -> List[str]:
+        names = list(self.countries.keys())
+        if not self.difficulty:
+            return names
+        # Alternate from the easy and hard ends so hard days never cluster.
+        ranked = sorted(names, key=lambda n: self.difficulty.get(n, {}).get('expected_guesses', 0.0))
+        order = []
+        lo, hi = 0, len(ranked) - 1
+        while lo <= hi:
+            order.append(ranked[lo])
+            if lo != hi:
+                order.append(ranked[hi])
+            lo += 1
+            hi -= 1
+        return order
+
+    def build_indexes(self):
+        # Rows are addressed by position; candidate sets are Python ints used
+        # as bitsets, so filtering by a hint is a handful of AND operations.
+        self.rows = list(self.countries.values())
+        self.row_of = {c.name: i for i, c in enumerate(self.rows)}
+        n = len(self.rows)
+        self._nbytes = (n + 7) // 8
+        self.all_mask = (1 << n) - 1
+        self.value_masks = {}
+        for cat in SCHEMA:
+            if cat.numeric:
+                continue
+            buckets = {}
+            for i, c in enumerate(self.rows):
+                buckets.setdefault(getattr(c, cat.field), []).append(i)
+            self.value_masks[cat.field] = {v: self._bits(idx) for v, idx in buckets.items()}
+        # Numeric fields keep rows sorted by value plus a prefix mask every
+        # RANGE_BLOCK rows, so a value range becomes a bitset in O(block).
+        self.sorted_index = {}
+        for cat in SCHEMA:
+            if not cat.numeric:
+                continue
+            field = cat.field
+            order = sorted(range(n), key=lambda i: getattr(self.rows[i], field))
+            values = [getattr(self.rows[i], field) for i in order]
+            prefix = [0]
+            for start in range(0, n, RANGE_BLOCK):
+                prefix.append(prefix[-1] | self._bits(order[start:start + RANGE_BLOCK]))
+            self.sorted_index[field] = (values, order, prefix)
+        self.has_coordinates = any(c.latitude is not None for c in self.rows)
+        self._geo = None
+        self.alias_index = AliasIndex(self.rows)
+
+    def geo(self):
+        # Built on first use: the distance hint is optional and numpy is
+        # comparatively slow to import.
+        if self._geo is None:
+            self._geo = geo.GeoMatrix(self.rows)
+        return self._geo
+
+    def _bits(self, rows) -> int:
+        buf = bytearray(self._nbytes)
+        for r in rows:
+            buf[r >> 3] |= 1 << (r & 7)
+        return int.from_bytes(buf, 'little')
+
+    def _prefix_mask(self, field, k) -> int:
+        values, order, prefix = self.sorted_index[field]
+        block = k // RANGE_BLOCK
+        return prefix[block] | self._bits(order[block * RANGE_BLOCK:k])
+
+    def range_mask(self, field, lo, hi) -> int:
+        if lo >= hi:
+            return 0
+        return self._prefix_mask(field, hi) ^ self._prefix_mask(field, lo)
+
+    def status_masks(self, guess, cat) -> Dict[str, int]:
+        # Evaluates ``guess`` against every row at once: each status maps to
+        # the bitset of targets that would show it for this category.
+        gv = getattr(guess, cat.field)
+        if cat.numeric:
+            values = self.sorted_index[cat.field][0]
+            compare = cat.compare
+            # Ranks rise monotonically with the target value, so the three
+            # statuses are contiguous runs of the sorted index.
+            lo = _first_index(values, lambda v: STATUS_RANK.get(compare(gv, v), -1) >= 1)
+            hi = _first_index(values, lambda v: STATUS_RANK.get(compare(gv, v), -1) >= 2)
+            return {'down': self.range_mask(cat.field, 0, lo),
+                    'good': self.range_mask(cat.field, lo, hi),
+                    'up': self.range_mask(cat.field, hi, len(values))}
+        m = self.value_masks[cat.field].get(gv, 0)
+        return {'good': m, 'bad': self.all_mask & ~m}
+
+    def hint_masks(self, guess) -> List[Dict[str, int]]:
+        return [self.status_masks(guess, cat) for cat in SCHEMA]
+
+    def status_mask(self, guess, cat, status) -> int:
+        # The one entry of status_masks() for ``status``, without building
+        # the others; this is what the guess and simulation paths need.
+        gv = getattr(guess, cat.field)
+        if cat.numeric:
+            rank = STATUS_RANK.get(status)
+            if rank is None:
+                return self.all_mask
+            values = self.sorted_index[cat.field][0]
+            compare = cat.compare
+            lo = _first_index(values, lambda v: STATUS_RANK.get(compare(gv, v), -1) >= rank)
+            hi = _first_index(values, lambda v: STATUS_RANK.get(compare(gv, v), -1) > rank)
+            return self.range_mask(cat.field, lo, hi)
+        m = self.value_masks[cat.field].get(gv, 0)
+        if status == 'good':
+            return m
+        return self.all_mask & ~m if status == 'bad' else self.all_mask
+
+    def hint_mask(self, guess, field, status) -> int:
+        # Rows that would show ``status`` for ``field`` had they been the target.
+        return self.status_mask(guess, SCHEMA[HINT_FIELDS.index(field)], status)
+
+    def guess_constraint(self, guess, target) -> int:
+        return self.constraint_from_statuses(guess, hint_statuses(guess, target), guess.name == target.name)
+
+    def constraint_from_statuses(self, guess, statuses, solved=False) -> int:
+        # Targets consistent with seeing ``statuses`` for ``guess``; also
+        # usable when only the hints are known, not the target.
+        mask = self.all_mask
+        for cat, status in zip(SCHEMA, statuses):
+            mask &= self.status_mask(guess, cat, status)
+        row = self.row_of.get(guess.name)
+        if row is not None and not solved:
+            mask &= ~(1 << row)
+        return mask
+
+    def candidate_mask(self, guesses, target) -> int:
+        mask = self.all_mask
+        for g in guesses:
+            mask &= self.guess_constraint(g, target)
+        return mask
+
+    def rows_in(self, mask: int, limit=None) -> List[CountryData]:
+        out = []
+        while mask and (limit is None or len(out) < limit):
+            low = mask & -mask
+            out.append(self.rows[low.bit_length() - 1])
+            mask ^= low
+        return out
     def load_json_file(self, data_dir: str, filename: str):
         filepath = os.path.join(data_dir, filename)
         if not os.path.exists(filepath):
@@ -168,6 +466,11 @@ class CountryDatabase:
                         temp = 0.0
                     land = item.get('landlocked', item.get('is_landlocked', False))
                     land = str(land).strip() in ('1', 'true', 'True', 'yes')
+                    try:
+                        lat = float(item.get('latitude', item.get('lat')))
+                        lon = float(item.get('longitude', item.get('lon', item.get('lng'))))
+                    except Exception:
+                        lat = lon = None
                     country = CountryData(
                         name=name,
                         continent=item.get('continent') or item.get('region') or '',
@@ -175,7 +478,10 @@ class CountryDatabase:
                         landlocked=land,
                         religion=item.get('religion') or item.get('dominant_religion') or '',
                         temperature=temp,
-                        government=item.get('government') or item.get('gov') or ''
+                        government=item.get('government') or item.get('gov') or '',
+                        latitude=lat,
+                        longitude=lon,
+                        aliases=[a for a in item.get('aliases') or [] if isinstance(a, str)]
                     )
                     self.countries[country.name] = country
                     loaded += 1
@@ -184,28 +490,34 @@ class CountryDatabase:
                 return False
         return len(self.countries) > 0
     
+    def day_number(self, when=None) -> int:
+        today = (when or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+        return (today - self.epoch).days
+
     def get_country_of_day(self) -> CountryData:
-        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        day_number = (today - self.epoch).days
-        country_names = list(self.countries.keys())
-        selected_name = country_names[day_number % len(country_names)]
+        country_names = self.daily_order()
+        selected_name = country_names[self.day_number() % len(country_names)]
         return self.countries[selected_name]
 
     def search_countries(self, query: str) -> List[str]:
         if not query:
             return []
-        query_lower = query.lower()
-        matches = [name for name in self.countries.keys() 
-                  if query_lower in name.lower()]
-        return sorted(matches)[:10]
+        return [self.rows[i].name for i in self.alias_index.search(query)]
+
+    def resolve(self, name: str) -> CountryData:
+        # Canonical row for a typed name or alias, ignoring case and accents.
+        row = self.alias_index.resolve(name)
+        return None if row is None else self.rows[row]
 
 
 class GeodleGame:
-    def __init__(self):
-        self.database = CountryDatabase()
+    def __init__(self, practice: bool = False, database: CountryDatabase = None):
+        self.database = database or CountryDatabase()
         self.correct_country = self.database.get_country_of_day()
         self.guesses: List[CountryData] = []
-        self.max_guesses = 6
+        # Practice mode has no guess limit; the game only ends on a win.
+        self.practice = practice
+        self.max_guesses = None if practice else 6
         self.game_over = False
         self.won = False
         self.current_input = ""
@@ -214,18 +526,32 @@ class GeodleGame:
         self.error_message = ""
         self.error_timer = 0
         self.particles = []
+        self.viewport = (WINDOW_WIDTH, WINDOW_HEIGHT)
+        self.candidates = self.database.all_mask
+        self.started_ms = None
+        self.pending_database = None
+        # Ranked games are all played on the country of the day.
+        self.daily = False
 
     def make_guess(self, country_name: str) -> bool:
-        if country_name not in self.database.countries:
+        country_data = self.database.resolve(country_name)
+        if country_data is None:
             self.error_message = "Country not found!"
             self.error_timer = 120
+            telemetry.sink.emit('invalid_guess', input=country_name, reason='not_found')
             return False
+        country_name = country_data.name
         if any(g.name == country_name for g in self.guesses):
             self.error_message = "Already guessed this country!"
             self.error_timer = 120
+            telemetry.sink.emit('invalid_guess', input=country_name, reason='duplicate')
             return False
-        country_data = self.database.countries[country_name]
         self.guesses.append(country_data)
+        self.candidates &= self.database.guess_constraint(country_data, self.correct_country)
+        if telemetry.sink.enabled:
+            telemetry.sink.emit('guess', country=country_name, n=len(self.guesses),
+                                hints=self.hint_statuses(country_data),
+                                remaining=self.remaining_candidates())
         if country_name == self.correct_country.name:
             self.won = True
             self.game_over = True
@@ -233,39 +559,63 @@ class GeodleGame:
                 self.spawn_confetti()
             except Exception:
                 pass
-        elif len(self.guesses) >= self.max_guesses:
+        elif self.max_guesses and len(self.guesses) >= self.max_guesses:
             self.game_over = True
+        latency.tracer.mark('guess')
         return True
 
-    def is_approx_equal(self, a: float, b: float, max_diff_percent: float = 0.1) -> bool:
-        avg = (a + b) / 2
-        if avg == 0:
-            return a == b
-        percent_diff = abs(a - b) / avg
-        return percent_diff <= max_diff_percent
-
-    def get_hint_indicator(self, correct_val, guess_val) -> str:
-        if isinstance(correct_val, bool) or isinstance(correct_val, str):
-            return 'correct' if correct_val == guess_val else 'wrong'
-        if self.is_approx_equal(correct_val, guess_val):
-            return 'correct'
-        elif guess_val < correct_val:
-            return 'higher'
-        else:
-            return 'lower'
+    def swap_database(self, database) -> bool:
+        # Moves this game onto a reloaded dataset by name. A game whose target
+        # or guesses were removed stays on the database it started with, and
+        # the reloaded one waits in pending_database for the next game.
+        names = [self.correct_country.name] + [g.name for g in self.guesses]
+        if any(name not in database.countries for name in names):
+            self.pending_database = database
+            return False
+        self.pending_database = None
+        self.database = database
+        self.correct_country = database.countries[names[0]]
+        self.guesses = [database.countries[name] for name in names[1:]]
+        self.candidates = database.candidate_mask(self.guesses, self.correct_country)
+        if self.current_input:
+            self.suggestions = database.search_countries(self.current_input)
+            self.selected_suggestion = min(self.selected_suggestion, max(0, len(self.suggestions) - 1))
+        return True
+
+    def next_database(self):
+        # The dataset a restart should use: a reload this game couldn't take,
+        # else the one it is playing on.
+        return self.pending_database or self.database
+
+    def hint_statuses(self, guess) -> List[str]:
+        return hint_statuses(guess, self.correct_country)
+
+    def distance_hint(self, guess):
+        # (km, bearing) from the guess to the target, or None without coordinates.
+        db = self.database
+        if not db.has_coordinates:
+            return None
+        return db.geo().lookup(db.row_of[guess.name], db.row_of[self.correct_country.name])
+
+    def remaining_candidates(self) -> int:
+        return bin(self.candidates).count('1')
+
+    def candidate_names(self, limit=None) -> List[str]:
+        return [c.name for c in self.database.rows_in(self.candidates, limit)]
 
     def update(self):
+        # One fixed simulation step of SIM_DT seconds.
         if self.error_timer > 0:
             self.error_timer -= 1
             if self.error_timer == 0:
                 self.error_message = ""
         try:
-            self.update_confetti(1.0 / FPS)
+            self.update_confetti(SIM_DT)
         except Exception:
             pass
 
     def spawn_confetti(self):
-        cx = WINDOW_WIDTH // 2
+        cx = self.viewport[0] // 2
         for _ in range(140):
             angle = random.uniform(-math.pi, 0)
             speed = random.uniform(120, 300)
@@ -274,85 +624,192 @@ class GeodleGame:
             size = random.randint(3, 6)
             color = random.choice(CONFETTI_COLS)
             life = random.uniform(1.2, 2.0)
-            self.particles.append([cx + random.uniform(-60, 60), 60, vx, vy, size, color, life])
+            x = cx + random.uniform(-60, 60)
+            # The last two fields are the previous step's position.
+            self.particles.append([x, 60, vx, vy, size, color, life, x, 60])
 
     def update_confetti(self, dt: float):
         gravity = 400
         new = []
         for p in self.particles:
-            x, y, vx, vy, s, color, life = p
+            x, y, vx, vy, s, color, life = p[:7]
+            px, py = x, y
             vy += gravity * dt
             x += vx * dt
             y += vy * dt
             life -= dt
-            if life > 0 and y < WINDOW_HEIGHT + 20:
-                new.append([x, y, vx, vy, s, color, life])
+            if life > 0 and y < self.viewport[1] + 20:
+                new.append([x, y, vx, vy, s, color, life, px, py])
         self.particles = new
 
 
+class LayoutNode:
+    __slots__ = ('name', 'rect', 'children', 'data')
+
+    def __init__(self, name, rect, children=None, **data):
+        self.name = name
+        self.rect = rect
+        self.children = children or []
+        self.data = data
+
+    def walk(self):
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+class HitIndex:
+    # Uniform grid over the window. Each bucket keeps the widgets overlapping
+    # it sorted topmost-first, so resolving a point scans a handful of entries.
+    def __init__(self, size, cell=32):
+        self.cell = cell
+        self.cols = max(1, (size[0] + cell - 1) // cell)
+        self.rows = max(1, (size[1] + cell - 1) // cell)
+        self.buckets = {}
+
+    def _cells(self, rect):
+        c0 = clamp(rect.left // self.cell, 0, self.cols - 1)
+        c1 = clamp((rect.right - 1) // self.cell, 0, self.cols - 1)
+        r0 = clamp(rect.top // self.cell, 0, self.rows - 1)
+        r1 = clamp((rect.bottom - 1) // self.cell, 0, self.rows - 1)
+        for cy in range(r0, r1 + 1):
+            for cx in range(c0, c1 + 1):
+                yield cy * self.cols + cx
+
+    def add(self, name, rect, z=0, layer='base', resolve=None):
+        entry = (z, name, rect, layer, resolve)
+        for cell in self._cells(rect):
+            bucket = self.buckets.setdefault(cell, [])
+            bucket.append(entry)
+            bucket.sort(key=lambda e: -e[0])
+
+    def remove(self, name, rect):
+        for cell in self._cells(rect):
+            bucket = self.buckets.get(cell)
+            if bucket:
+                bucket[:] = [e for e in bucket if e[1] != name]
+
+    def query(self, pos, layers=('base',)):
+        x, y = pos
+        if x < 0 or y < 0:
+            return None, None
+        cx, cy = x // self.cell, y // self.cell
+        if cx >= self.cols or cy >= self.rows:
+            return None, None
+        for z, name, rect, layer, resolve in self.buckets.get(cy * self.cols + cx, ()):
+            if layer in layers and rect.collidepoint(x, y):
+                return name, (resolve(x, y) if resolve else None)
+        return None, None
+
+
+class Layout:
+    # Widget geometry for one (window size, UI state) combination. Built by
+    # UI._compute_layout and read by drawing and hit-testing. Nodes carrying
+    # a ``z`` are registered in the hit index.
+    def __init__(self, key, root):
+        self.key = key
+        self.root = root
+        # (rows shown, scrollable) of the suggestion dropdown attached by
+        # UI._place_dropdown; a new layout has none.
+        self.dropdown_shape = (0, False)
+        self.index = {}
+        self.hits = HitIndex(root.rect.size)
+        self._register(root)
+
+    def _register(self, node):
+        for n in node.walk():
+            self.index[n.name] = n
+            if 'z' in n.data:
+                self.hits.add(n.name, n.rect, n.data['z'], n.data.get('layer', 'base'), n.data.get('resolve'))
+
+    def attach(self, parent, node):
+        # Puts ``node`` under ``parent`` in place of any node of the same
+        # name, keeping the index and hit grid in step. For widgets that
+        # change between frames without invalidating the rest.
+        self.detach(node.name)
+        self.index[parent].children.append(node)
+        self._register(node)
+
+    def detach(self, name):
+        node = self.index.get(name)
+        if node is None:
+            return
+        for parent in self.index.values():
+            if node in parent.children:
+                parent.children.remove(node)
+                break
+        for n in node.walk():
+            del self.index[n.name]
+            if 'z' in n.data:
+                self.hits.remove(n.name, n.rect)
+
+    def node(self, name):
+        return self.index.get(name)
+
+    def rect(self, name):
+        node = self.index.get(name)
+        return node.rect if node is not None else None
+
+
 class UI:
     def __init__(self, screen, game):
         ui_init(self, screen, game)
 
     def render(self):
+        if self._game_over_layer is not None and self._game_over_key == self._game_over_cache_key():
+            self.screen.blit(self._game_over_layer, (0, 0))
+            self._draw_particles()
+            self._draw_latency()
+            return
+        L = self._ensure_layout()
         self.screen.fill(GEODLE_BG)
-        sw, sh = self.screen.get_size()
-        cx = sw // 2
-        left = cx - self.max_width // 2
-        y = 32
         try:
+            logo = L.rect('logo')
             if getattr(self, 'logo_surf', None):
-                self.screen.blit(self.logo_surf, (self.logo_rect.left + 4, self.logo_rect.top + 4))
+                self.screen.blit(self.logo_surf, (logo.left + 4, logo.top + 4))
             else:
-                draw_round_rect(self.screen, self.logo_rect, ACCENT, radius=8, width=0)
-                pygame.draw.rect(self.screen, BORDER, self.logo_rect, width=1, border_radius=8)
-                ltxt = self.f_small.render("LOGO", True, INK_500)
-                self.screen.blit(ltxt, (self.logo_rect.left + 10, self.logo_rect.centery - ltxt.get_height()//2))
-            y = max(y, self.logo_rect.bottom + 8)
+                draw_panel(self.screen, logo, ACCENT, BORDER, radius=8)
+                ltxt = self.text(self.f_small, "LOGO", INK_500)
+                self.screen.blit(ltxt, (logo.left + 10, logo.centery - ltxt.get_height()//2))
         except Exception:
-            y = 32
+            pass
 
         # Title
-        y = self._draw_title(left, y)
+        self._draw_title(L)
 
+        made = len(getattr(self.game, 'guesses', []) or [])
+        max_guesses = getattr(self.game, 'max_guesses', 6)
+        if max_guesses:
+            rem_text = f"{max_guesses - made} guesses remaining"
+        else:
+            rem_text = f"Practice mode: {made} guesses"
         try:
-            remaining = getattr(self.game, 'max_guesses', 6) - len(getattr(self.game, 'guesses', []) or [])
+            left = self.game.remaining_candidates()
+            rem_text += f" \u00b7 {left} {'country' if left == 1 else 'countries'} still possible"
         except Exception:
-            remaining = 6
-        rem_s = self.f_small.render(f"{remaining} guesses remaining", True, INK_700)
-        rem_rect = rem_s.get_rect()
-        rem_rect.centerx = self.screen.get_width() // 2
-        rem_rect.top = y
-        self.screen.blit(rem_s, rem_rect)
-        y = rem_rect.bottom + 8
-
-        y += 10
-        y = self._draw_search(left, y)
-        y += 12
-        y += 8
-        self._draw_table(left, y, sw)
+            pass
+        rem_s = self.text(self.f_small, rem_text, INK_700)
+        rem_box = L.rect('remaining')
+        self.screen.blit(rem_s, rem_s.get_rect(centerx=rem_box.centerx, top=rem_box.top))
+
+        self._draw_opponents()
+        self._draw_search(L)
+        self._draw_table(L)
         self._draw_suggestions_overlay()
         self._draw_blinking_caret()
 
-        try:
-            for x, y, vx, vy, s, color, life in getattr(self.game, 'particles', []):
-                pygame.draw.rect(self.screen, color, pygame.Rect(int(x), int(y), s, s))
-        except Exception:
-            pass
-
         try:
             tooltip_lines = self._hover_tooltip_text()
             if tooltip_lines:
-                mx, my = pygame.mouse.get_pos()
+                mx, my = self.mouse_pos
                 padx, pady = 10, 6
-                texts = [self.f_small.render(line, True, INK_900) for line in tooltip_lines]
+                texts = [self.text(self.f_small, line, INK_900) for line in tooltip_lines]
                 w = max(t.get_width() for t in texts) + padx*2
                 h = sum(t.get_height() for t in texts) + pady*(len(texts)+1)
                 tx = clamp(mx + 16, 8, self.screen.get_width() - w - 8)
                 ty = clamp(my + 16, 8, self.screen.get_height() - h - 8)
                 trect = pygame.Rect(tx, ty, w, h)
-                draw_round_rect(self.screen, trect, WHITE, radius=6, width=0)
-                pygame.draw.rect(self.screen, BORDER, trect, width=1, border_radius=6)
+                draw_panel(self.screen, trect, WHITE, BORDER, radius=6)
                 yy = ty + pady
                 for t in texts:
                     self.screen.blit(t, (tx + padx, yy))
@@ -361,55 +818,331 @@ class UI:
             pass
 
         self._draw_game_over()
+        self._draw_particles()
+        self._draw_latency()
+
+    def on_resize(self, screen=None):
+        self.screen = screen or pygame.display.get_surface() or self.screen
+        self.layout = None
+
+    def _layout_key(self):
+        guesses = getattr(self.game, 'guesses', []) or []
+        return (self.screen.get_size(), bool(self.show_help),
+                bool(guesses), getattr(self.game, 'max_guesses', 6), self._show_distance())
+
+    def _ensure_layout(self):
+        key = self._layout_key()
+        if self.layout is None or self.layout.key != key:
+            self.layout = self._compute_layout(key)
+        self._place_dropdown(self.layout)
+        try:
+            self.game.viewport = key[0]
+        except Exception:
+            pass
+        return self.layout
+
+    def _place_dropdown(self, L):
+        # The suggestion dropdown grows and shrinks as you type, so it is
+        # fitted onto the cached layout instead of being part of its key.
+        total = len(getattr(self.game, 'suggestions', []) or [])
+        shape = (min(6, total), total > 6)
+        if L.dropdown_shape == shape:
+            return
+        L.dropdown_shape = shape
+        max_show, scrollable = shape
+        if not max_show:
+            L.detach('dropdown')
+            return
+        inp = L.rect('input')
+        drop_h = max_show * self.cell_h
+        drop = pygame.Rect(inp.left, inp.bottom + 6, inp.width, drop_h)
+        children = [LayoutNode('sugg_list', drop.inflate(-8, -8), z=21, resolve=self._sugg_index_at)]
+        if scrollable:
+            children.append(LayoutNode('sugg_track', pygame.Rect(drop.right - 10, drop.top + 10, 6, drop_h - 20), z=22))
+        L.attach('search', LayoutNode('dropdown', drop, children, z=20, max_show=max_show))
+
+    def _compute_layout(self, key):
+        (sw, sh), show_help, has_guesses, max_guesses, _ = key
+        help_mode = show_help and not has_guesses
+        content_w = clamp(sw - 40, min(640, self.max_width), self.max_width)
+        cx = sw // 2
+        left = cx - content_w // 2
+        nodes = []
+
+        logo = LayoutNode('logo', pygame.Rect(self.logo_rect))
+        nodes.append(logo)
+        y = max(32, logo.rect.bottom + 8)
+
+        title_s = self.f_title.render("Geodle", True, PRIMARY)
+        sub_s = self.f_sub.render("A Wordle-ish geography game", True, INK_700)
+        trect = title_s.get_rect(centerx=cx, top=y)
+        srect = sub_s.get_rect(centerx=cx, top=trect.bottom + 2)
+        nodes.append(LayoutNode('header', trect.union(srect), [
+            LayoutNode('title', trect, surf=title_s),
+            LayoutNode('subtitle', srect, surf=sub_s),
+        ]))
+        y = srect.bottom + 16
+
+        remaining = pygame.Rect(left, y, content_w, self.f_small.size("0 guesses remaining")[1])
+        nodes.append(LayoutNode('remaining', remaining, z=10))
+        y = remaining.bottom + 8 + 10
+
+        input_w = int(content_w * 0.7)
+        submit_w = 110
+        gap = 8
+        total_w = input_w + gap + submit_w
+        group_left = cx - total_w // 2
+        inp = pygame.Rect(group_left, y, input_w, self.input_h)
+        submit = pygame.Rect(inp.right + gap, y, submit_w, self.input_h)
+        search = LayoutNode('search', inp.union(submit), [
+            LayoutNode('input', inp, z=10),
+            LayoutNode('submit', submit, z=10),
+        ])
+        nodes.append(search)
+        y = max(submit.bottom, inp.bottom) + 12 + 12 + 8
+
+        base_cols = self._g_cols()
+        scale = content_w / float(sum(base_cols))
+        cols = [int(w * scale) for w in base_cols]
+        cols[-1] += content_w - sum(cols)
+        col_x = []
+        x = left
+        for w in cols:
+            col_x.append(x)
+            x += w
+
+        table_children = []
+        if help_mode:
+            panel, header_off = self._render_help_panel(cols, intro=True)
+            help_rect = pygame.Rect(left, y, content_w, panel.get_height())
+            table_children.append(LayoutNode('help', help_rect, surf=panel))
+            header_top = y + header_off
+            rows_top = header_top + self.table_header_h + self.table_border
+            rows = 0
+        else:
+            header_top = y
+            rows_top = y + self.table_header_h + self.table_border
+            # Only rows that fit in the window are laid out; longer histories
+            # scroll through them (see _draw_table).
+            rows = max(1, (sh - rows_top - 16) // self.row_h)
+            if max_guesses:
+                rows = min(rows, max_guesses)
+            table_children.append(LayoutNode('table_header',
+                                             pygame.Rect(left, header_top, content_w, self.table_header_h),
+                                             surf=self._render_header_strip(cols)))
+            if not has_guesses:
+                panel, _ = self._render_help_panel(cols, intro=False)
+                table_children.append(LayoutNode('example', pygame.Rect(left, rows_top, content_w, panel.get_height()),
+                                                 surf=panel))
+        cells = []
+        for i in range(rows):
+            ry = rows_top + i * self.row_h
+            cells.append([pygame.Rect(col_x[c], ry, cols[c], self.row_h) for c in range(len(cols))])
+        col_of_x = bytearray()
+        for c, w in enumerate(cols):
+            col_of_x.extend([c] * w)
+        row_h = self.row_h
+
+        def cell_at(x, y):
+            return (y - rows_top) // row_h, col_of_x[x - left]
+
+        rows_rect = pygame.Rect(left, rows_top, content_w, rows * self.row_h)
+        if rows:
+            table_children.append(LayoutNode('rows', rows_rect, cells=cells, z=10, resolve=cell_at))
+        else:
+            table_children.append(LayoutNode('rows', rows_rect, cells=cells))
+        nodes.append(LayoutNode('table', pygame.Rect(left, header_top, content_w, rows_top - header_top + rows * self.row_h),
+                                table_children, cols=cols, col_x=col_x, rows_top=rows_top, help_mode=help_mode))
+
+        modal_w = 560
+        modal_h = 260
+        stats_h = 110 if self.stats is not None else 0
+        modal = pygame.Rect((sw - modal_w)//2, (sh - modal_h - stats_h)//2, modal_w, modal_h + stats_h)
+        btn_w = 160
+        btn_h = 44
+        nodes.append(LayoutNode('backdrop', pygame.Rect(0, 0, sw, sh), [
+            LayoutNode('modal', modal, [
+                LayoutNode('stats', pygame.Rect(modal.left + 40, modal.top + 100, modal_w - 80, stats_h)),
+                LayoutNode('restart', pygame.Rect(modal.left + 80, modal.bottom - 80, btn_w, btn_h), z=32, layer='modal'),
+                LayoutNode('quit', pygame.Rect(modal.right - 80 - btn_w, modal.bottom - 80, btn_w, btn_h), z=32, layer='modal'),
+            ], z=31, layer='modal'),
+        ], z=30, layer='modal'))
+
+        return Layout(key, LayoutNode('root', pygame.Rect(0, 0, sw, sh), nodes))
+
+    def _draw_latency(self):
+        # Latency histograms in the bottom-left corner, rebuilt a few times
+        # a second so the overlay doesn't add to the lag it is measuring.
+        if not (self.show_latency and latency.tracer.enabled):
+            return
+        now = self.now_ms()
+        if self._latency_panel is None or now - self._latency_at >= latency.REFRESH_MS:
+            self._latency_panel = self._build_latency_panel(latency.tracer.summary())
+            self._latency_at = now
+        self.screen.blit(self._latency_panel, (12, self.screen.get_height() - self._latency_panel.get_height() - 12))
+
+    def _build_latency_panel(self, summary):
+        rows = [["dequeue to flip, ms", "n", "p50", "p95", "p99", "max"]]
+        for label, st in summary.items():
+            rows.append([label, str(st['n'])] + [f"{st[k]:.1f}" for k in ('p50_ms', 'p95_ms', 'p99_ms', 'max_ms')])
+        if len(rows) == 1:
+            rows.append(["no input yet"] + [""] * 5)
+        cells = [[self.f_small.render(text, True, WHITE if r else INK_500) for text in row]
+                 for r, row in enumerate(rows)]
+        widths = [max(row[c].get_width() for row in cells) for c in range(len(rows[0]))]
+        gap, pad, bar_w = 14, 8, 120
+        line_h = max(t.get_height() for row in cells for t in row) + 2
+        w = pad * 2 + sum(widths) + gap * len(widths) + bar_w
+        h = line_h * len(cells) + pad
+        panel = pygame.Surface((w, h), pygame.SRCALPHA)
+        panel.fill((22, 22, 22, 210))
+        for r, row in enumerate(cells):
+            x, y = pad, pad // 2 + r * line_h
+            for c, t in enumerate(row):
+                # Label left-aligned, numbers right-aligned.
+                panel.blit(t, (x if c == 0 else x + widths[c] - t.get_width(), y))
+                x += widths[c] + gap
+        # Each row's histogram over 0..50 ms in 2.5 ms columns; a column's
+        # height is its share of the row's events, and anything slower than
+        # a frame is drawn in yellow.
+        x0 = w - pad - bar_w
+        columns = bar_w // 3
+        per = int(50.0 / latency.BUCKET_MS) // columns
+        for r, (label, hist) in enumerate(sorted(latency.tracer.histograms.items()), start=1):
+            base = pad // 2 + (r + 1) * line_h - 3
+            pygame.draw.line(panel, INK_500, (x0, base), (x0 + bar_w, base))
+            for b in range(columns):
+                c = sum(hist.counts[b * per:(b + 1) * per])
+                if c:
+                    bh = max(1, int((line_h - 4) * c / hist.n))
+                    color = YELLOW if b * per * latency.BUCKET_MS >= 1000.0 / FPS else GREEN
+                    pygame.draw.rect(panel, color, (x0 + b * 3, base - bh, 2, bh))
+        return panel
+
+    def text(self, font, s, color):
+        # Text drawn every frame comes from a small LRU, so a frame reuses
+        # last frame's surfaces (and, on the texture renderer, textures).
+        key = (id(font), s, color)
+        surf = self._text.get(key)
+        if surf is None:
+            surf = font.render(s, True, color)
+            self._text[key] = surf
+            if len(self._text) > MAX_TEXT:
+                self._text.popitem(last=False)
+        else:
+            self._text.move_to_end(key)
+        return surf
+
+    def tick(self):
+        # One simulation step of UI animation.
+        self._sugg_scroll_prev = self._sugg_scroll
+        self._sugg_scroll += (self._sugg_scroll_target - self._sugg_scroll) * SCROLL_EASE
+
+    def animating(self) -> bool:
+        return abs(self._sugg_scroll_target - self._sugg_scroll) > 1e-3
+
+    def _draw_particles(self):
+        # Each particle is drawn between its last two simulated positions.
+        a = self.alpha
+        try:
+            for x, y, vx, vy, s, color, life, px, py in getattr(self.game, 'particles', []):
+                self.screen.fill(color, pygame.Rect(int(px + (x - px) * a), int(py + (y - py) * a), s, s))
+        except Exception:
+            pass
+
+    def hit_test(self, pos):
+        layers = ('base', 'modal') if getattr(self.game, 'game_over', False) else ('base',)
+        return self._ensure_layout().hits.query(pos, layers)
+
+    def _sugg_index_at(self, x, y):
+        inner = self.layout.rect('sugg_list')
+        start = int(math.floor(self._sugg_scroll))
+        i = int(math.floor((y - inner.top) / float(self.cell_h) + (self._sugg_scroll - start)))
+        max_show = self.layout.node('dropdown').data['max_show']
+        return start + clamp(i, 0, max_show - 1)
+
+    def _restart(self):
+        if self.restart_hook is not None:
+            self.restart_hook()
+            return
+        telemetry.sink.emit('restart', source='button')
+        try:
+            new_game = enhance(practice=getattr(self.game, 'practice', False),
+                               database=self.game.next_database(), daily=self.game.daily)
+            self.forget_rows()
+
+            try:
+                existing = self.game
+                for k in list(existing.__dict__.keys()):
+                    if k not in new_game.__dict__:
+                        del existing.__dict__[k]
+                for k, v in new_game.__dict__.items():
+                    existing.__dict__[k] = v
+            except Exception:
+                self.game = new_game
+            try:
+                print(f"\nToday's country: {new_game.correct_country.name}")
+            except Exception:
+                pass
+            self.input_focused = False
+        except Exception:
+            pass
+
+    def _scroll_suggestions(self, delta, total):
+        max_show = min(6, total)
+        sel = getattr(self.game, 'selected_suggestion', 0)
+        sel = clamp(int(sel + delta), 0, total - 1)
+        self.game.selected_suggestion = sel
+        if sel < self.sugg_scroll_idx:
+            self.sugg_scroll_idx = sel
+        elif sel >= self.sugg_scroll_idx + max_show:
+            self.sugg_scroll_idx = sel - max_show + 1
+        self._sugg_scroll_target = float(self.sugg_scroll_idx)
+        self._sugg_scroll = self._sugg_scroll_prev = float(self.sugg_scroll_idx)
 
     def handle_mouse(self, event):
-        if event.type == pygame.MOUSEMOTION:
+        if hasattr(event, 'pos'):
+            self.mouse_pos = event.pos
+        if event.type == pygame.MOUSEMOTION and getattr(self, '_dragging_sugg_thumb', False):
+            track = self._ensure_layout().rect('sugg_track')
+            if track is None or getattr(self, '_suggest_thumb_rect', None) is None:
+                self._dragging_sugg_thumb = False
+                return
+            thumb_h = self._suggest_thumb_rect.height
+            new_top = clamp(event.pos[1] - self._drag_thumb_offset, track.top, track.bottom - thumb_h)
+            prop = (new_top - track.top) / max(1, (track.height - thumb_h))
+            total = len(getattr(self.game, 'suggestions', []) or [])
+            max_show = min(6, total)
+            max_start = max(0, total - max_show)
+            self.sugg_scroll_idx = int(round(prop * max_start))
+            return
+
+        elif event.type == pygame.MOUSEMOTION:
             self._update_hover_row(event.pos)
 
         elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
-            if getattr(self, '_restart_rect', None) and self._restart_rect.collidepoint(event.pos):
-                try:
-                    new_game = enhance()
-                    
-                    try:
-                        existing = self.game
-                        for k in list(existing.__dict__.keys()):
-                            if k not in new_game.__dict__:
-                                del existing.__dict__[k]
-                        for k, v in new_game.__dict__.items():
-                            existing.__dict__[k] = v
-                    except Exception:
-                        self.game = new_game
-                    try:
-                        print(f"\nToday's country: {new_game.correct_country.name}")
-                    except Exception:
-                        pass
-                    self._sugg_rects = []
-                    self.input_focused = False
-                except Exception:
-                    pass
+            name, cell = self.hit_test(event.pos)
+            if name == 'restart':
+                self._restart()
+                return
+            if name == 'quit':
+                self.quit_requested = True
+                return
+            if name in ('backdrop', 'modal'):
                 return
-            if getattr(self, '_quit_rect', None) and self._quit_rect.collidepoint(event.pos):
-                try:
-                    pygame.quit()
-                    import sys
-                    sys.exit(0)
-                except SystemExit:
-                    raise
 
-            # Submit
-            if self._submit_rect.collidepoint(event.pos):
+            if name == 'sugg_list':
+                self.game.selected_suggestion = cell
                 self._try_submit()
-                self.input_focused = False
+                return
 
-            for idx, r in enumerate(self._sugg_rects):
-                if r.collidepoint(event.pos):
-                    self.game.selected_suggestion = self.sugg_scroll_idx + idx
-                    self._try_submit()
+            if name == 'sugg_track':
+                thumb = getattr(self, '_suggest_thumb_rect', None)
+                if thumb is not None and thumb.collidepoint(event.pos):
+                    self._dragging_sugg_thumb = True
+                    self._drag_thumb_offset = event.pos[1] - thumb.top
                     return
-
-            if getattr(self, '_suggest_track_rect', None) and self._suggest_track_rect.collidepoint(event.pos):
-                track = self._suggest_track_rect
+                track = self.layout.rect('sugg_track')
                 rel = (event.pos[1] - track.top) / max(1, track.height)
                 total = len(getattr(self.game, 'suggestions', []))
                 max_show = min(6, total)
@@ -417,23 +1150,30 @@ class UI:
                 self.sugg_scroll_idx = clamp(new_start, 0, max(0, total - max_show))
                 return
 
-            if getattr(self, '_suggest_thumb_rect', None) and self._suggest_thumb_rect.collidepoint(event.pos):
-                self._dragging_sugg_thumb = True
-                self._drag_thumb_offset = event.pos[1] - self._suggest_thumb_rect.top
+            if name == 'dropdown':
                 return
 
-            if self._input_rect.collidepoint(event.pos):
+            # Submit
+            if name == 'submit':
+                self._try_submit()
+
+            if name == 'input':
                 self.input_focused = True
             else:
                 self.input_focused = False
                 self.game.suggestions = []
 
         elif event.type == pygame.MOUSEWHEEL:
-            if getattr(self, '_suggest_drop_rect', None) and self._suggest_drop_rect.collidepoint(pygame.mouse.get_pos()):
+            pos = self.mouse_pos
+            name, _ = self.hit_test(pos)
+            if name == 'rows':
+                self._scroll_table(-int(event.y))
+                self._update_hover_row(pos)
+                return
+            if name in ('dropdown', 'sugg_list', 'sugg_track'):
                 total = len(getattr(self.game, 'suggestions', []) or [])
                 if total:
-                    max_show = min(6, total)
-                    now = pygame.time.get_ticks()
+                    now = self.now_ms()
                     dt_ms = max(1, now - getattr(self, '_last_wheel_time', now))
                     self._last_wheel_time = now
                     delta = -float(event.y)
@@ -449,84 +1189,53 @@ class UI:
                         moved -= 1
 
                     if moved != 0:
-                        sel = getattr(self.game, 'selected_suggestion', 0)
-                        sel = clamp(int(sel + moved), 0, total - 1)
-                        self.game.selected_suggestion = sel
-                        if sel < self.sugg_scroll_idx:
-                            self.sugg_scroll_idx = sel
-                        elif sel >= self.sugg_scroll_idx + max_show:
-                            self.sugg_scroll_idx = sel - max_show + 1
-                        self._sugg_scroll_target = float(self.sugg_scroll_idx)
-                        self._sugg_scroll = float(self.sugg_scroll_idx)
+                        self._scroll_suggestions(moved, total)
                 return
 
         elif event.type == pygame.MOUSEBUTTONDOWN and event.button in (4, 5):
-            try:
-                pos = pygame.mouse.get_pos()
-            except Exception:
-                pos = getattr(event, 'pos', None)
-            if pos and getattr(self, '_suggest_drop_rect', None) and self._suggest_drop_rect.collidepoint(pos):
+            pos = self.mouse_pos
+            name, _ = self.hit_test(pos) if pos else (None, None)
+            if name == 'rows':
+                self._scroll_table(-1 if event.button == 4 else 1)
+                return
+            if name in ('dropdown', 'sugg_list', 'sugg_track'):
                 total = len(getattr(self.game, 'suggestions', []) or [])
                 if total:
-                    max_show = min(6, total)
-                    delta = -1 if event.button == 4 else 1
-                    sel = getattr(self.game, 'selected_suggestion', 0)
-                    sel = clamp(int(sel + delta), 0, total - 1)
-                    self.game.selected_suggestion = sel
-                    if sel < self.sugg_scroll_idx:
-                        self.sugg_scroll_idx = sel
-                    elif sel >= self.sugg_scroll_idx + max_show:
-                        self.sugg_scroll_idx = sel - max_show + 1
-                    self._sugg_scroll_target = float(self.sugg_scroll_idx)
-                    self._sugg_scroll = float(self.sugg_scroll_idx)
+                    self._scroll_suggestions(-1 if event.button == 4 else 1, total)
                 return
 
-        elif event.type == pygame.MOUSEMOTION and getattr(self, '_dragging_sugg_thumb', False):
-            if getattr(self, '_suggest_track_rect', None) is None or getattr(self, '_suggest_thumb_rect', None) is None:
-                return
-            track = self._suggest_track_rect
-            thumb_h = self._suggest_thumb_rect.height
-            new_top = clamp(event.pos[1] - self._drag_thumb_offset, track.top, track.bottom - thumb_h)
-            prop = (new_top - track.top) / max(1, (track.height - thumb_h))
-            total = len(getattr(self.game, 'suggestions', []) or [])
-            max_show = min(6, total)
-            max_start = max(0, total - max_show)
-            self.sugg_scroll_idx = int(round(prop * max_start))
-            return
-
         elif event.type == pygame.MOUSEBUTTONUP and event.button == 1 and getattr(self, '_dragging_sugg_thumb', False):
             self._dragging_sugg_thumb = False
             return
 
     def _update_hover_row(self, pos):
-        table_top = getattr(self, "_table_top", None)
-        table_cols = getattr(self, "_table_cols", [])
-        rows = getattr(self, "_table_rows", 0)
-        self.hover_col = -1
-        if not table_top:
-            self.hover_row = -1
-            return
-        x, y = pos
-        left, top = table_top
-        if x < left or x > left + sum(table_cols):
-            self.hover_row = -1
-            return
-        header_h = self.table_header_h + self.table_border
-        y_rel = y - (top + header_h)
-        if y_rel < 0:
+        name, cell = self.hit_test(pos)
+        self.hover_widget = name
+        rows = len(getattr(self.game, 'guesses', []) or [])
+        row = cell[0] + self.table_scroll if name == 'rows' else -1
+        if 0 <= row < rows:
+            self.hover_row, self.hover_col = row, cell[1]
+        else:
             self.hover_row = -1
-            return
-        row = int(y_rel // self.row_h)
-        self.hover_row = row if 0 <= row < rows else -1
-        cx = left
-        col_idx = 0
-        for w in table_cols:
-            if x >= cx and x < cx + w:
-                self.hover_col = col_idx
-                break
-            cx += w
-            col_idx += 1
-        return
+            self.hover_col = -1
+
+    def _load_logo(self):
+        try:
+            base = os.path.dirname(__file__)
+            logo_candidates = [
+                os.path.join(base, 'img', 'logo.png'),
+                os.path.join(base, 'logo.png'),
+            ]
+            for path in logo_candidates:
+                if os.path.exists(path):
+                    try:
+                        img = pygame.image.load(path).convert_alpha()
+                        self.logo_surf = img
+                        break
+                    except Exception:
+                        self.logo_surf = None
+        except Exception:
+            self.logo_surf = None
 
     def _init_fonts(self):
         pygame.font.init()
@@ -536,91 +1245,101 @@ class UI:
         self.f_small = pygame.font.SysFont("Inter, Helvetica, Arial", 14)
         self.f_button = pygame.font.SysFont("Inter, Helvetica, Arial", 16, bold=True)
 
-    def _draw_title(self, left, y):
-        title = self.f_title.render("Geodle", True, PRIMARY)
-        sub = self.f_sub.render("A Wordle-ish geography game", True, INK_700)
-        trect = title.get_rect()
-        srect = sub.get_rect()
-        sw = self.screen.get_width()
-        trect.centerx = sw // 2
-        srect.centerx = sw // 2
-        trect.top = y
-        srect.top = y + trect.height + 2
-        self.screen.blit(title, trect)
-        self.screen.blit(sub, srect)
-        return srect.bottom + 16
-
-    def _draw_search(self, left, y):
-        input_w = int(self.max_width * 0.7)
-        submit_w = 110
-        gap = 8
-        total_w = input_w + gap + submit_w
-        sw = self.screen.get_width()
-        group_left = sw // 2 - total_w // 2
-        self._input_rect = pygame.Rect(group_left, y, input_w, self.input_h)
-        self._submit_rect = pygame.Rect(self._input_rect.right + gap, y, submit_w, self.input_h)
+    def _draw_title(self, L):
+        for name in ('title', 'subtitle'):
+            node = L.node(name)
+            self.screen.blit(node.data['surf'], node.rect)
 
-        draw_round_rect(self.screen, self._input_rect, (0,0,0), radius=10, width=1)
-        draw_round_rect(self.screen, self._input_rect.inflate(-2,-2), ACCENT, radius=10, width=0)
+    def _draw_search(self, L):
+        inp = L.rect('input')
+        submit = L.rect('submit')
+        draw_panel(self.screen, inp, ACCENT, (0,0,0), radius=10)
         txt = self.game.current_input if getattr(self.game, "current_input", "") else ""
         if txt:
-            surf = self.f_label.render(txt, True, INK_900)
+            surf = self.text(self.f_label, txt, INK_900)
         else:
-            surf = self.f_label.render("Country", True, INK_500)
-        self.screen.blit(surf, (self._input_rect.left + 12, self._input_rect.centery - surf.get_height()//2))
+            surf = self.text(self.f_label, "Country", INK_500)
+        self.screen.blit(surf, (inp.left + 12, inp.centery - surf.get_height()//2))
 
         # Submit
-        draw_round_rect(self.screen, self._submit_rect, BTN_BG, radius=10, width=0)
-        sub = self.f_button.render("SUBMIT", True, BTN_TEXT)
-        self.screen.blit(sub, (self._submit_rect.centerx - sub.get_width()//2,
-                               self._submit_rect.centery - sub.get_height()//2))
-
-        # dropdown
-        self._sugg_rects = []
-        suggs = getattr(self.game, "suggestions", []) or []
-        if suggs:
-            max_show = min(6, len(suggs))
-            drop_h = max_show * self.cell_h
-            drop = pygame.Rect(self._input_rect.left, self._input_rect.bottom + 6,
-                               self._input_rect.width, drop_h)
-            pygame.draw.rect(self.screen, BORDER, drop, border_radius=10)
-            pygame.draw.rect(self.screen, (255,255,255), drop.inflate(-2,-2), border_radius=10)
-            for i in range(max_show):
-                r = pygame.Rect(drop.left+4, drop.top + i*self.cell_h + 4, drop.width-8, self.cell_h-6)
-                if i == getattr(self.game, "selected_suggestion", 0):
-                    pygame.draw.rect(self.screen, (240, 248, 255), r, border_radius=8)
-                label = self.f_small.render(suggs[i], True, INK_900)
-                self.screen.blit(label, (r.left + 10, r.centery - label.get_height()//2))
-                self._sugg_rects.append(r)
-
-        return max(self._submit_rect.bottom, self._input_rect.bottom) + 12
-
-    def _draw_help(self, left, y):
-        sw = self.screen.get_width()
-        # Title
-        title_surf = self.f_sub.render("How to Play", True, INK_900)
-        icon_r = 12
-        gap = 10
-        total_w = icon_r * 2 + gap + title_surf.get_width()
-        dx = sw // 2 - total_w // 2
-
-        icon_cx = dx + icon_r
-        icon_cy = y + title_surf.get_height() // 2
-        pygame.draw.circle(self.screen, INK_900, (icon_cx, icon_cy), icon_r)
-        try:
-            i_s = self.f_label.render("i", True, WHITE)
-            self.screen.blit(i_s, (icon_cx - i_s.get_width()//2, icon_cy - i_s.get_height()//2))
-        except Exception:
-            pass
+        draw_round_rect(self.screen, submit, BTN_BG, radius=10, width=0)
+        sub = self.text(self.f_button, "SUBMIT", BTN_TEXT)
+        self.screen.blit(sub, (submit.centerx - sub.get_width()//2,
+                               submit.centery - sub.get_height()//2))
+        # dropdown is drawn by _draw_suggestions_overlay
+
+    def _draw_header_cell(self, x, y, w, title, surf=None):
+        surf = surf or self.screen
+        rect = pygame.Rect(x, y, w, self.table_header_h)
+        pygame.draw.rect(surf, BORDER, rect, width=self.table_border)
+        label = self.f_small.render(title, True, INK_700)
+        surf.blit(label, (rect.centerx - label.get_width()//2, rect.centery - label.get_height()//2))
+        return rect
 
-        self.screen.blit(title_surf, (dx + icon_r*2 + gap, y))
-        y += title_surf.get_height() + 8
+    def _draw_hint_square(self, rect: pygame.Rect, status: str, extra: str = "", surf=None):
+        size = min(rect.width, rect.height) - 14
+        (surf or self.screen).blit(SHAPES.hint_tile(status, size), (rect.centerx - size // 2, rect.centery - size // 2))
 
-        help_lines = [
-            "Figure out the secret country in 6 guesses!",
-            "Each guess must be a country that appears in the search box.",
-            "After each guess, you get hints for Continent, Population, Landlocked, Religion, Avg. Temp., and Government.",
-        ]
+    def _show_distance(self) -> bool:
+        return bool(getattr(getattr(self.game, 'database', None), 'has_coordinates', False))
+
+    def _g_cols(self) -> List[int]:
+        cols = [210] + [c.width for c in SCHEMA]
+        if self._show_distance():
+            cols.append(150)
+        return cols
+
+    def _table_headers(self):
+        headers = ["Country"] + CountryData.get_headers()
+        if self._show_distance():
+            headers.append("Distance")
+        return headers
+
+    def _draw_distance_cell(self, rect: pygame.Rect, hint, surf=None):
+        surf = surf or self.screen
+        if hint is None:
+            label = self.f_small.render("\u2014", True, INK_500)
+            surf.blit(label, label.get_rect(center=rect.center))
+            return
+        km, bearing = hint
+        if km < 1.0:
+            self._draw_hint_square(rect, 'good', surf=surf)
+            return
+        label = self.f_small.render(f"{km:,.0f} km", True, INK_900)
+        r = 9
+        gap = 8
+        total = label.get_width() + gap + 2 * r
+        x = rect.centerx - total // 2
+        surf.blit(label, (x, rect.centery - label.get_height() // 2))
+        # Arrow pointing along the bearing; 0 degrees is up (north).
+        ax, ay = x + label.get_width() + gap + r, rect.centery
+        t = math.radians(bearing)
+        c, s = math.cos(t), math.sin(t)
+        shape = [(0, -r), (0.7 * r, 0.8 * r), (0, 0.35 * r), (-0.7 * r, 0.8 * r)]
+        pygame.draw.polygon(surf, BLUE, [(ax + px * c - py * s, ay + px * s + py * c) for px, py in shape])
+
+    def _render_header_strip(self, cols):
+        headers = self._table_headers()
+        strip = pygame.Surface((sum(cols), self.table_header_h))
+        strip.fill(GEODLE_BG)
+        hx = 0
+        for i, w in enumerate(cols):
+            # avoid header overflow
+            title = headers[i] if i < len(headers) else ""
+            self._draw_header_cell(hx, 0, w, title, surf=strip)
+            hx += w
+        return strip
+
+    def _render_help_panel(self, cols, intro=True):
+        # Static "How to Play" content, rendered once per layout. Returns the
+        # panel and the y offset of its example header row.
+        table_w = sum(cols)
+        panel = pygame.Surface((table_w, 1200))
+        panel.fill(GEODLE_BG)
+        headers = self._table_headers()
+        left = 0
+        hy = 0
+        header_y = 0
 
         def wrap_text(text, font, maxw):
             words = text.split()
@@ -638,328 +1357,226 @@ class UI:
                 lines.append(cur)
             return lines
 
-        col_w = min(self.max_width, sw - 120)
-        col_left = sw//2 - col_w//2
-        pad = 6
-        for line in help_lines:
-            wrapped = wrap_text(line, self.f_small, col_w - pad*2)
-            for l in wrapped:
-                s = self.f_small.render(l, True, INK_700)
-                self.screen.blit(s, (col_left + pad, y))
-                y += self.line_h - 6
-            y += 2
-        return y
-
-    def _draw_header_cell(self, x, y, w, title):
-        rect = pygame.Rect(x, y, w, self.table_header_h)
-        pygame.draw.rect(self.screen, BORDER, rect, width=self.table_border)
-        label = self.f_small.render(title, True, INK_700)
-        self.screen.blit(label, (rect.centerx - label.get_width()//2, rect.centery - label.get_height()//2))
-        return rect
-
-    def _draw_hint_square(self, rect: pygame.Rect, status: str, extra: str = ""):
-        if status not in ("good", "bad", "up", "down"):
-            status = "bad"
-
-        color = GREEN if status == "good" else (BLUE if status in ("up", "down") else RED)
-
-        size = min(rect.width, rect.height) - 14
-        x = rect.centerx - size // 2
-        y = rect.centery - size // 2
-        pygame.draw.rect(self.screen, color, (x, y, size, size), border_radius=6)
-
-        if status in ("up", "down"):
-            tri_h = size // 2
-            cx, cy = rect.centerx, rect.centery
-            pts = ([(cx, cy - tri_h // 2), (cx - tri_h // 2, cy + tri_h // 2), (cx + tri_h // 2, cy + tri_h // 2)]
-                if status == "up"
-                else [(cx, cy + tri_h // 2), (cx - tri_h // 2, cy - tri_h // 2), (cx + tri_h // 2, cy - tri_h // 2)])
-            pygame.draw.polygon(self.screen, (255, 255, 255), pts)
-
-    def _status_from_result(self, result, key) -> str:
-        val = result.get(key, None) if isinstance(result, dict) else getattr(result, key, None)
- 
-        if key in ("continent", "landlocked", "religion", "government"):
-            return "good" if val in ("match", True, "same") else "bad"
- 
-        if key == "population":
-            try:
-                fv = float(val)
-                if abs(fv) <= 0.10:
-                    return "good"
-                return "up" if fv < 0 else "down"
-            except Exception:
-                return "bad"
- 
-        if key == "temperature":
-            if val in ("up", "down"):
-                return val
-            return "good" if val in ("match", True) else "bad"
- 
-        return "bad"
-
-
-    def _g_cols(self) -> List[int]:
-        return [210, 120, 110, 120, 120, 140, 140]
-
-    def _draw_table(self, left, y, sw):
-        cols = self._g_cols()
-        if len(cols) < 7:
-            cols = [210, 120, 110, 120, 120, 140, 140]
-        self._table_cols = cols
-        x = left
-        top = y
-        raw_guesses = getattr(self.game, "guesses", []) or []
-        # headers
-        headers = ["Country", "Continent", "Population", "Landlocked", "Religion", "Avg. Temp.", "Gov."]
-        hx = x
-        if not (self.show_help and len(raw_guesses) == 0):
-            for i, w in enumerate(cols):
-                # avoid header overflow
-                title = headers[i] if i < len(headers) else ""
-                self._draw_header_cell(hx, y, w, title)
-                hx += w
-            y += self.table_header_h + self.table_border
-        guesses = []
-        for g in raw_guesses:
-            result = {}
-            correct = getattr(self.game, 'correct_country', None)
-            if correct:
-                result['continent'] = 'match' if getattr(g, 'continent', None) == getattr(correct, 'continent', None) else None
-                try:
-                    gv = float(getattr(g, 'population', 0))
-                    cv = float(getattr(correct, 'population', 1))
-                    result['population'] = (gv - cv) / max(abs(cv), 1)
-                except Exception:
-                    result['population'] = None
-                result['landlocked'] = 'match' if getattr(g, 'landlocked', None) == getattr(correct, 'landlocked', None) else None
-                result['religion'] = 'match' if getattr(g, 'religion', None) == getattr(correct, 'religion', None) else None
-                try:
-                    gv = float(getattr(g, 'temperature', 0.0))
-                    cv = float(getattr(correct, 'temperature', 0.0))
-                    if abs(gv - cv) <= 0.5:
-                        result['temperature'] = 'match'
-                    elif gv < cv:
-                        result['temperature'] = 'up'
-                    else:
-                        result['temperature'] = 'down'
-                except Exception:
-                    result['temperature'] = None
-                result['government'] = 'match' if getattr(g, 'government', None) == getattr(correct, 'government', None) else None
-
-            guesses.append((g, result))
-
-        if self.show_help and len(raw_guesses) == 0:
-            hy = top
-            sw = self.screen.get_width()
+        if intro:
             title_surf = self.f_sub.render("How to Play", True, INK_900)
             icon_r = 12
             gap = 10
             total_w = icon_r * 2 + gap + title_surf.get_width()
-            dx = sw // 2 - total_w // 2
+            dx = table_w // 2 - total_w // 2
             icon_cx = dx + icon_r
             icon_cy = hy + title_surf.get_height() // 2
 
-            pygame.draw.circle(self.screen, INK_900, (icon_cx, icon_cy), icon_r)
+            pygame.draw.circle(panel, INK_900, (icon_cx, icon_cy), icon_r)
 
             try:
                 i_s = self.f_label.render("i", True, WHITE)
-                self.screen.blit(i_s, (
+                panel.blit(i_s, (
                     icon_cx - i_s.get_width() // 2,
                     icon_cy - i_s.get_height() // 2
                 ))
             except Exception:
                 pass
 
-            self.screen.blit(title_surf, (dx + icon_r * 2 + gap, hy))
+            panel.blit(title_surf, (dx + icon_r * 2 + gap, hy))
             hy += title_surf.get_height() + 8
 
             help_lines = [
                 "Figure out the secret country in 6 guesses!",
                 "Each guess must be a country that appears in the search box.",
-                "After each guess, you get hints for Continent, Population, Landlocked, Religion, Avg. Temp., and Government.",
+                "After each guess, you get hints for "
+                + ", ".join(c.name for c in SCHEMA[:-1]) + f", and {SCHEMA[-1].name}.",
             ]
-            def wrap_text(text, font, maxw):
-                words = text.split()
-                lines = []
-                cur = ""
-                for w in words:
-                    test = (cur + " " + w).strip() if cur else w
-                    if font.size(test)[0] <= maxw:
-                        cur = test
-                    else:
-                        if cur:
-                            lines.append(cur)
-                        cur = w
-                if cur:
-                    lines.append(cur)
-                return lines
-
-            table_w = sum(cols)
+            if len(cols) > len(SCHEMA) + 1:
+                help_lines.append("The Distance column shows how far, and in which direction, the secret country is from your guess.")
             pad = 12
             for line in help_lines:
                 wrapped = wrap_text(line, self.f_small, table_w - pad*2)
                 for l in wrapped:
                     s = self.f_small.render(l, True, INK_700)
-                    self.screen.blit(s, (left + pad, hy))
+                    panel.blit(s, (left + pad, hy))
                     hy += self.line_h - 6
                 hy += 6
 
-            cap = self.f_small.render("For example:", True, INK_700)
-            self.screen.blit(cap, (left, hy))
-            hy += self.line_h - 6
+        cap = self.f_small.render("For example:", True, INK_700)
+        panel.blit(cap, (left, hy))
+        hy += self.line_h - 6
 
-            # draw headers at hy
+        if intro:
             header_y = hy
             hx = left
             for i, w in enumerate(cols):
                 title = headers[i] if i < len(headers) else ""
-                self._draw_header_cell(hx, header_y, w, title)
+                self._draw_header_cell(hx, header_y, w, title, surf=panel)
                 hx += w
             hy += self.table_header_h + self.table_border
 
-            example_name = "Australia"
-            statuses = ['bad', 'good', 'good', 'bad', 'up', 'bad']
-            row_rect = pygame.Rect(left, hy, sum(cols), self.row_h)
-            pygame.draw.rect(self.screen, (250,250,250), row_rect)
-            pygame.draw.rect(self.screen, BORDER, (left, hy, cols[0], self.row_h), width=self.table_border)
-            name_s = self.f_small.render(example_name, True, INK_900)
-            self.screen.blit(name_s, (left + 12, hy + (self.row_h - name_s.get_height())//2))
-            cx = left + cols[0]
-            for i, st in enumerate(statuses):
-                w = cols[i+1] if i+1 < len(cols) else 120
-                pygame.draw.rect(self.screen, BORDER, (cx, hy, w, self.row_h), width=self.table_border)
-                self._draw_hint_square(pygame.Rect(cx, hy, w, self.row_h), st)
-                cx += w
-            hy += self.row_h + 12
-
-            expl_lines = [
-                "You guess Australia, but it's in the wrong continent from the correct country.",
-                "The population is within 10% of the correct country's population, so it shows green.",
-                "Landlocked refers to whether the country is surrounded by land; both are coastal here (green).",
-                "Avg. Temp shows direction (blue arrow) when different; here target is higher (up).",
-                "Hover over the boxes to get information on your guess's data.",
-                "Hover over the category titles to get more information on what they mean."
-            ]
-            icons = ['bad', 'good', 'good', 'up', None, None]
-            ty = hy
-            icon_size = 18
-            icon_margin = 16
-            table_right = left + sum(cols)
-            for idx, line in enumerate(expl_lines):
-                s = self.f_small.render(line, True, INK_700)
-                self.screen.blit(s, (left + 12, ty))
-                st = icons[idx] if idx < len(icons) else None
-                if st:
-                    ix = table_right - icon_margin - icon_size
-                    iy = ty + (self.line_h - icon_size) // 2
-                    if st == 'good':
-                        pygame.draw.rect(self.screen, GREEN, pygame.Rect(ix, iy, icon_size, icon_size), border_radius=4)
-                    elif st == 'bad':
-                        pygame.draw.rect(self.screen, RED, pygame.Rect(ix, iy, icon_size, icon_size), border_radius=4)
-                    elif st in ('up', 'down'):
-                        color = BLUE
-                        cx = ix + icon_size // 2
-                        cy = iy + icon_size // 2
-                        tri_h = icon_size // 2
-                        if st == 'up':
-                            pts = [(cx, cy - tri_h // 2), (cx - tri_h // 2, cy + tri_h // 2), (cx + tri_h // 2, cy + tri_h // 2)]
-                        else:
-                            pts = [(cx, cy + tri_h // 2), (cx - tri_h // 2, cy - tri_h // 2), (cx + tri_h // 2, cy - tri_h // 2)]
-                        pygame.draw.rect(self.screen, color, pygame.Rect(ix, iy, icon_size, icon_size), border_radius=4)
-                        pygame.draw.polygon(self.screen, WHITE, pts)
-                ty += self.line_h - 4
-
-            self._table_rows = 0
-            self._table_top = (left, header_y)
+        guess, target = self._help_example()
+        statuses = hint_statuses(guess, target)
+        row_rect = pygame.Rect(left, hy, table_w, self.row_h)
+        pygame.draw.rect(panel, (250,250,250), row_rect)
+        pygame.draw.rect(panel, BORDER, (left, hy, cols[0], self.row_h), width=self.table_border)
+        name_s = self.f_small.render(guess.name, True, INK_900)
+        panel.blit(name_s, (left + 12, hy + (self.row_h - name_s.get_height())//2))
+        cx = left + cols[0]
+        for i, st in enumerate(statuses):
+            w = cols[i+1] if i+1 < len(cols) else 120
+            pygame.draw.rect(panel, BORDER, (cx, hy, w, self.row_h), width=self.table_border)
+            self._draw_hint_square(pygame.Rect(cx, hy, w, self.row_h), st, surf=panel)
+            cx += w
+        if len(cols) > len(SCHEMA) + 1:
+            dist = pygame.Rect(cx, hy, cols[len(SCHEMA) + 1], self.row_h)
+            pygame.draw.rect(panel, BORDER, dist, width=self.table_border)
+            self._draw_distance_cell(dist, self._example_distance(guess, target), surf=panel)
+        hy += self.row_h + 12
+
+        # One line per category, for the status the example row shows.
+        expl_lines = [cat.describe(st) for cat, st in zip(SCHEMA, statuses)]
+        expl_lines.append("Hover over the boxes for your guess's data, and over the category titles for what they mean.")
+        icons = statuses if intro else []
+        ty = hy
+        icon_size = 18
+        icon_margin = 16
+        table_right = left + table_w
+        for idx, line in enumerate(expl_lines):
+            s = self.f_small.render(line, True, INK_700)
+            panel.blit(s, (left + 12, ty))
+            st = icons[idx] if idx < len(icons) else None
+            if st:
+                ix = table_right - icon_margin - icon_size
+                iy = ty + (self.line_h - icon_size) // 2
+                panel.blit(SHAPES.hint_tile(st, icon_size, radius=4), (ix, iy))
+            ty += self.line_h - 4
+
+        return panel.subsurface((0, 0, table_w, min(ty, panel.get_height()))).copy(), header_y
+
+    def _help_example(self):
+        # A real guess and target from the current dataset for the example
+        # row. HELP_EXAMPLE when both are present; otherwise the first row
+        # against whichever early row gives the most varied hints.
+        db = self.game.database
+        guess = db.countries.get(HELP_EXAMPLE[0]) or db.rows[0]
+        target = db.countries.get(HELP_EXAMPLE[1])
+        if target is None or target is guess:
+            target = max((c for c in db.rows[:HELP_EXAMPLE_SCAN] if c is not guess),
+                         key=lambda c: len(set(hint_statuses(guess, c))), default=guess)
+        return guess, target
+
+    def _example_distance(self, guess, target):
+        # Computed for the one pair; the help panel shouldn't build the
+        # distance matrix.
+        if guess.latitude is None or target.latitude is None:
+            return None
+        args = (guess.latitude, guess.longitude, target.latitude, target.longitude)
+        return geo.haversine_km(*args), geo.initial_bearing(*args)
+
+    def _render_guess_row(self, g_country, cols, bg):
+        correct = getattr(self.game, 'correct_country', None)
+        key = (getattr(g_country, 'name', str(g_country)), getattr(correct, 'name', None), tuple(cols), bg)
+        row = self._row_cache.get(key)
+        if row is not None:
+            self._row_cache.move_to_end(key)
+            return row
+
+        row = pygame.Surface((sum(cols), self.row_h))
+        row.fill(bg)
+        pygame.draw.rect(row, BORDER, (0, 0, cols[0], self.row_h), width=self.table_border)
+        name_s = self.f_small.render(key[0], True, INK_900)
+        row.blit(name_s, (12, (self.row_h - name_s.get_height())//2))
+
+        # Hint cells
+        cx = cols[0]
+        for i, status in enumerate(self.game.hint_statuses(g_country)):
+            w = cols[i + 1] if i + 1 < len(cols) else 120
+            cell = pygame.Rect(cx, 0, w, self.row_h)
+            pygame.draw.rect(row, BORDER, cell, width=self.table_border)
+            self._draw_hint_square(cell, status, surf=row)
+            cx += w
+        if len(cols) > len(HINT_FIELDS) + 1:
+            cell = pygame.Rect(cx, 0, cols[len(HINT_FIELDS) + 1], self.row_h)
+            pygame.draw.rect(row, BORDER, cell, width=self.table_border)
+            self._draw_distance_cell(cell, self.game.distance_hint(g_country), surf=row)
+
+        self._row_cache[key] = row
+        if len(self._row_cache) > 256:
+            self._row_cache.popitem(last=False)
+        return row
+
+    def forget_rows(self):
+        # Row surfaces are keyed by target, so after a restart they are
+        # dead weight; left alone they hold up to 256 row-sized surfaces.
+        self._row_cache.clear()
+
+    def invalidate_countries(self, names):
+        # Row surfaces are keyed by (guess, target); drop only those that
+        # involve a country whose data changed.
+        for key in [k for k in self._row_cache if k[0] in names or k[1] in names]:
+            del self._row_cache[key]
+        self._game_over_layer = None
+        self._game_over_key = None
+
+    def _scroll_table(self, delta):
+        total = len(getattr(self.game, 'guesses', []) or [])
+        rows = self._ensure_layout().node('rows')
+        max_scroll = max(0, total - len(rows.data['cells']))
+        self.table_scroll = clamp(self.table_scroll + delta, 0, max_scroll)
+        self._table_follow = self.table_scroll >= max_scroll
+
+    def _draw_table(self, L):
+        table = L.node('table')
+        for name in ('help', 'table_header', 'example'):
+            node = L.node(name)
+            if node is not None:
+                self.screen.blit(node.data['surf'], node.rect)
+        if table.data['help_mode']:
             return
 
-        self._table_rows = len(guesses)
-        self._table_top = (left, top)
-
-        for r_idx, guess in enumerate(guesses):
-            g_country, g_result = (None, None)
-            if isinstance(guess, tuple) and len(guess) >= 2:
-                g_country, g_result = guess[0], guess[1]
-            else:
-                g_country = guess
-
-            country_name = getattr(g_country, "name", str(g_country))
-
-            row_rect = pygame.Rect(left, y, sum(cols), self.row_h)
-            if r_idx == self.hover_row:
-                pygame.draw.rect(self.screen, (245, 248, 252), row_rect)
-
-            cx = left
-            pygame.draw.rect(self.screen, BORDER, (cx, y, cols[0], self.row_h), width=self.table_border)
-            name_s = self.f_small.render(country_name, True, INK_900)
-            self.screen.blit(name_s, (cx + 12, y + (self.row_h - name_s.get_height())//2))
-            cx += cols[0]
-
-            # Hint cells
-            keys = ["continent", "population", "landlocked", "religion", "temperature", "government"]
-            for i in range(len(keys)):
-                col_index = i + 1
-                w = cols[col_index] if col_index < len(cols) else 120
-                pygame.draw.rect(self.screen, BORDER, (cx, y, w, self.row_h), width=self.table_border)
-                if g_result is not None:
-                    status = self._status_from_result(g_result, keys[i])
-                else:
-                    status = "unknown"
-                self._draw_hint_square(pygame.Rect(cx, y, w, self.row_h), status)
-                cx += w
-
-            y += self.row_h
-        if not guesses:
-            ex_cols = cols
-            cap = self.f_small.render("For example:", True, INK_700)
-            self.screen.blit(cap, (left, y))
-            y += self.line_h - 6
-
-            example_name = "Australia"
-            statuses = [ 'bad',  
-                         'good',
-                         'good',
-                         'bad',
-                         'up',
-                         'bad' ]
-
-            row_rect = pygame.Rect(left, y, sum(ex_cols), self.row_h)
-            pygame.draw.rect(self.screen, (250,250,250), row_rect)
-            pygame.draw.rect(self.screen, BORDER, (left, y, ex_cols[0], self.row_h), width=self.table_border)
-            name_s = self.f_small.render(example_name, True, INK_900)
-            self.screen.blit(name_s, (left + 12, y + (self.row_h - name_s.get_height())//2))
-
-            cx = left + ex_cols[0]
-            for i, st in enumerate(statuses):
-                w = ex_cols[i+1] if i+1 < len(ex_cols) else 120
-                pygame.draw.rect(self.screen, BORDER, (cx, y, w, self.row_h), width=self.table_border)
-                self._draw_hint_square(pygame.Rect(cx, y, w, self.row_h), st)
-                cx += w
-
-            y += self.row_h + 12
-
-            expl_lines = [
-                "You guess Australia, but it's in the wrong continent from the correct country.",
-                "The population is within 10% of the correct country's population, so it shows green.",
-                "Landlocked refers to whether the country is surrounded by land; both are coastal here (green).",
-                "Avg. Temp shows direction (blue arrow) when different; here target is higher (up).",
-                "Hover over the boxes to get information on your guess's data.",
-                "Hover over the category titles to get more information on what they mean."
-            ]
-            ty = y
-            for line in expl_lines:
-                s = self.f_small.render(line, True, INK_700)
-                self.screen.blit(s, (left + 12, ty))
-                ty += self.line_h - 4
-            return
+        # Virtualized: only the rows inside the viewport are drawn, each from
+        # a cached surface, so cost doesn't grow with the guess history.
+        cells = L.node('rows').data['cells']
+        raw_guesses = getattr(self.game, "guesses", []) or []
+        total = len(raw_guesses)
+        visible = len(cells)
+        max_scroll = max(0, total - visible)
+        if total < self._table_seen:
+            self._table_follow = True
+        if total != self._table_seen and self._table_follow:
+            self.table_scroll = max_scroll
+        self._table_seen = total
+        self.table_scroll = clamp(self.table_scroll, 0, max_scroll)
+
+        cols = table.data['cols']
+        for r_idx in range(self.table_scroll, min(total, self.table_scroll + visible)):
+            row = cells[r_idx - self.table_scroll]
+            bg = (245, 248, 252) if r_idx == self.hover_row else GEODLE_BG
+            self.screen.blit(self._render_guess_row(raw_guesses[r_idx], cols, bg), row[0].topleft)
+
+        if total > visible:
+            rows_rect = L.rect('rows')
+            track = pygame.Rect(rows_rect.right + 4, rows_rect.top, 4, rows_rect.height)
+            draw_round_rect(self.screen, track, (235, 235, 235), radius=2)
+            thumb_h = max(16, int(track.height * visible / total))
+            thumb_top = track.top + int((track.height - thumb_h) * (self.table_scroll / max_scroll))
+            draw_round_rect(self.screen, pygame.Rect(track.left, thumb_top, track.width, thumb_h), (200, 200, 200), radius=2)
+
+    def _candidate_tooltip_text(self):
+        limit = 12
+        names = self.game.candidate_names(limit + 1)
+        lines = names[:limit]
+        extra = self.game.remaining_candidates() - limit
+        if extra > 0:
+            lines.append(f"...and {extra} more")
+        return lines
 
     def _hover_tooltip_text(self):
+        if self.hover_widget == 'remaining' and self.show_candidates:
+            try:
+                return self._candidate_tooltip_text()
+            except Exception:
+                return None
         r = getattr(self, "hover_row", -1)
         c = getattr(self, "hover_col", -1)
         if r is None or r < 0 or c is None or c < 0:
             return None
-        keys = ["country", "continent", "population", "landlocked", "religion", "temperature", "government"]
         try:
             raw_guesses = getattr(self.game, "guesses", []) or []
             if r >= len(raw_guesses):
@@ -969,35 +1586,25 @@ class UI:
                 g_country = g[0]
             else:
                 g_country = g
-            correct = getattr(self.game, "correct_country", None)
-            if not g_country or not correct:
-                return None
-            key = keys[c] if c < len(keys) else None
-            if key is None:
+            if not g_country:
                 return None
             lines = []
-            if key == "country":
+            if c == 0:
                 lines.append(f"Guess: {getattr(g_country,'name',str(g_country))}")
                 return lines
-            if key == "continent":
-                lines.append(f"{getattr(g_country,'continent','')}")
-                return lines
-            if key == "population":
-                gv = getattr(g_country, "population", None)
-                lines.append(f"{gv:,}" if isinstance(gv,int) else f"{gv}")
+            if c <= len(SCHEMA):
+                cat = SCHEMA[c - 1]
+                lines.append(cat.format(getattr(g_country, cat.field, '')))
                 return lines
-            if key == "landlocked":
-                lines.append(("Landlocked" if getattr(g_country,'landlocked',False) else "Coastal"))
-                return lines
-            if key == "religion":
-                lines.append(f"{getattr(g_country,'religion','')}")
-                return lines
-            if key == "temperature":
-                gv = getattr(g_country, "temperature", None)
-                lines.append(f"{gv}°C")
-                return lines
-            if key == "government":
-                lines.append(f"{getattr(g_country,'government','')}")
+            if c == len(SCHEMA) + 1 and self._show_distance():
+                hint = self.game.distance_hint(g_country)
+                if hint is None:
+                    return None
+                km, bearing = hint
+                if km < 1.0:
+                    lines.append("You found it!")
+                else:
+                    lines.append(f"The target is {km:,.0f} km {geo.compass_point(bearing)} of {g_country.name}")
                 return lines
         except Exception:
             return None
@@ -1007,42 +1614,35 @@ class UI:
         if not getattr(self, "input_focused", False):
             return
 
-        visible = (pygame.time.get_ticks() // 500) % 2 == 0
+        visible = (self.now_ms() // 500) % 2 == 0
         if not visible:
             return
 
+        inp = self._ensure_layout().rect('input')
         txt = self.game.current_input if getattr(self.game, "current_input", "") else ""
         if txt:
-            surf = self.f_label.render(txt, True, INK_900)
-            caret_x = self._input_rect.left + 12 + surf.get_width()
+            surf = self.text(self.f_label, txt, INK_900)
+            caret_x = inp.left + 12 + surf.get_width()
         else:
-            caret_x = self._input_rect.left + 12
+            caret_x = inp.left + 12
 
-        caret_y = self._input_rect.centery
-        caret_surf = self.f_label.render("|", True, INK_900)
+        caret_y = inp.centery
+        caret_surf = self.text(self.f_label, "|", INK_900)
         self.screen.blit(caret_surf, (caret_x, caret_y - caret_surf.get_height()//2))
     def _draw_suggestions_overlay(self):
         suggs = getattr(self.game, 'suggestions', None)
-        if not suggs:
-            self._sugg_rects = []
-            self._suggest_drop_rect = None
-            self._suggest_track_rect = None
+        L = self._ensure_layout()
+        if not suggs or L.node('dropdown') is None:
+            self._suggest_thumb_rect = None
             return
 
         total = len(suggs)
-        max_show = min(6, total)
-        drop_h = max_show * self.cell_h
+        max_show = L.node('dropdown').data['max_show']
+        drop = L.rect('dropdown')
 
-        drop = pygame.Rect(self._input_rect.left,
-                        self._input_rect.bottom + 6,
-                        self._input_rect.width,
-                        drop_h)
+        draw_panel(self.screen, drop, WHITE, BORDER, radius=10)
 
-        draw_round_rect(self.screen, drop, BORDER, radius=10, width=1)
-        draw_round_rect(self.screen, drop.inflate(-2, -2), WHITE, radius=10, width=0)
-
-        self._sugg_rects = []
-        inner = drop.inflate(-8, -8)
+        inner = L.rect('sugg_list')
 
         self.sugg_scroll_idx = clamp(self.sugg_scroll_idx, 0, max(0, total - max_show))
         sel = getattr(self.game, 'selected_suggestion', 0)
@@ -1051,23 +1651,20 @@ class UI:
         elif sel >= self.sugg_scroll_idx + max_show:
             self.sugg_scroll_idx = sel - max_show + 1
         self._sugg_scroll_target = float(self.sugg_scroll_idx)
-        try:
-            t = 0.18
-            self._sugg_scroll += (self._sugg_scroll_target - self._sugg_scroll) * t
-        except Exception:
-            self._sugg_scroll = float(self.sugg_scroll_idx)
+        # Eased by tick(); drawn between the last two steps.
+        scroll = self._sugg_scroll_prev + (self._sugg_scroll - self._sugg_scroll_prev) * self.alpha
 
-        start = int(math.floor(self._sugg_scroll))
-        frac_off = self._sugg_scroll - start
+        start = int(math.floor(scroll))
+        frac_off = scroll - start
         for i in range(max_show):
             idx = start + i
             y_off = inner.top + int((i - frac_off) * self.cell_h)
             r = pygame.Rect(inner.left, y_off, inner.width, self.cell_h)
 
             bg = (240, 248, 255) if idx == sel else WHITE
-            pygame.draw.rect(self.screen, bg, r, border_radius=6)
+            draw_round_rect(self.screen, r, bg, radius=6)
             if i < max_show - 1:
-                pygame.draw.line(self.screen, BORDER, (r.left, r.bottom-1), (r.right, r.bottom-1), 1)
+                self.screen.fill(BORDER, (r.left, r.bottom - 1, r.width + 1, 1))
 
             name = suggs[idx]
             meta = ""
@@ -1078,51 +1675,101 @@ class UI:
             except Exception:
                 pass
 
-            name_s = self.f_label.render(name, True, INK_900)
-            meta_s = self.f_small.render(meta, True, INK_500)
+            name_s = self.text(self.f_label, name, INK_900)
+            meta_s = self.text(self.f_small, meta, INK_500)
             self.screen.blit(name_s, (r.left + 10, r.top + 6))
             self.screen.blit(meta_s, (r.left + 10, r.top + 6 + name_s.get_height()))
-            self._sugg_rects.append(r)
 
-        if total > max_show:
-            track = pygame.Rect(drop.right - 10, drop.top + 10, 6, drop_h - 20)
-            pygame.draw.rect(self.screen, (235, 235, 235), track, border_radius=3)
+        track = L.rect('sugg_track')
+        if track is not None:
+            draw_round_rect(self.screen, track, (235, 235, 235), radius=3)
             thumb_h = max(24, int(track.height * (max_show / total)))
             max_start = total - max_show
             # compute thumb position using fractional scroll for smoothness
             if max_start:
-                thumb_top = int(track.top + (track.height - thumb_h) * (self._sugg_scroll / max_start))
+                thumb_top = int(track.top + (track.height - thumb_h) * (scroll / max_start))
             else:
                 thumb_top = track.top
             thumb_rect = pygame.Rect(track.left, thumb_top, track.width, thumb_h)
-            pygame.draw.rect(self.screen, (200, 200, 200), thumb_rect, border_radius=3)
-            self._suggest_track_rect = track
+            draw_round_rect(self.screen, thumb_rect, (200, 200, 200), radius=3)
             self._suggest_thumb_rect = thumb_rect
         else:
-            self._suggest_track_rect = None
+            self._suggest_thumb_rect = None
 
-        self._suggest_drop_rect = drop
+    def _draw_opponents(self):
+        # Race mode: each opponent's hint colours as a mini grid, top right.
+        opponents = getattr(self.game, 'opponents', None)
+        if not opponents:
+            return
+        key = (self.game.opponents_version, self.screen.get_size())
+        if self._opponents_key != key:
+            sq, gap = 8, 2
+            shown = sorted(opponents.items())[:4]
+            cols = len(SCHEMA)
+            rows = self.game.max_guesses or max(len(o['rows']) for _, o in shown)
+            grid_w = cols * (sq + gap) - gap
+            label_h = self.f_small.get_height()
+            w = len(shown) * (grid_w + 14) + 10
+            h = label_h + 6 + rows * (sq + gap) + 12
+            extra = len(opponents) - len(shown)
+            if extra > 0:
+                h += label_h
+            surf = pygame.Surface((w, h), pygame.SRCALPHA)
+            draw_panel(surf, surf.get_rect(), WHITE, BORDER, radius=8)
+            x = 10
+            for pid, opp in shown:
+                color = GREEN if opp['won'] else (INK_500 if opp['done'] else INK_700)
+                label = self.f_small.render(f"P{pid}", True, color)
+                surf.blit(label, (x, 6))
+                for r in range(rows):
+                    y = 6 + label_h + 4 + r * (sq + gap)
+                    statuses = opp['rows'][r] if r < len(opp['rows']) else ()
+                    for c in range(cols):
+                        fill = HINT_COLORS.get(statuses[c], BORDER) if c < len(statuses) else BORDER
+                        pygame.draw.rect(surf, fill, (x + c * (sq + gap), y, sq, sq))
+                x += grid_w + 14
+            if extra > 0:
+                more = self.f_small.render(f"+{extra} more", True, INK_500)
+                surf.blit(more, (10, h - label_h - 4))
+            self._opponents_surf = surf
+            self._opponents_key = key
+        self.screen.blit(self._opponents_surf, (self.screen.get_width() - self._opponents_surf.get_width() - 16, 12))
+
+    def _game_over_cache_key(self):
+        if not getattr(self.game, 'game_over', False):
+            return None
+        correct = getattr(self.game, 'correct_country', None)
+        return (id(self.game), getattr(correct, 'name', None), getattr(self.game, 'won', False),
+                len(getattr(self.game, 'guesses', []) or []), self.screen.get_size(),
+                self.stats.summary.played if self.stats is not None else None,
+                getattr(self.game, 'beat_percent', None))
 
     def _draw_game_over(self):
-        if not getattr(self.game, 'game_over', False):
+        key = self._game_over_cache_key()
+        if key is None:
+            self._game_over_layer = None
+            self._game_over_key = None
             return
 
-        sw, sh = self.screen.get_size()
-        overlay = pygame.Surface((sw, sh), pygame.SRCALPHA)
+        # The scene behind the modal is frozen once the game ends, so the
+        # dimmed frame and the modal are composited a single time.
+        L = self._ensure_layout()
+        layer = self.screen.copy()
+        overlay = pygame.Surface(layer.get_size(), pygame.SRCALPHA)
         overlay.fill((0,0,0,150))
-        self.screen.blit(overlay, (0,0))
+        layer.blit(overlay, (0,0))
 
-        modal_w = 560
-        modal_h = 260
-        mx = (sw - modal_w)//2
-        my = (sh - modal_h)//2
-        modal = pygame.Rect(mx, my, modal_w, modal_h)
-        pygame.draw.rect(self.screen, (255,255,255), modal, border_radius=12)
-        pygame.draw.rect(self.screen, BORDER, modal, 2, border_radius=12)
+        modal = L.rect('modal')
+        my = modal.top
+        draw_panel(layer, modal, WHITE, BORDER, radius=12, border_width=2)
 
         if getattr(self.game, 'won', False):
             title = "Congratulations!"
             sub = f"You guessed {self.game.correct_country.name} in {len(self.game.guesses)} attempts."
+            if getattr(self.game, 'place', 0):
+                sub += f" You finished #{self.game.place}."
+            if getattr(self.game, 'beat_percent', None) is not None:
+                sub += f" You beat {self.game.beat_percent:.0f}% of today's players."
             color = GREEN
         else:
             title = "Game Over"
@@ -1130,23 +1777,47 @@ class UI:
             color = RED
 
         title_s = self.f_sub.render(title, True, color)
-        self.screen.blit(title_s, (modal.centerx - title_s.get_width()//2, my + 28))
+        layer.blit(title_s, (modal.centerx - title_s.get_width()//2, my + 28))
         sub_s = self.f_small.render(sub, True, INK_700)
-        self.screen.blit(sub_s, (modal.centerx - sub_s.get_width()//2, my + 70))
-
-        btn_w = 160
-        btn_h = 44
-        restart = pygame.Rect(modal.left + 80, modal.bottom - 80, btn_w, btn_h)
-        quitb = pygame.Rect(modal.right - 80 - btn_w, modal.bottom - 80, btn_w, btn_h)
-        pygame.draw.rect(self.screen, GREEN if getattr(self.game, 'won', False) else TEAL, restart, border_radius=8)
-        pygame.draw.rect(self.screen, GRAY, quitb, border_radius=8)
+        layer.blit(sub_s, (modal.centerx - sub_s.get_width()//2, my + 70))
+        if self.stats is not None:
+            self._draw_stats(layer, L.rect('stats'), self.stats.summary)
+
+        restart = L.rect('restart')
+        quitb = L.rect('quit')
+        draw_round_rect(layer, restart, GREEN if getattr(self.game, 'won', False) else TEAL, radius=8)
+        draw_round_rect(layer, quitb, GRAY, radius=8)
         rtxt = self.f_button.render("PLAY AGAIN", True, WHITE)
         qtxt = self.f_button.render("QUIT", True, WHITE)
-        self.screen.blit(rtxt, (restart.centerx - rtxt.get_width()//2, restart.centery - rtxt.get_height()//2))
-        self.screen.blit(qtxt, (quitb.centerx - qtxt.get_width()//2, quitb.centery - qtxt.get_height()//2))
-
-        self._restart_rect = restart
-        self._quit_rect = quitb
+        layer.blit(rtxt, (restart.centerx - rtxt.get_width()//2, restart.centery - rtxt.get_height()//2))
+        layer.blit(qtxt, (quitb.centerx - qtxt.get_width()//2, quitb.centery - qtxt.get_height()//2))
+
+        self._game_over_layer = layer
+        self._game_over_key = key
+        self.screen.blit(layer, (0, 0))
+
+    def _draw_stats(self, surf, box, summary):
+        line = (f"Played {summary.played}  \u00b7  Win {round(summary.win_rate() * 100)}%  \u00b7  "
+                f"Streak {summary.streak}  \u00b7  Best {summary.max_streak}")
+        line_s = self.f_small.render(line, True, INK_900)
+        surf.blit(line_s, (box.centerx - line_s.get_width()//2, box.top))
+
+        dist = summary.distribution
+        top = max(dist) or 1
+        bar_h, gap = 16, 4
+        y = box.top + line_s.get_height() + 12
+        label_w = self.f_small.size("0")[0] + 10
+        track = box.width - label_w
+        for i, n in enumerate(dist):
+            label = self.f_small.render(str(i + 1), True, INK_700)
+            surf.blit(label, (box.left, y + (bar_h - label.get_height())//2))
+            w = max(24, track * n // top)
+            color = GREEN if self.game.won and summary.last_guesses == i + 1 else GRAY
+            bar = pygame.Rect(box.left + label_w, y, w, bar_h)
+            draw_round_rect(surf, bar, color, radius=4)
+            count = self.f_small.render(str(n), True, WHITE)
+            surf.blit(count, (bar.right - count.get_width() - 6, y + (bar_h - count.get_height())//2))
+            y += bar_h + gap
 
     def _try_submit(self):
         if getattr(self.game, "game_over", False):
@@ -1164,108 +1835,512 @@ class UI:
                     self.game.suggestions = []
                     self.game.selected_suggestion = 0
 
-def enhance():
-    game = GeodleGame()
-    try:
-        names = list(game.database.countries.keys())
-        import random
-        chosen = random.choice(names) if names else None
-        game.correct_country = game.database.countries.get(chosen) if chosen else game.database.get_country_of_day()
-    except Exception:
+def enhance(practice=False, save_path=None, database=None, daily=False):
+    # Restarts pass the current dataset in, so a long session keeps one
+    # loaded copy instead of rebuilding it (and its indexes) every game.
+    # A daily game's target is get_country_of_day(); others pick at random.
+    game = GeodleGame(practice=practice, database=database)
+    game.daily = daily and not practice
+    if save_path and savegame.restore(game, save_path):
+        if not game.daily or game.correct_country is game.database.get_country_of_day():
+            telemetry.sink.emit('game_resume', target=game.correct_country.name, guesses=len(game.guesses))
+            return game
+        # Saved on an earlier day: today's country replaces it.
+        game = GeodleGame(practice=practice, database=game.database)
+        game.daily = True
+    if game.daily:
         game.correct_country = game.database.get_country_of_day()
+    else:
+        try:
+            names = list(game.database.countries.keys())
+            import random
+            chosen = random.choice(names) if names else None
+            game.correct_country = game.database.countries.get(chosen) if chosen else game.database.get_country_of_day()
+        except Exception:
+            game.correct_country = game.database.get_country_of_day()
     game.current_input = ""
     game.suggestions = []
     game.selected_suggestion = 0
+    telemetry.sink.emit('game_start', target=game.correct_country.name, practice=practice)
     return game
 
 
-def main():
+def create_window():
+    # Opt into per-monitor DPI awareness so Windows doesn't bitmap-stretch
+    # the window; the layout pass adapts to whatever size we actually get.
+    os.environ.setdefault('SDL_WINDOWS_DPI_AWARENESS', 'permonitorv2')
+    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.RESIZABLE)
+    pygame.display.set_caption("Geodle")
+    return screen
+
+
+class SimClock:
+    # Turns elapsed real time into a whole number of fixed simulation steps.
+    # The remainder carries over to the next frame; alpha is how far the
+    # frame falls between the last step and the next, for interpolation.
+    def __init__(self, hz=SIM_HZ, max_steps=MAX_SIM_STEPS):
+        self.step_ms = 1000.0 / hz
+        self.max_steps = max_steps
+        self.last = None
+        self.acc = 0.0
+        self.alpha = 1.0
+
+    def advance(self, now_ms) -> int:
+        if self.last is None:
+            self.last = now_ms
+            return 0
+        self.acc += max(0, now_ms - self.last)
+        self.last = now_ms
+        steps = int(self.acc // self.step_ms)
+        self.acc -= steps * self.step_ms
+        if steps > self.max_steps:
+            steps = self.max_steps
+            self.acc = 0.0
+        self.alpha = self.acc / self.step_ms
+        return steps
+
+
+class GameSession:
+    # Owns the current game and UI and applies pygame events to them. Used by
+    # main() and by headless replay so both take exactly the same paths.
+    def __init__(self, screen, practice=False, stats=None, save_path=None, watcher=None, race=None,
+                 leaderboard=None, player=None, database=None, registry=None, dataset=None):
+        self.practice = practice
+        # With a DatasetRegistry, F4 switches to the next dataset. Each
+        # dataset keeps its own save next to save_path.
+        self.registry = registry
+        self.dataset = dataset
+        self._base_save_path = save_path
+        self.save_path = self._dataset_save_path(dataset)
+        self.watcher = watcher
+        self.race = race
+        if race is not None:
+            from race import RaceGame
+            self.game = RaceGame(race)
+        else:
+            # Ranked games all share the day's target, so a leaderboard
+            # compares like with like.
+            self.game = enhance(practice=practice, save_path=self.save_path, database=database,
+                                daily=leaderboard is not None)
+        self.ui = UI(screen, self.game)
+        if race is not None:
+            self.ui.restart_hook = race.request_restart
+        self.ui.stats = stats
+        self.stats = stats
+        self.leaderboard = leaderboard
+        self.player = player
+        self.running = True
+        self.frame = 0
+        self.clock = SimClock()
+        self.ticks = 0
+        self._saved_state = self._save_state()
+
+    def handle_event(self, event):
+        ui = self.ui
+        if event.type == pygame.QUIT:
+            self.running = False
+            return
+
+        if event.type in (pygame.VIDEORESIZE, pygame.WINDOWSIZECHANGED):
+            ui.on_resize()
+
+        if event.type in (pygame.MOUSEMOTION, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEWHEEL):
+            if hasattr(ui, "handle_mouse"):
+                ui.handle_mouse(event)
+            self.game = ui.game
+            if ui.quit_requested:
+                self.running = False
+                return
+
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_TAB:
+            ui.show_candidates = not ui.show_candidates
+            return
+
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F2 and latency.tracer.enabled:
+            ui.show_latency = not ui.show_latency
+            return
+
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F4 and self.registry is not None:
+            self.switch_dataset()
+            return
+
+        if event.type == pygame.KEYDOWN:
+            game = self.game
+            if not hasattr(game, "current_input"): game.current_input = ""
+            if not hasattr(game, "suggestions"): game.suggestions = []
+            if not hasattr(game, "selected_suggestion"): game.selected_suggestion = 0
+
+            if game.game_over:
+                if event.key == pygame.K_SPACE and self.race is not None:
+                    self.race.request_restart()
+                elif event.key == pygame.K_SPACE:
+                    # Restart game
+                    telemetry.sink.emit('restart', source='key')
+                    self.game = enhance(practice=self.practice, database=self.game.next_database(),
+                                        daily=self.game.daily)
+                    ui.game = self.game
+                    ui.forget_rows()
+                    print(f"\nToday's country: {self.game.correct_country.name}")
+                elif event.key == pygame.K_s:
+                    self.save_card()
+                elif event.key == pygame.K_ESCAPE:
+                    self.running = False
+            else:
+                if event.key == pygame.K_RETURN:
+                    if game.suggestions and 0 <= game.selected_suggestion < len(game.suggestions):
+                        selected = game.suggestions[game.selected_suggestion]
+                        if game.make_guess(selected):
+                            print(f"Guessed: {selected}")
+                            game.current_input = ""
+                            game.suggestions = []
+                            game.selected_suggestion = 0
+                    elif game.current_input:
+                        if game.make_guess(game.current_input):
+                            print(f"Guessed: {game.current_input}")
+                            game.current_input = ""
+                            game.suggestions = []
+                            game.selected_suggestion = 0
+
+                elif event.key == pygame.K_BACKSPACE:
+                    game.current_input = game.current_input[:-1]
+                    latency.tracer.mark('edit')
+                    self._search(game)
+
+                elif event.key == pygame.K_DOWN:
+                    if game.suggestions:
+                        game.selected_suggestion = (game.selected_suggestion + 1) % len(game.suggestions)
+
+                elif event.key == pygame.K_UP:
+                    if game.suggestions:
+                        game.selected_suggestion = (game.selected_suggestion - 1) % len(game.suggestions)
+
+                elif event.key == pygame.K_ESCAPE:
+                    game.current_input = ""
+                    game.suggestions = []
+
+                else:
+                    ch = getattr(event, "unicode", "")
+                    if ch and ch.isprintable():
+                        game.current_input += ch
+                        latency.tracer.mark('edit')
+                        self._search(game)
+
+    def _search(self, game):
+        t0 = time.perf_counter()
+        game.suggestions = game.database.search_countries(game.current_input) if game.current_input else []
+        game.selected_suggestion = 0
+        latency.tracer.mark('search')
+        telemetry.sink.emit('search', chars=len(game.current_input), results=len(game.suggestions),
+                            ms=round((time.perf_counter() - t0) * 1000.0, 3))
+
+    def step(self, events, ticks=None):
+        # Applies one frame of input, runs the simulation steps due by
+        # ui.now_ms() (or exactly `ticks`, as replay does) and draws.
+        t0 = time.perf_counter()
+        if self.game.started_ms is None:
+            self.game.started_ms = self.ui.now_ms()
+            if self.leaderboard is not None and not self.game.practice:
+                self.leaderboard.warm(self.game.database.day_number(), self.game.correct_country.name)
+        if self.watcher is not None:
+            database = self.watcher.poll()
+            if database is not None:
+                self._swap_database(database)
+        if self.race is not None:
+            for msg in self.race.poll():
+                if self.game.apply(msg) == 'round':
+                    self.ui._row_cache.clear()
+                    print("\nNew race round!")
+        for event in events:
+            latency.tracer.begin(event)
+            self.handle_event(event)
+            if not self.running:
+                break
+        latency.tracer.begin(None)
+        self._record_result()
+        self._autosave()
+        if ticks is None:
+            ticks = self.clock.advance(self.ui.now_ms())
+            self.ui.alpha = self.clock.alpha
+        else:
+            self.ui.alpha = 1.0
+        for _ in range(ticks):
+            self.game.update()
+            self.ui.tick()
+        self.ticks = ticks
+        self.ui.render()
+        latency.tracer.rendered()
+        self.frame += 1
+        ms = (time.perf_counter() - t0) * 1000.0
+        if ms > FRAME_SPIKE_MS:
+            telemetry.sink.emit('frame_spike', frame=self.frame - 1, ms=round(ms, 2), events=len(events))
+
+    def switch_dataset(self, name=None):
+        # Starts a new game on another dataset (the next one by default).
+        # Datasets still resident in the registry come back without a reload.
+        name = name or self.registry.next_name(self.dataset)
+        if name == self.dataset:
+            return
+        t0 = time.perf_counter()
+        loads = self.registry.loads
+        database = self.registry.get(name)
+        # The game being left stays in its dataset's save and resumes when
+        # that dataset is picked again.
+        self.save()
+        self.dataset = name
+        self.save_path = self._dataset_save_path(name)
+        self.game = enhance(practice=self.practice, save_path=self.save_path, database=database,
+                            daily=self.game.daily)
+        self.ui.game = self.game
+        self.ui.forget_rows()
+        self.ui.layout = None
+        self._card_renderer = None
+        if self.watcher is not None:
+            from hotreload import DatasetWatcher
+            self.watcher.close()
+            self.watcher = DatasetWatcher(database.path, database.dataset_hash)
+        ms = round((time.perf_counter() - t0) * 1000.0, 2)
+        telemetry.sink.emit('dataset_switch', name=name, loaded=self.registry.loads > loads, ms=ms,
+                            resident=len(self.registry.resident()))
+        print(f"\nSwitched to {self.registry.title(name)} ({ms} ms)")
+        print(f"Today's country: {self.game.correct_country.name}")
+
+    def _dataset_save_path(self, name):
+        # save.bin for the built-in dataset, save.us_states.bin for us_states.
+        path = self._base_save_path
+        if not path or name is None:
+            return path
+        from datasets import DEFAULT_NAME
+        if name == DEFAULT_NAME:
+            return path
+        base, ext = os.path.splitext(path)
+        return f"{base}.{name}{ext}"
+
+    def animating(self) -> bool:
+        game = self.game
+        return bool(game.particles or game.error_timer > 0 or self.ui.animating())
+
+    def _swap_database(self, database):
+        from hotreload import diff_databases
+
+        old = self.game.database
+        changed, added, removed = diff_databases(old, database)
+        if not self.game.swap_database(database):
+            # The next game starts on it, and so does a switch back to this
+            # dataset.
+            if self.registry is not None:
+                self.registry.replace(self.dataset, database)
+            print("Dataset reloaded; the current game keeps its data until it ends")
+            return
+        self.ui.invalidate_countries(changed | removed)
+        if self.registry is not None:
+            self.registry.replace(self.dataset, database)
+        telemetry.sink.emit('dataset_reload', changed=len(changed), added=len(added), removed=len(removed))
+        print(f"Dataset reloaded: {len(changed)} changed, {len(added)} added, {len(removed)} removed")
+        # The save is tied to the dataset hash, so rewrite it for the new file.
+        self.save()
+
+    def _record_result(self):
+        game = self.game
+        if not game.game_over or getattr(game, 'result_recorded', False):
+            return
+        if self.stats is None and self.leaderboard is None:
+            return
+        # Restarts replace the game's __dict__, which clears this flag.
+        game.result_recorded = True
+        duration = self.ui.now_ms() - (game.started_ms or 0)
+        if self.stats is not None:
+            self.stats.record_game(game.correct_country.name, len(game.guesses), game.won,
+                                   duration, practice=game.practice)
+        if self.leaderboard is not None and not game.practice:
+            # Ranked against everyone who had the same target today.
+            game.beat_percent = self.leaderboard.record(
+                game.database.day_number(), game.correct_country.name, self.player,
+                len(game.guesses), game.won, duration, [g.name for g in game.guesses])
+
+    def save_card(self):
+        from cards import CardRenderer, card_from_game
+        renderer = getattr(self, '_card_renderer', None)
+        if renderer is None or renderer.database is not self.game.database:
+            renderer = self._card_renderer = CardRenderer(self.game.database)
+        try:
+            path = renderer.save(card_from_game(self.game, self.player))
+        except (OSError, pygame.error) as e:
+            print(f"Failed to save result card: {e}")
+            return None
+        print(f"Result card saved to {path}")
+        return path
+
+    def _save_state(self):
+        game = self.game
+        return id(game), getattr(game.correct_country, 'name', None), len(game.guesses), game.game_over
+
+    def _autosave(self):
+        # Written whenever a guess lands or a new game starts; a finished
+        # game has nothing left to resume, so its save is removed.
+        state = self._save_state()
+        if self.save_path and state != self._saved_state:
+            self._saved_state = state
+            self.save()
+
+    def save(self):
+        if not self.save_path:
+            return
+        try:
+            if self.game.game_over:
+                savegame.clear(self.save_path)
+            else:
+                savegame.save(self.game, self.save_path)
+        except (OSError, struct.error) as e:
+            print(f"Failed to save game: {e}")
+
+    def checksum(self) -> int:
+        game, ui = self.game, self.ui
+        state = (
+            getattr(game.correct_country, 'name', None),
+            [g.name for g in game.guesses], game.game_over, game.won,
+            game.current_input, list(game.suggestions), game.selected_suggestion,
+            game.error_message, game.error_timer, game.candidates,
+            [tuple(p[:4]) + (p[6],) for p in game.particles],
+            ui.hover_row, ui.hover_col, ui.input_focused, ui.sugg_scroll_idx,
+            ui.table_scroll, ui.show_candidates,
+        )
+        return zlib.crc32(repr(state).encode('utf-8'))
+
+
+def main(practice=False, seed=None, record=None, stats_path=None, telemetry_dir=None, save_path=None,
+         race=None, leaderboard_path=None, player=None, latency_path=None, renderer='surface',
+         dataset=None, dataset_budget=None):
     import pygame
     import sys
-    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
-    pygame.display.set_caption("Geodle")
+    # enhance() and spawn_confetti draw from the module-level RNG, so one
+    # seed plus the input stream reproduces a session exactly.
+    if seed is None:
+        seed = random.SystemRandom().randrange(1 << 63)
+    random.seed(seed)
+    if renderer == 'texture':
+        from backends import TextureBackend
+        backend = TextureBackend((WINDOW_WIDTH, WINDOW_HEIGHT), "Geodle")
+    else:
+        from backends import SurfaceBackend
+        backend = SurfaceBackend(create_window())
+    screen = backend.canvas
     clock = pygame.time.Clock()
-    
-    game = enhance()
-    ui = UI(screen, game)
-    print(f"\nToday's country: {game.correct_country.name}")
+
+    if telemetry_dir:
+        telemetry.install(telemetry.Telemetry(telemetry_dir))
+    if latency_path is not None:
+        latency.install(latency.LatencyTracer(latency_path or None))
+    stats = None
+    if stats_path != "" and not race:
+        # Race rounds aren't daily games and would skew streaks.
+        from stats import StatsStore
+        try:
+            stats = StatsStore(stats_path)
+        except Exception as e:
+            print(f"Stats disabled: {e}")
+    leaderboard = None
+    if leaderboard_path is not None and not race:
+        from leaderboard import Leaderboard
+        try:
+            leaderboard = Leaderboard(leaderboard_path or None)
+        except Exception as e:
+            print(f"Leaderboard disabled: {e}")
+        if player is None:
+            import getpass
+            try:
+                player = getpass.getuser()
+            except Exception:
+                player = "player"
+    from datasets import DEFAULT_BUDGET_MB, DEFAULT_NAME, DatasetRegistry
+    registry = DatasetRegistry(budget_mb=dataset_budget or DEFAULT_BUDGET_MB)
+    dataset = dataset or DEFAULT_NAME
+    server = client = None
+    if race:
+        # race is ('host', port) or ('join', address, port). The host runs the
+        # authoritative server and plays through it like everyone else.
+        from race import RaceClient, RaceServer
+        database = registry.get(dataset)
+        try:
+            if race[0] == 'host':
+                server = RaceServer(database, port=race[1], seed=seed).start()
+                address, port = '127.0.0.1', server.port
+                print(f"Hosting a race on port {port}")
+            else:
+                address, port = race[1], race[2]
+            client = RaceClient(address, port, database).connect()
+        except (ConnectionError, OSError) as e:
+            print(f"Race unavailable: {e}")
+            if server:
+                server.close()
+            pygame.quit()
+            return
+        print(f"Joined the race as player {client.pid}")
+    if record or race:
+        # Replays start from a fresh game, so recorded sessions never resume;
+        # race games belong to the host.
+        save_path = ""
+    elif save_path is None:
+        save_path = savegame.default_path(practice)
+    # Replay always starts from one dataset, so recorded and race sessions
+    # can't switch.
+    session = GameSession(screen, practice=practice, stats=stats, save_path=save_path, race=client,
+                          leaderboard=leaderboard, player=player, database=registry.get(dataset),
+                          registry=None if record or race else registry, dataset=dataset)
+    if not record and not race:
+        # Recorded sessions keep the data they started with, as replay will.
+        from hotreload import DatasetWatcher
+        database = session.game.database
+        session.watcher = DatasetWatcher(database.path, database.dataset_hash)
+    recorder = None
+    if record:
+        from replay import Recorder
+        recorder = Recorder(record, seed, practice, screen.get_size(), session.game.database.dataset_hash,
+                            dataset)
+    if not race:
+        print(f"\nToday's country: {session.game.correct_country.name}")
     print("\nGame started! Good luck!\n")
-    
-    running = True
+
+    last_input = pygame.time.get_ticks()
     try:
-        while running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-                    break
-
-                if event.type in (pygame.MOUSEMOTION, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.MOUSEWHEEL):
-                    if hasattr(ui, "handle_mouse"):
-                        ui.handle_mouse(event)
-
-                if event.type == pygame.KEYDOWN:
-                    if not hasattr(game, "current_input"): game.current_input = ""
-                    if not hasattr(game, "suggestions"): game.suggestions = []
-                    if not hasattr(game, "selected_suggestion"): game.selected_suggestion = 0
-
-                    if game.game_over:
-                        if event.key == pygame.K_SPACE:
-                            # Restart game
-                            game = enhance()
-                            ui.game = game
-                            print(f"\nToday's country: {game.correct_country.name}")
-                        elif event.key == pygame.K_ESCAPE:
-                            running = False
-                    else:
-                        if event.key == pygame.K_RETURN:
-                            if game.suggestions and 0 <= game.selected_suggestion < len(game.suggestions):
-                                selected = game.suggestions[game.selected_suggestion]
-                                if game.make_guess(selected):
-                                    print(f"Guessed: {selected}")
-                                    game.current_input = ""
-                                    game.suggestions = []
-                                    game.selected_suggestion = 0
-                            elif game.current_input:
-                                if game.make_guess(game.current_input):
-                                    print(f"Guessed: {game.current_input}")
-                                    game.current_input = ""
-                                    game.suggestions = []
-                                    game.selected_suggestion = 0
-                        
-                        elif event.key == pygame.K_BACKSPACE:
-                            game.current_input = game.current_input[:-1]
-                            game.suggestions = game.database.search_countries(game.current_input) if game.current_input else []
-                            game.selected_suggestion = 0
-                        
-                        elif event.key == pygame.K_DOWN:
-                            if game.suggestions:
-                                game.selected_suggestion = (game.selected_suggestion + 1) % len(game.suggestions)
-                        
-                        elif event.key == pygame.K_UP:
-                            if game.suggestions:
-                                game.selected_suggestion = (game.selected_suggestion - 1) % len(game.suggestions)
-                        
-                        elif event.key == pygame.K_ESCAPE:
-                            game.current_input = ""
-                            game.suggestions = []
-                        
-                        else:
-                            ch = getattr(event, "unicode", "")
-                            if ch and ch.isprintable():
-                                game.current_input += ch
-                                game.suggestions = game.database.search_countries(game.current_input)
-                                game.selected_suggestion = 0
-
-            game.update()
-        
-            ui.render()
-            pygame.display.flip()
-            clock.tick(FPS)
+        while session.running:
+            events = pygame.event.get()
+            latency.tracer.dequeued(events)
+            now = pygame.time.get_ticks()
+            if events:
+                last_input = now
+            if recorder:
+                recorder.record_events(session.frame, events, now)
+            session.step(events)
+            if recorder:
+                recorder.record_ticks(session.frame - 1, session.ticks)
+                recorder.record_checksum(session.frame - 1, session.checksum())
+            backend.present()
+            latency.tracer.flipped()
+            # Simulation runs on its own clock, so idling at a lower frame
+            # rate changes nothing but how often the screen is redrawn.
+            idle = now - last_input > IDLE_AFTER_MS and not session.animating()
+            clock.tick(IDLE_FPS if idle else FPS)
     except Exception as e:
         import traceback
         traceback.print_exc()
-        running = False
     finally:
+        session.save()
+        if session.watcher:
+            session.watcher.close()
+        if client:
+            client.close()
+        if server:
+            server.close()
+        if recorder:
+            recorder.close(session.frame)
+        if stats:
+            stats.close()
+        if leaderboard:
+            leaderboard.close()
+        telemetry.uninstall()
+        if latency.tracer.enabled:
+            print(latency.uninstall().report())
+        backend.close()
         pygame.quit()
         try:
             sys.exit(0)
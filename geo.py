@@ -0,0 +1,77 @@
+import math
+
+try:
+    import numpy as np
+except ImportError:  # optional: without it each lookup computes the pair directly
+    np = None
+
+EARTH_RADIUS_KM = 6371.0088
+COMPASS_POINTS = ['N', 'NE', 'E', 'SE', 'S', 'SW', 'W', 'NW']
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> float:
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def initial_bearing(lat1, lon1, lat2, lon2) -> float:
+    # Degrees clockwise from north, from point 1 towards point 2.
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dl = math.radians(lon2 - lon1)
+    x = math.sin(dl) * math.cos(p2)
+    y = math.cos(p1) * math.sin(p2) - math.sin(p1) * math.cos(p2) * math.cos(dl)
+    return math.degrees(math.atan2(x, y)) % 360.0
+
+
+def compass_point(bearing) -> str:
+    return COMPASS_POINTS[int((bearing + 22.5) // 45) % 8]
+
+
+def _numpy_matrices(lats, lons):
+    # All pairs at once: row i is "from country i", column j "to country j".
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    p1, p2 = lat[:, None], lat[None, :]
+    dl = lon[None, :] - lon[:, None]
+    a = np.sin((p2 - p1) / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(dl / 2) ** 2
+    distance = 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+    x = np.sin(dl) * np.cos(p2)
+    y = np.cos(p1) * np.sin(p2) - np.sin(p1) * np.cos(p2) * np.cos(dl)
+    bearing = np.degrees(np.arctan2(x, y)) % 360.0
+    return distance.astype(np.float32), bearing.astype(np.float32)
+
+
+class GeoMatrix:
+    # Pairwise great-circle distance (km) and initial bearing (degrees)
+    # between dataset rows, as n x n float32 matrices. Rows without
+    # coordinates come out as NaN and lookup() returns None for them.
+    def __init__(self, rows):
+        self.lats = [c.latitude if c.latitude is not None else float('nan') for c in rows]
+        self.lons = [c.longitude if c.longitude is not None else float('nan') for c in rows]
+        self.distance = self.bearing = None
+        if np is not None:
+            self.distance, self.bearing = _numpy_matrices(self.lats, self.lons)
+
+    def lookup(self, i, j):
+        if self.distance is not None:
+            km = self.distance.item(i, j)
+            if km != km:
+                return None
+            return km, self.bearing.item(i, j)
+        lat1, lon1, lat2, lon2 = self.lats[i], self.lons[i], self.lats[j], self.lons[j]
+        if lat1 != lat1 or lat2 != lat2:
+            return None
+        return haversine_km(lat1, lon1, lat2, lon2), initial_bearing(lat1, lon1, lat2, lon2)
+
+    def distances_to(self, j):
+        # Column j: distance from every row to row j, for batch evaluation.
+        if self.distance is not None:
+            return self.distance[:, j]
+        out = []
+        for i in range(len(self.lats)):
+            hit = self.lookup(i, j)
+            out.append(hit[0] if hit else float('nan'))
+        return out
@@ -0,0 +1,75 @@
+import os
+import threading
+
+from gameplay import CountryDatabase
+
+POLL_INTERVAL = 1.0
+
+
+def diff_databases(old, new):
+    # Names whose rows differ between two datasets: (changed, added, removed).
+    def row(c):
+        return c.get_data_list() + [c.latitude, c.longitude]
+
+    changed = {name for name, c in new.countries.items()
+               if name in old.countries and row(old.countries[name]) != row(c)}
+    added = set(new.countries) - set(old.countries)
+    removed = set(old.countries) - set(new.countries)
+    return changed, added, removed
+
+
+class DatasetWatcher:
+    # Polls the dataset file and builds a complete CountryDatabase (rows,
+    # bitset indexes, difficulty table, distance matrix) on its own thread.
+    # The game loop picks the finished database up with poll() between
+    # frames, so a swap is a single reference handoff.
+    def __init__(self, path, dataset_hash="", interval=POLL_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.dataset_hash = dataset_hash
+        self._signature = self._stat()
+        self._pending = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='geodle-dataset-watch', daemon=True)
+        self._thread.start()
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            signature = self._stat()
+            if signature is None or signature == self._signature:
+                continue
+            # Editors often save in several writes; wait for one quiet poll.
+            if self._stop.wait(self.interval) or self._stat() != signature:
+                continue
+            self._signature = signature
+            try:
+                database = CountryDatabase(self.path)
+            except Exception as e:
+                print(f"Dataset reload failed, keeping the current data: {e}")
+                continue
+            if database.dataset_hash == self.dataset_hash:
+                continue
+            if database.has_coordinates:
+                database.geo()
+            self.dataset_hash = database.dataset_hash
+            with self._lock:
+                self._pending = database
+
+    def poll(self):
+        if self._pending is None:
+            return None
+        with self._lock:
+            database, self._pending = self._pending, None
+        return database
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(self.interval * 2 + 1.0)
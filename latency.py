@@ -0,0 +1,202 @@
+import json
+import math
+import time
+
+import pygame
+
+# Histogram resolution: 0.25 ms buckets up to 250 ms; slower events share
+# an overflow bucket but still count towards the exact maximum.
+BUCKET_MS = 0.25
+BUCKETS = 1000
+REFRESH_MS = 250
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Events worth tracing. Key repeats and mouse motion are traced too: motion
+# drives hover, and held keys are exactly where typing lag shows.
+TRACED = {
+    pygame.KEYDOWN: 'key',
+    pygame.MOUSEBUTTONDOWN: 'click',
+    pygame.MOUSEWHEEL: 'wheel',
+    pygame.MOUSEMOTION: 'motion',
+}
+
+
+class _NullTracer:
+    enabled = False
+
+    def dequeued(self, events):
+        pass
+
+    def begin(self, event):
+        pass
+
+    def mark(self, stage):
+        pass
+
+    def rendered(self):
+        pass
+
+    def flipped(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (BUCKETS + 1)
+        self.n = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms):
+        self.counts[min(BUCKETS, int(ms / BUCKET_MS))] += 1
+        self.n += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def quantile(self, q):
+        # Nearest rank: the upper edge of the bucket holding the sample, or
+        # the maximum from the overflow bucket.
+        if not self.n:
+            return 0.0
+        rank = max(0, math.ceil(q * self.n) - 1)
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen > rank:
+                return self.max if i == BUCKETS else min(self.max, (i + 1) * BUCKET_MS)
+        return self.max
+
+    def summary(self):
+        out = {'n': self.n, 'mean_ms': round(self.total / self.n, 3) if self.n else 0.0,
+               'max_ms': round(self.max, 3)}
+        for q in QUANTILES:
+            out[f'p{int(q * 100)}_ms'] = round(self.quantile(q), 3)
+        return out
+
+
+class Trace:
+    __slots__ = ('kind', 'frame', 'dequeued', 'handled', 'stages', 'rendered')
+
+    def __init__(self, kind, frame, now):
+        self.kind = kind
+        self.frame = frame
+        self.dequeued = now
+        self.handled = None
+        self.stages = []
+        self.rendered = None
+
+
+class LatencyTracer:
+    # Follows each input event from the moment the main loop dequeues it to
+    # the display.flip that first shows its effect. The game marks the state
+    # changes an event causes (an input edit, a search, a guess) while it is
+    # being handled, so each event is filed under what it did: "key/search"
+    # is typing with suggestions, "click/guess" a guess picked with the
+    # mouse. Completed traces go to per-kind histograms and, optionally, to
+    # a JSON Lines log.
+    enabled = True
+
+    def __init__(self, path=None):
+        self.path = path
+        self.histograms = {}
+        self.frame = 0
+        self._open = {}
+        self._frame_traces = []
+        self._current = None
+        self._file = open(path, 'w', encoding='utf-8') if path else None
+
+    def dequeued(self, events):
+        now = time.perf_counter_ns()
+        for event in events:
+            kind = TRACED.get(event.type)
+            if kind is not None:
+                trace = Trace(kind, self.frame, now)
+                self._open[id(event)] = trace
+                self._frame_traces.append(trace)
+
+    def begin(self, event):
+        # Called as each event is handled; None once the frame's events are done.
+        trace = self._open.pop(id(event), None) if event is not None else None
+        if trace is not None:
+            trace.handled = time.perf_counter_ns()
+        self._current = trace
+
+    def mark(self, stage):
+        trace = self._current
+        if trace is not None:
+            trace.stages.append((stage, time.perf_counter_ns()))
+
+    def rendered(self):
+        now = time.perf_counter_ns()
+        for trace in self._frame_traces:
+            if trace.rendered is None:
+                trace.rendered = now
+
+    def flipped(self):
+        now = time.perf_counter_ns()
+        lines = []
+        for trace in self._frame_traces:
+            if trace.rendered is None:
+                continue
+            change = trace.stages[-1][0] if trace.stages else 'none'
+            label = f"{trace.kind}/{change}"
+            hist = self.histograms.get(label)
+            if hist is None:
+                hist = self.histograms[label] = Histogram()
+            total = (now - trace.dequeued) / 1e6
+            hist.add(total)
+            if self._file is not None:
+                record = {'frame': trace.frame, 'event': trace.kind, 'change': change,
+                          'handled_ms': _ms(trace.handled, trace.dequeued),
+                          'render_ms': _ms(trace.rendered, trace.dequeued),
+                          'total_ms': round(total, 3)}
+                for stage, t in trace.stages:
+                    record.setdefault(f'{stage}_ms', _ms(t, trace.dequeued))
+                lines.append(json.dumps(record, separators=(',', ':')))
+        if lines:
+            self._file.write("\n".join(lines) + "\n")
+        self._frame_traces = []
+        self._open.clear()
+        self.frame += 1
+
+    def summary(self):
+        return {label: hist.summary() for label, hist in sorted(self.histograms.items())}
+
+    def report(self):
+        lines = [f"{'event':<16} {'n':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  (ms, dequeue to flip)"]
+        for label, s in self.summary().items():
+            lines.append(f"{label:<16} {s['n']:7d} {s['p50_ms']:8.2f} {s['p95_ms']:8.2f} "
+                         f"{s['p99_ms']:8.2f} {s['max_ms']:8.2f}")
+        return "\n".join(lines)
+
+    def close(self):
+        if self._file is not None:
+            self._file.write(json.dumps({'summary': self.summary()}, separators=(',', ':')) + "\n")
+            self._file.close()
+            self._file = None
+
+
+def _ms(t, start):
+    return None if t is None else round((t - start) / 1e6, 3)
+
+
+# The game loop and the instrumented code call tracer.*(); it stays a no-op
+# until install().
+tracer = _NullTracer()
+
+
+def install(new):
+    global tracer
+    tracer = new
+    return new
+
+
+def uninstall():
+    global tracer
+    previous, tracer = tracer, _NullTracer()
+    previous.close()
+    return previous
@@ -0,0 +1,471 @@
+import bisect
+import json
+import math
+import os
+import queue
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from collections import namedtuple
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.geodle', 'leaderboard.sqlite3')
+MAX_BATCH = 4096
+CHECKPOINT_INTERVAL = 5.0
+TOP_N = 10
+
+# Solve times are kept to within 1% relative error, between 1 ms and
+# 2^24 ms (about 4.7 hours); slower solves all land in the last bucket.
+ACCURACY = 0.01
+MAX_MS = 1 << 24
+GAMMA = (1 + ACCURACY) / (1 - ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+BUCKETS = int(math.ceil(math.log(MAX_MS) / LOG_GAMMA)) + 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    finished_at REAL NOT NULL,
+    day INTEGER NOT NULL,
+    target TEXT NOT NULL,
+    player TEXT NOT NULL,
+    guesses INTEGER NOT NULL,
+    won INTEGER NOT NULL,
+    duration_ms INTEGER NOT NULL,
+    guess_names TEXT
+);
+CREATE TABLE IF NOT EXISTS boards (
+    day INTEGER NOT NULL,
+    target TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    sketch BLOB NOT NULL,
+    top TEXT NOT NULL,
+    PRIMARY KEY (day, target)
+);
+CREATE INDEX IF NOT EXISTS results_board ON results (day, target);
+"""
+
+BOARD_HEADER = struct.Struct('<BBII')   # version, max guesses, failed, total
+SKETCH_HEADER = struct.Struct('<H')     # non-empty buckets
+BUCKET = struct.Struct('<HI')           # bucket, count
+BOARD_VERSION = 1
+
+
+# Queued by warm(): load this board on the writer thread.
+_Warm = namedtuple('_Warm', 'day target')
+
+
+def bucket_of(ms) -> int:
+    if ms <= 1:
+        return 0
+    return min(BUCKETS - 1, int(math.ceil(math.log(ms) / LOG_GAMMA)))
+
+
+def bucket_value(k) -> float:
+    # Midpoint of bucket k in the relative sense: within ACCURACY of every
+    # time that falls into it.
+    if k == 0:
+        return 1.0
+    return 2 * GAMMA ** k / (GAMMA + 1)
+
+
+def encode_counts(counts) -> bytes:
+    pairs = [(k, n) for k, n in enumerate(counts) if n]
+    return SKETCH_HEADER.pack(len(pairs)) + b''.join(BUCKET.pack(k, n) for k, n in pairs)
+
+
+class TimeSketch:
+    # Streaming quantile sketch of solve times: a log-bucketed histogram
+    # (as in DDSketch) whose counts sit in a Fenwick tree, so adding a time,
+    # ranking one and reading a quantile are all O(log BUCKETS) no matter
+    # how many results have been seen. The plain bucket counts are kept too,
+    # for serialising.
+    def __init__(self):
+        self.count = 0
+        self._counts = [0] * BUCKETS
+        self._tree = [0] * (BUCKETS + 1)
+
+    def add(self, ms, n=1):
+        self.count += n
+        k = bucket_of(ms)
+        self._counts[k] += n
+        i = k + 1
+        tree = self._tree
+        while i <= BUCKETS:
+            tree[i] += n
+            i += i & -i
+
+    def _prefix(self, k) -> int:
+        # Number of times in buckets [0, k).
+        total = 0
+        tree = self._tree
+        while k > 0:
+            total += tree[k]
+            k -= k & -k
+        return total
+
+    def count_below(self, ms) -> int:
+        return self._prefix(bucket_of(ms))
+
+    def count_above(self, ms) -> int:
+        return self.count - self._prefix(bucket_of(ms) + 1)
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = min(self.count - 1, max(0, int(q * self.count)))
+        # Walk down the tree for the first bucket whose prefix exceeds rank.
+        pos, step = 0, 1 << (BUCKETS.bit_length() - 1)
+        tree = self._tree
+        while step:
+            nxt = pos + step
+            if nxt <= BUCKETS and tree[nxt] <= rank:
+                pos = nxt
+                rank -= tree[nxt]
+            step >>= 1
+        return bucket_value(pos)
+
+    def to_bytes(self) -> bytes:
+        return encode_counts(self._counts)
+
+    @classmethod
+    def from_bytes(cls, data, pos=0):
+        sketch = cls()
+        (n,) = SKETCH_HEADER.unpack_from(data, pos)
+        pos += SKETCH_HEADER.size
+        tree = sketch._tree
+        for _ in range(n):
+            k, count = BUCKET.unpack_from(data, pos)
+            pos += BUCKET.size
+            sketch._counts[k] += count
+            tree[k + 1] += count
+            sketch.count += count
+        # Turn the plain counts into a Fenwick tree in one O(BUCKETS) pass.
+        for i in range(1, BUCKETS + 1):
+            j = i + (i & -i)
+            if j <= BUCKETS:
+                tree[j] += tree[i]
+        return sketch, pos
+
+
+class Board:
+    # Every result for one target on one day. A win ranks above any loss,
+    # fewer guesses above more, then faster above slower, so "players you
+    # beat" is the losses, the wins that took more guesses, and the slower
+    # wins in your guess count: at most max_guesses sketch lookups.
+    def __init__(self, max_guesses=6):
+        self.max_guesses = max_guesses
+        self.sketches = [TimeSketch() for _ in range(max_guesses)]
+        self.failed = 0
+        self.total = 0
+        self.top = []
+
+    def add(self, player, guesses, won, duration_ms):
+        self.total += 1
+        if not won or not 1 <= guesses <= self.max_guesses:
+            self.failed += 1
+            return
+        self.sketches[guesses - 1].add(duration_ms)
+        if len(self.top) < TOP_N or (guesses, duration_ms) < tuple(self.top[-1][:2]):
+            bisect.insort(self.top, [guesses, int(duration_ms), player])
+            del self.top[TOP_N:]
+
+    def beaten(self, guesses, won, duration_ms) -> int:
+        if not won or not 1 <= guesses <= self.max_guesses:
+            return 0
+        slower = sum([s.count for s in self.sketches[guesses:]])
+        return self.failed + slower + self.sketches[guesses - 1].count_above(duration_ms)
+
+    def beat_percent(self, guesses, won, duration_ms):
+        # Share of the other results on this board ranked below this one,
+        # for a result that has already been added.
+        others = self.total - 1
+        if others <= 0:
+            return None
+        return 100.0 * self.beaten(guesses, won, duration_ms) / others
+
+    def median_ms(self, guesses):
+        return self.sketches[guesses - 1].quantile(0.5)
+
+    def snapshot(self):
+        # A copy of what to_bytes() needs, cheap enough to take under a lock
+        # and encode after releasing it.
+        return self.max_guesses, self.failed, self.total, [list(s._counts) for s in self.sketches]
+
+    @staticmethod
+    def encode(max_guesses, failed, total, counts) -> bytes:
+        return (BOARD_HEADER.pack(BOARD_VERSION, max_guesses, failed, total)
+                + b''.join(encode_counts(c) for c in counts))
+
+    def to_bytes(self) -> bytes:
+        return self.encode(*self.snapshot())
+
+    @classmethod
+    def from_bytes(cls, data, top=()):
+        version, max_guesses, failed, total = BOARD_HEADER.unpack_from(data)
+        if version != BOARD_VERSION:
+            raise ValueError(f"unsupported board version {version}")
+        board = cls(max_guesses)
+        board.failed, board.total = failed, total
+        pos = BOARD_HEADER.size
+        for i in range(max_guesses):
+            board.sketches[i], pos = TimeSketch.from_bytes(data, pos)
+        board.top = [list(entry) for entry in top]
+        return board
+
+
+class Leaderboard:
+    # Boards are loaded one at a time when first needed, so startup cost
+    # doesn't grow with the number of results. Every result is appended to
+    # the results table by a background thread; the boards touched since
+    # the last checkpoint are snapshotted every CHECKPOINT_INTERVAL seconds
+    # and on close. Loading a board reads its snapshot, which covers the
+    # first `total` results for it, and replays any results after those.
+    def __init__(self, path=None, max_guesses=6):
+        self.path = path or DEFAULT_PATH
+        self.max_guesses = max_guesses
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = self._connect()
+        self._conn.executescript(SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(results)")}
+        if 'guess_names' not in columns:
+            # Databases from before result cards kept no guesses.
+            self._conn.execute("ALTER TABLE results ADD COLUMN guess_names TEXT")
+        self._boards = {}
+        self._dirty = set()
+        # Held while a result is added and queued, so a checkpoint sees
+        # every board exactly as of the results it writes with it.
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._run, name='geodle-leaderboard', daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def board(self, day, target) -> Board:
+        key = (day, target)
+        board = self._boards.get(key)
+        if board is None:
+            board = self._load(self._conn, day, target)
+            with self._lock:
+                board = self._boards.setdefault(key, board)
+        return board
+
+    def warm(self, day, target):
+        # Asks the writer thread to load a board before its first record(),
+        # so the query and replay don't run on the render thread when the
+        # game ends. Call it when a game starts.
+        if (day, target) not in self._boards:
+            self._queue.put(_Warm(day, target))
+
+    def _load(self, conn, day, target):
+        board = None
+        row = conn.execute("SELECT sketch, top FROM boards WHERE day = ? AND target = ?",
+                           (day, target)).fetchone()
+        if row is not None:
+            try:
+                board = Board.from_bytes(row[0], json.loads(row[1]))
+            except (ValueError, struct.error) as e:
+                print(f"Rebuilding leaderboard for day {day}: {e}")
+        if board is None:
+            board = Board(self.max_guesses)
+        cur = conn.execute("SELECT player, guesses, won, duration_ms FROM results "
+                           "WHERE day = ? AND target = ? ORDER BY id LIMIT -1 OFFSET ?",
+                           (day, target, board.total))
+        for player, guesses, won, duration_ms in cur:
+            board.add(player, guesses, bool(won), duration_ms)
+        return board
+
+    def record(self, day, target, player, guesses, won, duration_ms, guess_names=None):
+        # Called from the render loop. Returns the share of today's other
+        # players on this target that the result beat, or None if it is
+        # the first. guess_names, if given, is kept for result cards.
+        board = self.board(day, target)
+        row = (time.time(), day, target, player, guesses, 1 if won else 0, int(duration_ms),
+               json.dumps(list(guess_names), ensure_ascii=False) if guess_names is not None else None)
+        with self._lock:
+            board.add(player, guesses, won, duration_ms)
+            self._dirty.add((day, target))
+            self._queue.put(row)
+        return board.beat_percent(guesses, won, duration_ms)
+
+    def _drain(self, batch, limit, warm):
+        # Moves queued rows into batch and warm requests into warm without
+        # blocking; True once the stop marker has been taken.
+        while len(batch) < limit:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return False
+            if item is None:
+                return True
+            (warm if isinstance(item, _Warm) else batch).append(item)
+        return False
+
+    def _warm(self, conn, day, target):
+        # Runs after the batch holding every result queued before the
+        # request has been written. A board record() loaded meanwhile wins.
+        if (day, target) in self._boards:
+            return
+        board = self._load(conn, day, target)
+        with self._lock:
+            self._boards.setdefault((day, target), board)
+
+    def _run(self):
+        conn = self._connect()
+        last_checkpoint = time.monotonic()
+        try:
+            stop = False
+            while not stop:
+                batch = []
+                warm = []
+                try:
+                    item = self._queue.get(timeout=CHECKPOINT_INTERVAL)
+                except queue.Empty:
+                    item = ()
+                if item is None:
+                    stop = True
+                elif item:
+                    (warm if isinstance(item, _Warm) else batch).append(item)
+                    stop = self._drain(batch, MAX_BATCH, warm)
+                snapshots = None
+                if stop or time.monotonic() - last_checkpoint >= CHECKPOINT_INTERVAL:
+                    with self._lock:
+                        # Nothing can be queued while the lock is held, so
+                        # after this drain the snapshots match the batch.
+                        stop = self._drain(batch, float('inf'), warm) or stop
+                        dirty = [(key, self._boards[key].snapshot(), list(self._boards[key].top))
+                                 for key in self._dirty]
+                        self._dirty.clear()
+                    snapshots = [(day, target, state[2], Board.encode(*state), json.dumps(top))
+                                 for (day, target), state, top in dirty]
+                    last_checkpoint = time.monotonic()
+                if batch or snapshots:
+                    self._write(conn, batch, snapshots)
+                for day, target in warm:
+                    try:
+                        self._warm(conn, day, target)
+                    except sqlite3.Error as e:
+                        print(f"Failed to load leaderboard for day {day}: {e}")
+        finally:
+            conn.close()
+
+    def _write(self, conn, batch, snapshots):
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO results (finished_at, day, target, player, guesses, won, duration_ms, "
+                    "guess_names) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+                if snapshots:
+                    conn.executemany("INSERT OR REPLACE INTO boards (day, target, total, sketch, top) "
+                                     "VALUES (?, ?, ?, ?, ?)", snapshots)
+        except sqlite3.Error as e:
+            print(f"Failed to save leaderboard: {e}")
+
+    def games(self, day):
+        # Every result of a day that kept its guesses, oldest first.
+        cur = self._conn.execute("SELECT player, target, guess_names, won, duration_ms FROM results "
+                                 "WHERE day = ? AND guess_names IS NOT NULL ORDER BY id", (day,))
+        return [{'player': player, 'target': target, 'guesses': json.loads(names), 'won': bool(won),
+                 'duration_ms': duration_ms, 'day': day}
+                for player, target, names, won, duration_ms in cur]
+
+    def close(self, timeout=60.0):
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout)
+        self._conn.close()
+
+
+def bench(results=2_000_000, days=30, targets=226, queries=20000, seed=0, path=None):
+    # Ingests synthetic results through the real store (sketch updates in
+    # the caller, SQLite writes on the writer thread), then measures
+    # "you beat X%" latency and its error against an exact ranking.
+    import random
+    import tempfile
+
+    rng = random.Random(seed)
+    tmp = None
+    if path is None:
+        tmp = tempfile.TemporaryDirectory()
+        path = os.path.join(tmp.name, 'leaderboard.sqlite3')
+    names = [f'country-{i}' for i in range(targets)]
+    # Popular targets get most of the traffic, as the daily country would.
+    weights = [1.0 / (i + 1) for i in range(targets)]
+    picks = rng.choices(names, weights, k=results)
+    rows = []
+    for target in picks:
+        guesses = min(7, 1 + int(rng.expovariate(0.6)))
+        ms = int(rng.lognormvariate(11.0, 0.8))
+        rows.append((rng.randrange(days), target, guesses, guesses <= 6, ms))
+    print(f"Generated {results:,} results over {days} days x {targets} targets")
+
+    board = Leaderboard(path)
+    t0 = time.perf_counter()
+    for i, (day, target, guesses, won, ms) in enumerate(rows):
+        board.record(day, target, f'p{i % 5000}', guesses, won, ms)
+    ingest = time.perf_counter() - t0
+    board.close()
+    flushed = time.perf_counter() - t0
+    print(f"Ingest: {results / ingest:,.0f} results/s in memory, "
+          f"{results / flushed:,.0f} results/s including SQLite ({flushed:.1f}s)")
+
+    board = Leaderboard(path)
+    t0 = time.perf_counter()
+    hot = board.board(0, names[0])
+    print(f"Loaded the busiest board ({hot.total:,} results) in {(time.perf_counter() - t0) * 1e3:.2f} ms")
+    samples = [rows[rng.randrange(results)] for _ in range(queries)]
+    lat = []
+    for day, target, guesses, won, ms in samples:
+        b = board.board(day, target)
+        s = time.perf_counter()
+        b.beaten(guesses, won, ms)
+        lat.append(time.perf_counter() - s)
+    lat.sort()
+    print(f"Query: p50 {lat[len(lat) // 2] * 1e6:.1f} us, p99 {lat[int(len(lat) * 0.99)] * 1e6:.1f} us")
+
+    exact = sorted((0 if won else 1, guesses, ms) for day, target, guesses, won, ms in rows
+                   if day == 0 and target == names[0])
+    worst = 0.0
+    for day, target, guesses, won, ms in samples[:2000]:
+        if not won:
+            continue
+        truth = len(exact) - bisect.bisect_right(exact, (0, guesses, ms))
+        worst = max(worst, abs(hot.beaten(guesses, won, ms) - truth) / len(exact) * 100)
+    print(f"Max rank error on the busiest board: {worst:.2f} percentage points")
+    board.close()
+    if tmp is not None:
+        tmp.cleanup()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Daily leaderboard tools")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('bench', help="ingest synthetic results and time rank queries")
+    p.add_argument('--results', type=int, default=2_000_000)
+    p.add_argument('--days', type=int, default=30)
+    p.add_argument('--seed', type=int, default=0)
+    p.add_argument('--path', default=None, help="keep the benchmark database at PATH")
+    p = sub.add_parser('top', help="print a day's best results for a target")
+    p.add_argument('target')
+    p.add_argument('--day', type=int, default=None, help="day number (default: today)")
+    p.add_argument('--path', default=None)
+    args = parser.parse_args()
+    if args.command == 'bench':
+        bench(results=args.results, days=args.days, seed=args.seed, path=args.path)
+        sys.exit(0)
+    from gameplay import CountryDatabase
+    day = args.day if args.day is not None else CountryDatabase().day_number()
+    store = Leaderboard(args.path)
+    b = store.board(day, args.target)
+    print(f"{args.target}, day {day}: {b.total} results")
+    for i, (guesses, ms, player) in enumerate(b.top, 1):
+        print(f"{i:>3}. {player:<20} {guesses} guesses  {ms / 1000:.1f}s")
+    store.close()
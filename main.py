@@ -1,9 +1,91 @@
+import argparse
 import sys
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Geodle - a Wordle-ish geography game")
+    parser.add_argument('--practice', action='store_true',
+                        help="unlimited guesses with a scrollable guess history")
+    parser.add_argument('--seed', type=int, default=None, help="RNG seed for target and confetti")
+    parser.add_argument('--record', metavar='LOG', default=None,
+                        help="record input events and state checksums to a binary log")
+    parser.add_argument('--replay', metavar='LOG', default=None,
+                        help="replay a recorded log headlessly at full speed and verify it")
+    parser.add_argument('--soak', metavar='GAMES', type=int, default=None,
+                        help="play GAMES scripted games headlessly and fail if retained memory keeps growing")
+    parser.add_argument('--dataset', metavar='NAME', default=None,
+                        help="dataset to play (default: countries); F4 switches in game")
+    parser.add_argument('--list-datasets', action='store_true', help="list the available datasets and exit")
+    parser.add_argument('--dataset-budget', metavar='MB', type=float, default=None,
+                        help="memory kept for loaded datasets before the least recently used are dropped")
+    parser.add_argument('--renderer', choices=('surface', 'texture'), default='surface',
+                        help="draw with software blits (surface) or SDL2 textures (texture)")
+    parser.add_argument('--stats', metavar='PATH', default=None,
+                        help="player statistics database (default: ~/.geodle/stats.sqlite3)")
+    parser.add_argument('--no-stats', action='store_true', help="don't record finished games")
+    parser.add_argument('--save', metavar='PATH', default=None,
+                        help="in-progress game save (default: ~/.geodle/save.bin)")
+    parser.add_argument('--no-save', action='store_true', help="don't save or resume the current game")
+    parser.add_argument('--leaderboard', metavar='PATH', nargs='?', const='', default=None,
+                        help="rank finished games against other players of the same daily target "
+                             "(default: ~/.geodle/leaderboard.sqlite3)")
+    parser.add_argument('--player', metavar='NAME', default=None,
+                        help="name recorded on the leaderboard (default: login name)")
+    parser.add_argument('--telemetry', metavar='DIR', default=None,
+                        help="write structured gameplay events to rotating JSON Lines files in DIR")
+    parser.add_argument('--latency', metavar='PATH', nargs='?', const='', default=None,
+                        help="trace input-to-display latency per event (F2 shows it); "
+                             "with PATH, also log every event as JSON Lines")
+    parser.add_argument('--host', action='store_true', help="host a LAN race and play in it")
+    parser.add_argument('--join', metavar='ADDRESS', default=None, help="join a LAN race hosted at ADDRESS")
+    parser.add_argument('--port', type=int, default=47017, help="race port (default: 47017)")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="report wall time and peak memory per startup phase, then exit")
+    parser.add_argument('--profile-format', choices=('text', 'json'), default='text')
+    parser.add_argument('--profile-out', default=None, help="write the startup report to a file")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.profile_startup:
+        from startup_profile import profile_startup
+        profile_startup(practice=args.practice, fmt=args.profile_format, out=args.profile_out)
+        return
+    if args.list_datasets or args.dataset:
+        from datasets import discover
+        found = discover()
+        if args.list_datasets:
+            for d in found:
+                print(f"{d.name:<16} {d.title:<24} {d.path}")
+            return
+        if args.dataset not in [d.name for d in found]:
+            print(f"Unknown dataset {args.dataset!r}; available: {', '.join(d.name for d in found)}")
+            sys.exit(2)
+    if args.replay:
+        from replay import replay
+        result = replay(args.replay, renderer=args.renderer)
+        print(f"Replayed {result['frames']} frames ({result['events']} events) in "
+              f"{result['elapsed_s']:.2f}s, {result['fps']:.0f} fps ({result['renderer']} renderer)")
+        if result['mismatches']:
+            print(f"Checksum mismatch at {len(result['mismatches'])} frames, first at frame {result['mismatches'][0]}")
+            sys.exit(1)
+        return
+    if args.soak is not None:
+        from soak import print_report, soak
+        result = soak(args.soak, seed=args.seed or 0, practice=args.practice)
+        print_report(result)
+        sys.exit(1 if result['failed'] else 0)
     from gameplay import main as gameplay_main
+    race = None
+    if args.host:
+        race = ('host', args.port)
+    elif args.join:
+        race = ('join', args.join, args.port)
     try:
-        gameplay_main()
+        gameplay_main(practice=args.practice, seed=args.seed, record=args.record,
+                      stats_path="" if args.no_stats else args.stats, telemetry_dir=args.telemetry,
+                      save_path="" if args.no_save else args.save, race=race,
+                      leaderboard_path=args.leaderboard, player=args.player, latency_path=args.latency,
+                      renderer=args.renderer, dataset=args.dataset, dataset_budget=args.dataset_budget)
     except SystemExit:
         raise
     except Exception:
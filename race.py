@@ -0,0 +1,540 @@
+import argparse
+import asyncio
+import math
+import os
+import queue
+import random
+import struct
+import sys
+import threading
+import time
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import latency
+import telemetry
+from gameplay import CountryDatabase, GeodleGame, hint_statuses
+
+DEFAULT_PORT = 47017
+PROTOCOL = 2
+MAX_BUFFER = 256 * 1024
+
+# Wire format: u16 payload length, u8 message type, payload. Hints travel as
+# one status code per category; guessed country names are only ever sent to
+# the player who made the guess. Rows are u32 so any dataset fits (protocol
+# 1 used u16).
+HEADER = struct.Struct('!HB')
+HELLO, WELCOME, GUESS, RESULT, OPPONENT, LEAVE, RESTART, ROUND, ERROR = range(1, 10)
+HELLO_S = struct.Struct('!H20s')         # protocol, dataset sha1
+WELCOME_S = struct.Struct('!BBI')        # player id, max guesses, round
+GUESS_S = struct.Struct('!I')            # row
+RESULT_S = struct.Struct('!IBBIff')      # row, flags, place, target row, km, bearing
+OPPONENT_S = struct.Struct('!BBB')       # player id, guess count, flags
+LEAVE_S = struct.Struct('!B')
+ROUND_S = struct.Struct('!I')
+
+F_REJECTED = 1
+F_WON = 2
+F_DONE = 4
+NO_ROW = 0xFFFFFFFF
+
+STATUS_CODES = ['good', 'bad', 'up', 'down']
+STATUS_CODE = {s: i for i, s in enumerate(STATUS_CODES)}
+
+
+def pack(kind, payload=b''):
+    return HEADER.pack(len(payload), kind) + payload
+
+
+async def read_message(reader):
+    size, kind = HEADER.unpack(await reader.readexactly(HEADER.size))
+    return kind, (await reader.readexactly(size) if size else b'')
+
+
+def decode(kind, payload):
+    if kind == RESULT:
+        row, flags, place, target, km, bearing = RESULT_S.unpack_from(payload)
+        return ('result', {
+            'row': row, 'rejected': bool(flags & F_REJECTED), 'won': bool(flags & F_WON),
+            'done': bool(flags & F_DONE), 'place': place,
+            'target': None if target == NO_ROW else target,
+            'distance': None if math.isnan(km) else (km, bearing),
+            'statuses': [STATUS_CODES[c] for c in payload[RESULT_S.size:]],
+        })
+    if kind == OPPONENT:
+        pid, count, flags = OPPONENT_S.unpack_from(payload)
+        return ('opponent', {'pid': pid, 'count': count, 'won': bool(flags & F_WON),
+                             'done': bool(flags & F_DONE),
+                             'statuses': [STATUS_CODES[c] for c in payload[OPPONENT_S.size:]]})
+    if kind == LEAVE:
+        return ('leave', LEAVE_S.unpack(payload)[0])
+    if kind == ROUND:
+        return ('round', ROUND_S.unpack(payload)[0])
+    if kind == WELCOME:
+        return ('welcome',) + WELCOME_S.unpack(payload)
+    if kind == ERROR:
+        return ('error', payload.decode('utf-8', 'replace'))
+    return ('unknown', kind)
+
+
+class _Player:
+    def __init__(self, pid, writer):
+        self.pid = pid
+        self.writer = writer
+        self.reset()
+
+    def reset(self):
+        self.rows = []
+        self.codes = []
+        self.done = False
+        self.won = False
+        self.place = 0
+
+    def flags(self):
+        return (F_WON if self.won else 0) | (F_DONE if self.done else 0)
+
+
+class RaceServer:
+    # Authoritative host: owns the target and evaluates every guess. Runs its
+    # own asyncio loop on a daemon thread so the host's render loop is never
+    # involved in network I/O.
+    def __init__(self, database, host='0.0.0.0', port=DEFAULT_PORT, max_guesses=6, seed=None):
+        self.database = database
+        self.host = host
+        self.port = port
+        self.max_guesses = max_guesses
+        self.rng = random.Random(seed)
+        self.players = {}
+        self.round = 0
+        self.target = None
+        self.winners = 0
+        self.error = None
+        self._next_pid = 1
+        self._loop = None
+        self._server = None
+        self._ready = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='geodle-race-server', daemon=True)
+        self._thread.start()
+        self._ready.wait(5.0)
+        if self.error:
+            raise self.error
+        return self
+
+    def _run(self):
+        loop = self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            self._server = loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+        except OSError as e:
+            self.error = e
+            self._ready.set()
+            loop.close()
+            return
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._new_round()
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            self._server.close()
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.run_until_complete(self._server.wait_closed())
+            loop.close()
+
+    def close(self):
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(5.0)
+
+    def _new_round(self):
+        self.round += 1
+        self.target = self.rng.randrange(len(self.database.rows))
+        self.winners = 0
+        for player in self.players.values():
+            player.reset()
+
+    def _allocate_pid(self):
+        for _ in range(255):
+            pid = self._next_pid
+            self._next_pid = self._next_pid % 255 + 1
+            if pid not in self.players:
+                return pid
+        return None
+
+    def _send(self, player, frame):
+        transport = player.writer.transport
+        if transport.is_closing():
+            return
+        # A client that stops reading is dropped rather than buffered forever.
+        if transport.get_write_buffer_size() > MAX_BUFFER:
+            transport.abort()
+            return
+        player.writer.write(frame)
+
+    def _broadcast(self, sender, frame):
+        for player in self.players.values():
+            if player is not sender:
+                self._send(player, frame)
+
+    async def _handle(self, reader, writer):
+        player = None
+        try:
+            kind, payload = await read_message(reader)
+            if kind != HELLO or len(payload) != HELLO_S.size:
+                return
+            version, digest = HELLO_S.unpack(payload)
+            if version != PROTOCOL or digest.hex() != self.database.dataset_hash:
+                writer.write(pack(ERROR, b"protocol or country.json differs from the host"))
+                await writer.drain()
+                return
+            pid = self._allocate_pid()
+            if pid is None:
+                writer.write(pack(ERROR, b"race is full"))
+                await writer.drain()
+                return
+            player = self.players[pid] = _Player(pid, writer)
+            writer.write(pack(WELCOME, WELCOME_S.pack(pid, self.max_guesses, self.round)))
+            for other in self.players.values():
+                if other is player:
+                    continue
+                for i, codes in enumerate(other.codes):
+                    last = i == len(other.codes) - 1
+                    flags = other.flags() if last else 0
+                    writer.write(pack(OPPONENT, OPPONENT_S.pack(other.pid, i + 1, flags) + codes))
+            while True:
+                kind, payload = await read_message(reader)
+                if kind == GUESS and len(payload) == GUESS_S.size:
+                    self._guess(player, GUESS_S.unpack(payload)[0])
+                elif kind == RESTART:
+                    self._restart()
+        except (asyncio.IncompleteReadError, ConnectionError, OSError, asyncio.CancelledError):
+            # Cancellation only happens at shutdown; ending quietly keeps
+            # asyncio from logging every open connection.
+            pass
+        finally:
+            if player is not None and self.players.get(player.pid) is player:
+                del self.players[player.pid]
+                self._broadcast(None, pack(LEAVE, LEAVE_S.pack(player.pid)))
+            writer.close()
+
+    def _guess(self, player, row):
+        db = self.database
+        if player.done or row >= len(db.rows) or row in player.rows:
+            self._send(player, pack(RESULT, RESULT_S.pack(row, F_REJECTED, 0, NO_ROW, math.nan, math.nan)))
+            return
+        codes = bytes(STATUS_CODE[s] for s in hint_statuses(db.rows[row], db.rows[self.target]))
+        player.rows.append(row)
+        player.codes.append(codes)
+        if row == self.target:
+            self.winners += 1
+            player.won = player.done = True
+            player.place = self.winners
+        elif len(player.rows) >= self.max_guesses:
+            player.done = True
+        hint = db.geo().lookup(row, self.target) if db.has_coordinates else None
+        km, bearing = hint if hint else (math.nan, math.nan)
+        self._send(player, pack(RESULT, RESULT_S.pack(row, player.flags(), player.place,
+                                                      self.target if player.done else NO_ROW,
+                                                      km, bearing) + codes))
+        self._broadcast(player, pack(OPPONENT, OPPONENT_S.pack(player.pid, len(player.rows), player.flags()) + codes))
+
+    def _restart(self):
+        # A new round starts once everyone connected has finished this one.
+        if not all(p.done for p in self.players.values()):
+            return
+        self._new_round()
+        frame = pack(ROUND, ROUND_S.pack(self.round))
+        for player in self.players.values():
+            self._send(player, frame)
+
+
+class RaceClient:
+    # Connection to a RaceServer on a background asyncio loop. The game loop
+    # only ever calls send_guess()/request_restart(), which schedule a write,
+    # and poll(), which drains already-decoded messages without blocking.
+    def __init__(self, host, port, database, timeout=5.0):
+        self.host = host
+        self.port = port
+        self.database = database
+        self.timeout = timeout
+        self.inbox = queue.Queue()
+        self.pid = None
+        self.max_guesses = 6
+        self.round = 0
+        self.connected = False
+        self.error = None
+        self._loop = None
+        self._writer = None
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='geodle-race-client', daemon=True)
+
+    def connect(self):
+        self._thread.start()
+        self._ready.wait(self.timeout + 1.0)
+        if self.pid is None:
+            raise ConnectionError(f"could not join race at {self.host}:{self.port}: {self.error or 'timed out'}")
+        return self
+
+    def _run(self):
+        loop = self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(self._main())
+        finally:
+            loop.close()
+
+    async def _main(self):
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            self.error = e
+            self._ready.set()
+            return
+        self._writer = writer
+        self.connected = True
+        writer.write(pack(HELLO, HELLO_S.pack(PROTOCOL, bytes.fromhex(self.database.dataset_hash))))
+        try:
+            while True:
+                msg = decode(*await read_message(reader))
+                if msg[0] == 'welcome':
+                    _, self.pid, self.max_guesses, self.round = msg
+                    self._ready.set()
+                    continue
+                if msg[0] == 'error':
+                    self.error = msg[1]
+                    self._ready.set()
+                self.inbox.put(msg)
+        except (asyncio.IncompleteReadError, ConnectionError, OSError):
+            pass
+        finally:
+            self.connected = False
+            self.inbox.put(('closed',))
+            self._ready.set()
+            writer.close()
+
+    def _send(self, frame):
+        if self.connected and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._writer.write, frame)
+
+    def send_guess(self, row):
+        self._send(pack(GUESS, GUESS_S.pack(row)))
+
+    def request_restart(self):
+        self._send(pack(RESTART))
+
+    def poll(self):
+        msgs = []
+        while True:
+            try:
+                msgs.append(self.inbox.get_nowait())
+            except queue.Empty:
+                return msgs
+
+    def close(self):
+        if self.connected and self._loop is not None:
+            self._loop.call_soon_threadsafe(self._writer.close)
+        self._thread.join(2.0)
+
+
+class RaceGame(GeodleGame):
+    # A GeodleGame whose target lives on the host. Guesses are validated
+    # locally, sent to the host, and only enter the table when the host's
+    # verdict arrives; the target is revealed when this player is done.
+    def __init__(self, client):
+        super().__init__(database=client.database)
+        self.client = client
+        self.max_guesses = client.max_guesses
+        self.new_round()
+
+    def new_round(self):
+        self.correct_country = None
+        self.guesses = []
+        self.statuses = {}
+        self.distances = {}
+        self.pending = None
+        self.game_over = False
+        self.won = False
+        self.place = 0
+        self.error_message = ""
+        self.error_timer = 0
+        self.particles = []
+        self.candidates = self.database.all_mask
+        self.started_ms = None
+        self.opponents = {}
+        self.opponents_version = 0
+        self.__dict__.pop('result_recorded', None)
+
+    def make_guess(self, country_name: str) -> bool:
+        if self.pending is not None:
+            self.error_message = "Waiting for the host..."
+            self.error_timer = 60
+            return False
+        country = self.database.resolve(country_name)
+        if country is None:
+            self.error_message = "Country not found!"
+            self.error_timer = 120
+            telemetry.sink.emit('invalid_guess', input=country_name, reason='not_found')
+            return False
+        country_name = country.name
+        if any(g.name == country_name for g in self.guesses):
+            self.error_message = "Already guessed this country!"
+            self.error_timer = 120
+            telemetry.sink.emit('invalid_guess', input=country_name, reason='duplicate')
+            return False
+        if not self.client.connected:
+            self.error_message = "Disconnected from the host"
+            self.error_timer = 120
+            return False
+        self.pending = country_name
+        self.client.send_guess(self.database.row_of[country_name])
+        latency.tracer.mark('guess')
+        return True
+
+    def hint_statuses(self, guess):
+        return self.statuses.get(guess.name, [])
+
+    def distance_hint(self, guess):
+        return self.distances.get(guess.name)
+
+    def apply(self, msg):
+        kind = msg[0]
+        if kind == 'result':
+            self._apply_result(msg[1])
+        elif kind == 'opponent':
+            o = msg[1]
+            opp = self.opponents.setdefault(o['pid'], {'rows': [], 'done': False, 'won': False})
+            del opp['rows'][o['count'] - 1:]
+            opp['rows'].append(o['statuses'])
+            opp['done'], opp['won'] = o['done'], o['won']
+            self.opponents_version += 1
+        elif kind == 'leave':
+            if self.opponents.pop(msg[1], None) is not None:
+                self.opponents_version += 1
+        elif kind == 'round':
+            self.new_round()
+        elif kind in ('error', 'closed'):
+            self.error_message = "Disconnected from the host" if kind == 'closed' else msg[1]
+            self.error_timer = 240
+        return kind
+
+    def _apply_result(self, r):
+        self.pending = None
+        if r['rejected']:
+            self.error_message = "The host rejected that guess"
+            self.error_timer = 120
+            return
+        db = self.database
+        guess = db.rows[r['row']]
+        self.guesses.append(guess)
+        self.statuses[guess.name] = r['statuses']
+        if r['distance'] is not None:
+            self.distances[guess.name] = r['distance']
+        self.candidates &= db.constraint_from_statuses(guess, r['statuses'], r['won'])
+        telemetry.sink.emit('guess', country=guess.name, n=len(self.guesses), hints=r['statuses'],
+                            remaining=self.remaining_candidates())
+        if r['done']:
+            self.correct_country = db.rows[r['target']]
+            self.game_over = True
+            self.won = r['won']
+            self.place = r['place']
+            if self.won:
+                try:
+                    self.spawn_confetti()
+                except Exception:
+                    pass
+
+
+def soak(clients=32, guesses=6, rounds=3, seed=0, host='127.0.0.1'):
+    # Localhost load test: one RaceServer and ``clients`` protocol-level
+    # players in a single asyncio loop. Reports how long an OPPONENT update
+    # takes to reach every other client after the guess is sent.
+    db = CountryDatabase()
+    server = RaceServer(db, host=host, port=0, max_guesses=guesses, seed=seed).start()
+    rng = random.Random(seed)
+    stamp = {}
+    latencies = []
+
+    def on_message(kind, payload):
+        if kind == OPPONENT:
+            pid, count, _ = OPPONENT_S.unpack_from(payload)
+            t0 = stamp.get((pid, count))
+            if t0 is not None:
+                latencies.append(time.perf_counter() - t0)
+
+    async def player(ready, go):
+        reader, writer = await asyncio.open_connection(host, server.port)
+        writer.write(pack(HELLO, HELLO_S.pack(PROTOCOL, bytes.fromhex(db.dataset_hash))))
+        pid = decode(*await read_message(reader))[1]
+        ready.release()
+        await go.wait()
+        for _ in range(rounds):
+            for count, row in enumerate(rng.sample(range(len(db.rows)), guesses), 1):
+                await asyncio.sleep(rng.uniform(0.0, 0.02))
+                stamp[(pid, count)] = time.perf_counter()
+                writer.write(pack(GUESS, GUESS_S.pack(row)))
+                # Wait for our own verdict before guessing again.
+                while True:
+                    kind, payload = await read_message(reader)
+                    if kind == RESULT:
+                        break
+                    on_message(kind, payload)
+                if decode(kind, payload)[1]['done']:
+                    break
+            writer.write(pack(RESTART))
+            while True:
+                kind, payload = await read_message(reader)
+                if kind == ROUND:
+                    break
+                on_message(kind, payload)
+        writer.close()
+
+    async def run():
+        ready = asyncio.Semaphore(0)
+        go = asyncio.Event()
+        tasks = [asyncio.create_task(player(ready, go)) for _ in range(clients)]
+        for _ in range(clients):
+            await ready.acquire()
+        go.set()
+        start = time.perf_counter()
+        await asyncio.wait_for(asyncio.gather(*tasks), 120)
+        return time.perf_counter() - start
+
+    try:
+        elapsed = asyncio.run(run())
+    finally:
+        server.close()
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000.0 if latencies else float('nan')
+
+    return {'clients': clients, 'updates': len(latencies), 'elapsed_s': elapsed,
+            'p50_ms': pct(0.50), 'p95_ms': pct(0.95), 'p99_ms': pct(0.99),
+            'max_ms': latencies[-1] * 1000.0 if latencies else float('nan')}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Geodle race mode tools")
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p = sub.add_parser('soak', help="measure broadcast latency with simulated clients on localhost")
+    p.add_argument('--clients', type=int, default=32)
+    p.add_argument('--guesses', type=int, default=6)
+    p.add_argument('--rounds', type=int, default=3)
+    p.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    r = soak(args.clients, args.guesses, args.rounds, args.seed)
+    print(f"{r['clients']} clients, {r['updates']} opponent updates in {r['elapsed_s']:.2f}s")
+    print(f"broadcast latency: p50 {r['p50_ms']:.2f} ms  p95 {r['p95_ms']:.2f} ms  "
+          f"p99 {r['p99_ms']:.2f} ms  max {r['max_ms']:.2f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,258 @@
+import contextlib
+import io
+import os
+import random
+import struct
+import time
+
+import pygame
+
+# Log layout: a fixed header, then records of
+#   varint frame delta, u8 type, type-specific payload
+# Input records carry a varint millisecond delta (the pygame tick count the
+# UI saw) before their payload. Checksum records are only written when the
+# state checksum changes, so idle frames cost nothing. Tick records give the
+# number of simulation steps a frame ran when that isn't one; version 1 logs
+# predate the fixed-step clock and always ran one. From version 3 the header
+# is followed by the u8-prefixed name of the dataset played; older logs
+# were all made on the built-in one.
+MAGIC = b'GEODLREC'
+VERSION = 3
+READABLE = (1, 2, 3)
+HEADER = struct.Struct('<8sHQBHH20s')
+
+T_QUIT = 1
+T_KEYDOWN = 2
+T_MOTION = 3
+T_BUTTONDOWN = 4
+T_BUTTONUP = 5
+T_WHEEL = 6
+T_RESIZE = 7
+T_CHECKSUM = 0x10
+T_TICKS = 0x11
+T_END = 0xFF
+
+_EVENT_TYPES = {
+    pygame.QUIT: T_QUIT,
+    pygame.KEYDOWN: T_KEYDOWN,
+    pygame.MOUSEMOTION: T_MOTION,
+    pygame.MOUSEBUTTONDOWN: T_BUTTONDOWN,
+    pygame.MOUSEBUTTONUP: T_BUTTONUP,
+    pygame.MOUSEWHEEL: T_WHEEL,
+    pygame.VIDEORESIZE: T_RESIZE,
+}
+
+
+def _varint(n):
+    out = bytearray()
+    while True:
+        b = n & 0x7F
+        n >>= 7
+        if n:
+            out.append(b | 0x80)
+        else:
+            out.append(b)
+            return bytes(out)
+
+
+def _zigzag(n):
+    return _varint((n << 1) ^ (n >> 63))
+
+
+class _Reader:
+    def __init__(self, data, pos=0):
+        self.data = data
+        self.pos = pos
+
+    def u8(self):
+        b = self.data[self.pos]
+        self.pos += 1
+        return b
+
+    def varint(self):
+        shift = n = 0
+        while True:
+            b = self.u8()
+            n |= (b & 0x7F) << shift
+            if not b & 0x80:
+                return n
+            shift += 7
+
+    def zigzag(self):
+        n = self.varint()
+        return (n >> 1) ^ -(n & 1)
+
+    def raw(self, size):
+        chunk = self.data[self.pos:self.pos + size]
+        self.pos += size
+        return chunk
+
+
+class Recorder:
+    def __init__(self, path, seed, practice, size, dataset_hash="", dataset=None):
+        self.f = open(path, 'wb')
+        digest = bytes.fromhex(dataset_hash) if dataset_hash else b'\0' * 20
+        name = (dataset or "").encode('utf-8')[:255]
+        self.f.write(HEADER.pack(MAGIC, VERSION, seed, 1 if practice else 0, size[0], size[1], digest)
+                     + bytes((len(name),)) + name)
+        self.last_frame = 0
+        self.last_ms = 0
+        self.last_checksum = None
+        self.events = 0
+
+    def _head(self, frame, kind):
+        self.f.write(_varint(frame - self.last_frame) + bytes((kind,)))
+        self.last_frame = frame
+
+    def record_events(self, frame, events, ms):
+        for event in events:
+            kind = _EVENT_TYPES.get(event.type)
+            if kind is None:
+                continue
+            self._head(frame, kind)
+            self.f.write(_varint(max(0, ms - self.last_ms)))
+            self.last_ms = ms
+            if kind == T_KEYDOWN:
+                text = getattr(event, 'unicode', '').encode('utf-8')[:255]
+                self.f.write(_varint(event.key) + _varint(getattr(event, 'mod', 0))
+                             + bytes((len(text),)) + text)
+            elif kind == T_MOTION:
+                self.f.write(_zigzag(event.pos[0]) + _zigzag(event.pos[1]))
+            elif kind in (T_BUTTONDOWN, T_BUTTONUP):
+                self.f.write(bytes((event.button,)) + _zigzag(event.pos[0]) + _zigzag(event.pos[1]))
+            elif kind == T_WHEEL:
+                self.f.write(_zigzag(event.x) + _zigzag(event.y))
+            elif kind == T_RESIZE:
+                self.f.write(_varint(event.w) + _varint(event.h))
+            self.events += 1
+
+    def record_ticks(self, frame, ticks):
+        if ticks != 1:
+            self._head(frame, T_TICKS)
+            self.f.write(_varint(ticks))
+
+    def record_checksum(self, frame, checksum):
+        if checksum == self.last_checksum:
+            return
+        self._head(frame, T_CHECKSUM)
+        self.f.write(struct.pack('<I', checksum))
+        self.last_checksum = checksum
+
+    def close(self, frame=None):
+        if self.f.closed:
+            return
+        self._head(max(self.last_frame, frame or 0), T_END)
+        self.f.close()
+
+
+def read_log(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, version, seed, practice, w, h, digest = HEADER.unpack_from(data)
+    if magic != MAGIC or version not in READABLE:
+        raise ValueError(f"{path} is not a Geodle recording")
+    rd = _Reader(data, HEADER.size)
+    dataset = rd.raw(rd.u8()).decode('utf-8') if version >= 3 else ""
+    header = {'seed': seed, 'practice': bool(practice), 'size': (w, h),
+              'dataset_hash': digest.hex() if digest.strip(b'\0') else "", 'dataset': dataset or None}
+    frames = {}
+    checksums = {}
+    ticks = {}
+    end = 0
+    frame = ms = 0
+    while rd.pos < len(data):
+        frame += rd.varint()
+        kind = rd.u8()
+        if kind == T_END:
+            end = max(end, frame)
+            break
+        if kind == T_CHECKSUM:
+            checksums[frame] = struct.unpack('<I', rd.raw(4))[0]
+            continue
+        if kind == T_TICKS:
+            ticks[frame] = rd.varint()
+            end = max(end, frame + 1)
+            continue
+        ms += rd.varint()
+        if kind == T_QUIT:
+            event = pygame.event.Event(pygame.QUIT)
+        elif kind == T_KEYDOWN:
+            key, mod = rd.varint(), rd.varint()
+            text = rd.raw(rd.u8()).decode('utf-8')
+            event = pygame.event.Event(pygame.KEYDOWN, key=key, mod=mod, unicode=text)
+        elif kind == T_MOTION:
+            pos = (rd.zigzag(), rd.zigzag())
+            event = pygame.event.Event(pygame.MOUSEMOTION, pos=pos, rel=(0, 0), buttons=(0, 0, 0))
+        elif kind in (T_BUTTONDOWN, T_BUTTONUP):
+            button = rd.u8()
+            pos = (rd.zigzag(), rd.zigzag())
+            etype = pygame.MOUSEBUTTONDOWN if kind == T_BUTTONDOWN else pygame.MOUSEBUTTONUP
+            event = pygame.event.Event(etype, button=button, pos=pos)
+        elif kind == T_WHEEL:
+            x, y = rd.zigzag(), rd.zigzag()
+            event = pygame.event.Event(pygame.MOUSEWHEEL, x=x, y=y, flipped=False)
+        elif kind == T_RESIZE:
+            w, h = rd.varint(), rd.varint()
+            event = pygame.event.Event(pygame.VIDEORESIZE, w=w, h=h, size=(w, h))
+        else:
+            raise ValueError(f"unknown record type {kind} at byte {rd.pos}")
+        frames.setdefault(frame, []).append((ms, event))
+        end = max(end, frame + 1)
+    return header, frames, checksums, ticks, end
+
+
+def replay(path, verify=True, quiet=True, renderer='surface'):
+    from backends import create
+    from datasets import DEFAULT_NAME, DatasetRegistry
+    from gameplay import GameSession
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    header, frames, checksums, ticks, end = read_log(path)
+    dataset = header['dataset'] or DEFAULT_NAME
+    try:
+        database = DatasetRegistry().get(dataset)
+    except KeyError:
+        raise ValueError(f"recording was made on dataset {dataset!r}, which isn't installed") from None
+    pygame.init()
+    random.seed(header['seed'])
+    backend = create(renderer, header['size'])
+    screen = backend.canvas
+    out = io.StringIO() if quiet else None
+    with contextlib.redirect_stdout(out) if quiet else contextlib.nullcontext():
+        session = GameSession(screen, practice=header['practice'], database=database, dataset=dataset)
+    if header['dataset_hash'] and database.dataset_hash != header['dataset_hash']:
+        raise ValueError(f"recording was made against a different version of {os.path.basename(database.path)}")
+
+    now = [0]
+    session.ui.now_ms = lambda: now[0]
+    expected = None
+    mismatches = []
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(out) if quiet else contextlib.nullcontext():
+        for frame in range(end):
+            events = []
+            for ms, event in frames.get(frame, ()):
+                now[0] = ms
+                if event.type == pygame.VIDEORESIZE:
+                    backend.resize(event.size)
+                events.append(event)
+            session.step(events, ticks.get(frame, 1))
+            backend.present()
+            if verify:
+                expected = checksums.get(frame, expected)
+                if expected is not None and session.checksum() != expected:
+                    mismatches.append(frame)
+            if not session.running:
+                break
+    elapsed = time.perf_counter() - start
+    backend.close()
+    pygame.quit()
+    frames_run = session.frame
+    return {
+        'frames': frames_run,
+        'events': sum(len(v) for v in frames.values()),
+        'elapsed_s': elapsed,
+        'fps': frames_run / elapsed if elapsed > 0 else float('inf'),
+        'mismatches': mismatches,
+        'renderer': backend.name,
+    }
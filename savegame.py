@@ -0,0 +1,115 @@
+import os
+import struct
+import zlib
+
+# A save is the game expressed as dataset row indices:
+#   header, u32 guess rows, u8-prefixed UTF-8 error message, u32 CRC32 of
+#   everything before it.
+# It is only valid against the exact country.json it was written with.
+# Version 1 stored rows as u16, which datasets past 65,535 rows overflow;
+# it is still read.
+MAGIC = b'GEODLSAV'
+VERSION = 2
+PREFIX = struct.Struct('<8sH')
+HEADERS = {
+    1: (struct.Struct('<8sH20sBHHH'), 'H'),
+    2: (struct.Struct('<8sH20sBIHH'), 'I'),
+}
+HEADER, ROW = HEADERS[VERSION]
+CRC = struct.Struct('<I')
+
+F_PRACTICE = 1
+F_GAME_OVER = 2
+F_WON = 4
+
+SAVE_DIR = os.path.join(os.path.expanduser('~'), '.geodle')
+
+
+def default_path(practice=False):
+    return os.path.join(SAVE_DIR, 'practice-save.bin' if practice else 'save.bin')
+
+
+def encode(game) -> bytes:
+    db = game.database
+    flags = ((F_PRACTICE if game.practice else 0) | (F_GAME_OVER if game.game_over else 0)
+             | (F_WON if game.won else 0))
+    rows = [db.row_of[g.name] for g in game.guesses]
+    error = game.error_message.encode('utf-8')[:255] if game.error_timer > 0 else b''
+    body = (HEADER.pack(MAGIC, VERSION, bytes.fromhex(db.dataset_hash), flags,
+                        db.row_of[game.correct_country.name], game.error_timer if error else 0, len(rows))
+            + struct.pack(f'<{len(rows)}{ROW}', *rows) + bytes((len(error),)) + error)
+    return body + CRC.pack(zlib.crc32(body))
+
+
+def decode(data, database):
+    # Returns a dict of game fields, or None if the save is damaged or was
+    # written against a different dataset.
+    if len(data) < PREFIX.size + CRC.size:
+        return None
+    body, (crc,) = data[:-CRC.size], CRC.unpack_from(data, len(data) - CRC.size)
+    if zlib.crc32(body) != crc:
+        return None
+    magic, version = PREFIX.unpack_from(body)
+    if magic != MAGIC or version not in HEADERS:
+        return None
+    header, row = HEADERS[version]
+    if len(body) < header.size + 1:
+        return None
+    _, _, digest, flags, target, error_timer, n = header.unpack_from(body)
+    if digest.hex() != database.dataset_hash:
+        return None
+    pos = header.size
+    if pos + struct.calcsize(f'<{n}{row}') >= len(body):
+        return None
+    rows = struct.unpack_from(f'<{n}{row}', body, pos)
+    pos += struct.calcsize(f'<{n}{row}')
+    if pos >= len(body) or any(r >= len(database.rows) for r in rows + (target,)):
+        return None
+    size = body[pos]
+    error = body[pos + 1:pos + 1 + size].decode('utf-8', 'replace')
+    return {
+        'practice': bool(flags & F_PRACTICE),
+        'game_over': bool(flags & F_GAME_OVER),
+        'won': bool(flags & F_WON),
+        'target': target,
+        'guesses': rows,
+        'error_message': error,
+        'error_timer': error_timer if error else 0,
+    }
+
+
+def save(game, path):
+    data = encode(game)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def clear(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def restore(game, path) -> bool:
+    # Applies a save to a freshly constructed game in place. Finished games
+    # and saves from the other mode are ignored.
+    try:
+        with open(path, 'rb') as f:
+            state = decode(f.read(), game.database)
+    except OSError:
+        return False
+    if state is None or state['game_over'] or state['practice'] != game.practice:
+        return False
+    db = game.database
+    game.correct_country = db.rows[state['target']]
+    game.guesses = [db.rows[r] for r in state['guesses']]
+    game.candidates = db.candidate_mask(game.guesses, game.correct_country)
+    game.error_message = state['error_message']
+    game.error_timer = state['error_timer']
+    return True
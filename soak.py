@@ -0,0 +1,285 @@
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import pygame
+
+DEFAULT_GAMES = 2000
+DEFAULT_WARMUP = 100
+DEFAULT_INTERVAL = 250
+DEFAULT_THRESHOLD_KIB = 1024
+FRAME_MS = 16
+TRACE_FRAMES = 1
+IDLE_FRAMES = 10
+TOP_SITES = 10
+# Games between scripted hot reloads; 0 turns them off.
+DEFAULT_RELOAD_EVERY = 50
+# Live instances worth naming in the report even when they don't grow; a
+# restart that keeps the old game or dataset alive shows up here first.
+WATCHED = ('CountryDatabase', 'GeodleGame', 'CountryData', 'AliasIndex', 'GeoMatrix', 'UI', 'Layout')
+
+
+def rss_kib():
+    # Resident set size from /proc; None where that isn't available.
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+def object_counts():
+    # tracemalloc's own snapshots are left out of the comparison.
+    return Counter(type(o).__name__ for o in gc.get_objects() if type(o).__module__ != 'tracemalloc')
+
+
+class ScriptedReloads:
+    # Stands in for the dataset watcher. Odd reloads drop the current target
+    # from country.json, which the game in progress can't take, so it has
+    # to be picked up by the restart that follows; even ones put the full
+    # file back, which the game takes on the spot.
+    def __init__(self, source):
+        with open(source, encoding='utf-8') as f:
+            self.rows = json.load(f)
+        self.source = source
+        self.dir = tempfile.mkdtemp(prefix='geodle-soak-')
+        self.count = 0
+        self._pending = None
+
+    def reload(self, target):
+        from gameplay import CountryDatabase
+        self.count += 1
+        if self.count % 2:
+            path = os.path.join(self.dir, 'country.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump([row for row in self.rows if row.get('country') != target], f)
+        else:
+            path = self.source
+        self._pending = CountryDatabase(path)
+        return self._pending
+
+    def poll(self):
+        database, self._pending = self._pending, None
+        return database
+
+    def close(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+class Player:
+    # Plays scripted games through a GameSession the way a person would:
+    # types each guess, picks the suggestion with RETURN, moves and scrolls
+    # the mouse over the board, and restarts with SPACE or the button in
+    # turn, so both restart paths are exercised.
+    def __init__(self, session, seed=0, reload_every=0):
+        self.session = session
+        self.rng = random.Random(seed)
+        self.now = 0
+        self.games = 0
+        self.reload_every = reload_every
+        self.reloads = None
+        if reload_every:
+            self.reloads = session.watcher = ScriptedReloads(session.game.database.path)
+        session.ui.now_ms = lambda: self.now
+
+    def frame(self, events=()):
+        self.now += FRAME_MS
+        self.session.step(list(events))
+
+    def _mouse(self):
+        w, h = self.session.ui.screen.get_size()
+        pos = (self.rng.randrange(w), self.rng.randrange(h))
+        events = [pygame.event.Event(pygame.MOUSEMOTION, pos=pos, rel=(0, 0), buttons=(0, 0, 0))]
+        if self.rng.random() < 0.3:
+            events.append(pygame.event.Event(pygame.MOUSEWHEEL, x=0, y=self.rng.choice((-1, 1)), flipped=False))
+        return events
+
+    def _type(self, name):
+        return [pygame.event.Event(pygame.KEYDOWN, key=ord(ch.lower()) if ch.isascii() else 0, mod=0,
+                                   unicode=ch, scancode=0)
+                for ch in name]
+
+    def _key(self, key):
+        return pygame.event.Event(pygame.KEYDOWN, key=key, mod=0, unicode='', scancode=0)
+
+    def play(self):
+        game = self.session.game
+        names = list(game.database.countries)
+        target = game.correct_country.name
+        limit = game.max_guesses or 8
+        wrong = [n for n in self.rng.sample(names, min(len(names), limit + 1)) if n != target]
+        # About one game in five is lost; the rest end on the target.
+        count = self.rng.randint(1, limit) if self.rng.random() < 0.8 else limit + 1
+        guesses = wrong[:count - 1] + [target] if count <= limit else wrong[:limit]
+        reloaded = None
+        if self.reload_every and self.games % self.reload_every == self.reload_every - 1:
+            reloaded = self.reloads.reload(target)
+        for name in guesses:
+            self.frame(self._type(name))
+            self.frame([self._key(pygame.K_RETURN)])
+            for _ in range(self.rng.randint(1, 3)):
+                self.frame(self._mouse())
+            if self.session.game.game_over:
+                break
+        # Let the end-of-game modal and any confetti run for a moment.
+        for _ in range(IDLE_FRAMES):
+            self.frame()
+        self.restart()
+        self.games += 1
+        if reloaded is not None and self.session.game.database is not reloaded:
+            raise RuntimeError("the game after a hot reload did not start on the reloaded dataset")
+
+    def restart(self):
+        if self.games % 2:
+            button = self.session.ui._ensure_layout().rect('restart')
+            down = pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=button.center, button=1)
+            up = pygame.event.Event(pygame.MOUSEBUTTONUP, pos=button.center, button=1)
+            self.frame([down, up])
+        else:
+            self.frame([self._key(pygame.K_SPACE)])
+        if self.session.game.game_over or self.session.game.guesses:
+            raise RuntimeError("restart did not start a new game")
+
+
+def top_sites(snapshot, baseline, limit=TOP_SITES):
+    # The soak harness and tracemalloc itself are left out.
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    stats = snapshot.filter_traces(ignore).compare_to(baseline.filter_traces(ignore), 'lineno')
+    return [s for s in stats if s.size_diff > 0][:limit]
+
+
+def soak(games=DEFAULT_GAMES, warmup=DEFAULT_WARMUP, interval=DEFAULT_INTERVAL,
+         threshold_kib=DEFAULT_THRESHOLD_KIB, seed=0, practice=False, trace_frames=TRACE_FRAMES, log=None,
+         reload_every=DEFAULT_RELOAD_EVERY):
+    # Plays warmup games, takes a baseline, plays `games` more and returns a
+    # report dict. 'failed' is set when traced memory still held after a
+    # full collection grew by more than threshold_kib over the baseline.
+    # Every reload_every games the dataset is hot-reloaded mid-game.
+    from gameplay import WINDOW_HEIGHT, WINDOW_WIDTH, GameSession
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.init()
+    random.seed(seed)
+    screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.RESIZABLE)
+    # The game prints as it goes; that is swallowed, but progress still
+    # goes to the real stdout.
+    real_stdout = sys.stdout
+    log = log or (lambda message: print(message, file=real_stdout, flush=True))
+    out = io.StringIO()
+    tracemalloc.start(trace_frames)
+    start = time.perf_counter()
+    samples = []
+    with contextlib.redirect_stdout(out):
+        session = GameSession(screen, practice=practice)
+        player = Player(session, seed, reload_every)
+
+        def sample():
+            out.seek(0)
+            out.truncate()
+            gc.collect()
+            traced = tracemalloc.get_traced_memory()[0]
+            samples.append({'games': player.games - warmup, 'traced_kib': traced // 1024, 'rss_kib': rss_kib()})
+            return traced
+
+        for _ in range(warmup):
+            player.play()
+        base_traced = sample()
+        base_snapshot = tracemalloc.take_snapshot()
+        base_counts = object_counts()
+        log(f"Baseline after {warmup} games: {base_traced // 1024} KiB traced")
+        for _ in range(games):
+            player.play()
+            if (player.games - warmup) % interval == 0:
+                sample()
+                log(f"  {samples[-1]['games']:6d} games  {samples[-1]['traced_kib']:8d} KiB traced"
+                    + (f"  {samples[-1]['rss_kib']:8d} KiB rss" if samples[-1]['rss_kib'] is not None else ''))
+        final_traced = sample()
+        snapshot = tracemalloc.take_snapshot()
+        counts = object_counts()
+    tracemalloc.stop()
+    if player.reloads is not None:
+        player.reloads.close()
+    elapsed = time.perf_counter() - start
+    pygame.quit()
+
+    growth = (final_traced - base_traced) / 1024.0
+    grown = sorted(((name, counts[name] - base_counts.get(name, 0)) for name in counts),
+                   key=lambda item: -item[1])
+    return {
+        'games': games,
+        'frames': session.frame,
+        'reloads': player.reloads.count if player.reloads is not None else 0,
+        'elapsed_s': elapsed,
+        'samples': samples,
+        'growth_kib': growth,
+        'per_1000_kib': growth * 1000.0 / games if games else 0.0,
+        'threshold_kib': threshold_kib,
+        'failed': growth > threshold_kib,
+        'sites': top_sites(snapshot, base_snapshot),
+        'types': [(name, delta) for name, delta in grown[:TOP_SITES] if delta > 0],
+        'watched': {name: (base_counts.get(name, 0), counts.get(name, 0)) for name in WATCHED},
+    }
+
+
+def print_report(result, file=None):
+    file = file or sys.stdout
+    rate = result['games'] / result['elapsed_s'] if result['elapsed_s'] > 0 else 0.0
+    print(f"Played {result['games']} games ({result['frames']} frames, {result['reloads']} reloads) "
+          f"in {result['elapsed_s']:.1f}s, {rate:.1f} games/s", file=file)
+    first, last = result['samples'][0], result['samples'][-1]
+    if first['rss_kib'] is not None:
+        print(f"RSS {first['rss_kib']} KiB -> {last['rss_kib']} KiB", file=file)
+    print(f"Retained growth {result['growth_kib']:+.1f} KiB ({result['per_1000_kib']:+.1f} KiB per 1000 games), "
+          f"threshold {result['threshold_kib']} KiB", file=file)
+    print("Live instances (baseline -> end):", file=file)
+    for name, (before, after) in result['watched'].items():
+        print(f"  {name:<16} {before:6d} -> {after:6d}", file=file)
+    if result['types']:
+        print("Growing object types:", file=file)
+        for name, delta in result['types']:
+            print(f"  {name:<24} {delta:+8d}", file=file)
+    if result['sites']:
+        print("Top growing allocation sites:", file=file)
+        for stat in result['sites']:
+            frame = stat.traceback[0]
+            print(f"  {stat.size_diff / 1024:+9.1f} KiB {stat.count_diff:+7d} blocks  "
+                  f"{frame.filename}:{frame.lineno}", file=file)
+    print("FAIL: retained memory grew past the threshold" if result['failed'] else "OK", file=file)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play scripted games headlessly and watch for memory growth")
+    parser.add_argument('--games', type=int, default=DEFAULT_GAMES, help="games to play after the warmup")
+    parser.add_argument('--warmup', type=int, default=DEFAULT_WARMUP,
+                        help="games played before the baseline, so caches are full")
+    parser.add_argument('--interval', type=int, default=DEFAULT_INTERVAL, help="games between snapshots")
+    parser.add_argument('--threshold', type=int, default=DEFAULT_THRESHOLD_KIB, metavar='KIB',
+                        help="allowed growth of retained memory over the baseline")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--practice', action='store_true', help="play practice games")
+    parser.add_argument('--trace-frames', type=int, default=TRACE_FRAMES, metavar='N',
+                        help="stack depth kept per allocation; deeper is slower")
+    parser.add_argument('--reload-every', type=int, default=DEFAULT_RELOAD_EVERY, metavar='GAMES',
+                        help="hot-reload the dataset mid-game this often (0: never)")
+    args = parser.parse_args(argv)
+    result = soak(args.games, args.warmup, max(1, args.interval), args.threshold, args.seed, args.practice,
+                  max(1, args.trace_frames), reload_every=max(0, args.reload_every))
+    print_report(result)
+    return 1 if result['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
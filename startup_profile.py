@@ -0,0 +1,124 @@
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+
+class StartupProfiler:
+    def __init__(self):
+        self.phases = []
+        self._depth = 0
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def wrap(self, owner, attr, name):
+        # Times every call of owner.attr as phase ``name``; returns an undo.
+        original = getattr(owner, attr)
+        profiler = self
+
+        def timed(*args, **kwargs):
+            with profiler.phase(name):
+                return original(*args, **kwargs)
+
+        setattr(owner, attr, timed)
+        return lambda: setattr(owner, attr, original)
+
+    def report(self):
+        return {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'pygame': getattr(sys.modules.get('pygame'), 'ver', None),
+            'phases': self.phases,
+            'total_ms': round(sum(p['wall_ms'] for p in self.phases if p['depth'] == 0), 3),
+            'peak_kib': max((p['peak_kib'] for p in self.phases), default=0.0),
+        }
+
+    def format_text(self):
+        report = self.report()
+        lines = [f"{'phase':<28} {'wall ms':>10} {'peak KiB':>10} {'alloc KiB':>10}"]
+        for p in report['phases']:
+            label = '  ' * p['depth'] + p['name']
+            lines.append(f"{label:<28} {p['wall_ms']:>10.2f} {p['peak_kib']:>10.1f} {p['alloc_kib']:>10.1f}")
+        lines.append(f"{'total':<28} {report['total_ms']:>10.2f} {report['peak_kib']:>10.1f}")
+        return "\n".join(lines)
+
+
+class _Phase:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        # Nested phases would reset the enclosing phase's peak, so only
+        # top-level phases reset it; nested ones report the running peak.
+        self.depth = self.profiler._depth
+        self.profiler._depth += 1
+        self.entry = {'name': self.name, 'depth': self.depth}
+        self.profiler.phases.append(self.entry)
+        if self.depth == 0:
+            tracemalloc.reset_peak()
+        self.mem0 = tracemalloc.get_traced_memory()[0]
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.t0
+        current, peak = tracemalloc.get_traced_memory()
+        self.profiler._depth -= 1
+        self.entry.update({
+            'wall_ms': round(wall * 1000.0, 3),
+            'peak_kib': round(peak / 1024.0, 1),
+            'alloc_kib': round((current - self.mem0) / 1024.0, 1),
+        })
+        return False
+
+
+def profile_startup(practice=False, fmt='text', out=None):
+    tracemalloc.start()
+    prof = StartupProfiler()
+    try:
+        with prof.phase('import pygame'):
+            import pygame
+        with prof.phase('import gameplay'):
+            import gameplay
+
+        with prof.phase('pygame.init'):
+            pygame.init()
+        with prof.phase('display.set_mode'):
+            screen = gameplay.create_window()
+
+        undo = [
+            prof.wrap(gameplay.CountryDatabase, 'build_indexes', 'build_indexes'),
+            prof.wrap(gameplay.UI, '_init_fonts', '_init_fonts'),
+            prof.wrap(gameplay.UI, '_load_logo', 'logo decode'),
+        ]
+        try:
+            with prof.phase('CountryDatabase load'):
+                game = gameplay.enhance(practice=practice)
+            with prof.phase('UI init'):
+                ui = gameplay.UI(screen, game)
+        finally:
+            for u in undo:
+                u()
+
+        with prof.phase('first display.flip'):
+            pygame.event.pump()
+            game.update()
+            ui.render()
+            pygame.display.flip()
+    finally:
+        tracemalloc.stop()
+        try:
+            pygame.quit()
+        except Exception:
+            pass
+
+    text = json.dumps(prof.report(), indent=2) if fmt == 'json' else prof.format_text()
+    if out:
+        with open(out, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return prof
@@ -0,0 +1,171 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.geodle', 'stats.sqlite3')
+MAX_BATCH = 64
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    finished_at REAL NOT NULL,
+    target TEXT NOT NULL,
+    guesses INTEGER NOT NULL,
+    won INTEGER NOT NULL,
+    duration_ms INTEGER NOT NULL,
+    practice INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS aggregates (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# Aggregates cover normal games only; practice games are kept in the history
+# but have no guess limit, so they would skew streaks and the distribution.
+AGGREGATE_KEYS = ('played', 'wins', 'streak', 'max_streak')
+
+
+class PlayerStats:
+    # Running totals, updated in O(1) per game. The same values are persisted
+    # in the aggregates table, so startup never scans the history.
+    def __init__(self, max_guesses=6):
+        self.max_guesses = max_guesses
+        self.played = 0
+        self.wins = 0
+        self.streak = 0
+        self.max_streak = 0
+        self.distribution = [0] * max_guesses
+        self.last_guesses = None
+
+    def add(self, guesses, won):
+        self.played += 1
+        if won:
+            self.wins += 1
+            self.streak += 1
+            self.max_streak = max(self.max_streak, self.streak)
+            if 1 <= guesses <= self.max_guesses:
+                self.distribution[guesses - 1] += 1
+            self.last_guesses = guesses
+        else:
+            self.streak = 0
+            self.last_guesses = None
+
+    def win_rate(self) -> float:
+        return self.wins / float(self.played) if self.played else 0.0
+
+    def items(self):
+        for key in AGGREGATE_KEYS:
+            yield key, getattr(self, key)
+        for i, n in enumerate(self.distribution):
+            yield f'dist_{i + 1}', n
+
+    def load(self, rows):
+        values = dict(rows)
+        for key in AGGREGATE_KEYS:
+            setattr(self, key, int(values.get(key, 0)))
+        self.distribution = [int(values.get(f'dist_{i + 1}', 0)) for i in range(self.max_guesses)]
+
+
+class StatsStore:
+    def __init__(self, path=None, max_guesses=6):
+        self.path = path or DEFAULT_PATH
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.summary = PlayerStats(max_guesses)
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+            rows = conn.execute("SELECT key, value FROM aggregates").fetchall()
+            if rows:
+                self.summary.load(rows)
+            else:
+                self._rebuild(conn)
+        finally:
+            conn.close()
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._run, name='geodle-stats', daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        # WAL lets the writer commit without blocking readers, and with
+        # synchronous=NORMAL a commit is an append to the log, not an fsync.
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _rebuild(self, conn):
+        # Only reached for a fresh database or one whose aggregates were lost.
+        cur = conn.execute("SELECT guesses, won FROM games WHERE practice = 0 ORDER BY id")
+        for guesses, won in cur:
+            self.summary.add(guesses, bool(won))
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO aggregates (key, value) VALUES (?, ?)",
+                             list(self.summary.items()))
+
+    def record_game(self, target, guesses, won, duration_ms, practice=False):
+        # Called from the render loop: update the totals in memory and hand
+        # the row to the writer thread. No disk I/O happens here.
+        if not practice:
+            self.summary.add(guesses, won)
+        row = (time.time(), target, guesses, 1 if won else 0, int(duration_ms), 1 if practice else 0)
+        self._queue.put((row, None if practice else list(self.summary.items())))
+
+    def _run(self):
+        conn = self._connect()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                batch = [item]
+                stop = False
+                while len(batch) < MAX_BATCH:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        stop = True
+                        break
+                    batch.append(item)
+                self._write(conn, batch)
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    def _write(self, conn, batch):
+        # Each snapshot is the full set of totals after its game, so only the
+        # newest one in the batch needs to be stored.
+        aggregates = None
+        for _, snapshot in batch:
+            if snapshot is not None:
+                aggregates = snapshot
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO games (finished_at, target, guesses, won, duration_ms, practice) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", [row for row, _ in batch])
+                if aggregates:
+                    conn.executemany("INSERT OR REPLACE INTO aggregates (key, value) VALUES (?, ?)",
+                                     aggregates)
+        except sqlite3.Error as e:
+            print(f"Failed to save stats: {e}")
+
+    def history(self, limit=None):
+        conn = self._connect()
+        try:
+            sql = "SELECT finished_at, target, guesses, won, duration_ms, practice FROM games ORDER BY id DESC"
+            if limit:
+                sql += f" LIMIT {int(limit)}"
+            return conn.execute(sql).fetchall()
+        finally:
+            conn.close()
+
+    def close(self, timeout=5.0):
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout)
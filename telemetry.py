@@ -0,0 +1,125 @@
+import json
+import os
+import threading
+import time
+
+DEFAULT_CAPACITY = 8192
+FLUSH_INTERVAL = 1.0
+MAX_FILE_BYTES = 4 << 20
+BACKUPS = 5
+
+
+class _NullTelemetry:
+    enabled = False
+
+    def emit(self, kind, **fields):
+        pass
+
+    def close(self):
+        pass
+
+
+class Telemetry:
+    # Single-producer ring buffer: only the game loop calls emit(), which is a
+    # slot store and a counter bump with no lock. The flusher thread copies
+    # everything between its tail and the producer's head, and counts events
+    # that were overwritten before it got to them as dropped.
+    enabled = True
+
+    def __init__(self, directory, capacity=DEFAULT_CAPACITY, interval=FLUSH_INTERVAL,
+                 max_bytes=MAX_FILE_BYTES, backups=BACKUPS):
+        if capacity & (capacity - 1):
+            raise ValueError("capacity must be a power of two")
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, 'telemetry.jsonl')
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.interval = interval
+        self.dropped = 0
+        self._buf = [None] * capacity
+        self._mask = capacity - 1
+        self._head = 0
+        self._tail = 0
+        self._stop = threading.Event()
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._thread = threading.Thread(target=self._run, name='geodle-telemetry', daemon=True)
+        self._thread.start()
+
+    def emit(self, kind, **fields):
+        i = self._head
+        self._buf[i & self._mask] = (time.time(), kind, fields)
+        self._head = i + 1
+
+    def _drain(self):
+        head = self._head
+        tail = self._tail
+        capacity = self._mask + 1
+        if head - tail > capacity:
+            self.dropped += head - tail - capacity
+            tail = head - capacity
+        batch = [self._buf[i & self._mask] for i in range(tail, head)]
+        # Anything the producer lapped while we were copying may be torn.
+        lapped = self._head - capacity - tail
+        if lapped > 0:
+            self.dropped += lapped
+            batch = batch[lapped:]
+        self._tail = head
+        return batch
+
+    def _write(self, batch):
+        if not batch:
+            return
+        lines = []
+        for ts, kind, fields in batch:
+            record = {'ts': round(ts, 6), 'event': kind}
+            record.update(fields)
+            lines.append(json.dumps(record, separators=(',', ':'), default=str))
+        self._file.write("\n".join(lines) + "\n")
+        self._file.flush()
+        if self._file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+        self._file = open(self.path, 'a', encoding='utf-8')
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._flush()
+
+    def _flush(self):
+        try:
+            self._write(self._drain())
+        except (OSError, ValueError) as e:
+            print(f"Telemetry flush failed: {e}")
+
+    def close(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._thread.join()
+        if self.dropped:
+            self.emit('dropped', count=self.dropped)
+        self._flush()
+        self._file.close()
+
+
+# Instrumented code calls sink.emit(); it stays a no-op until install().
+sink = _NullTelemetry()
+
+
+def install(telemetry):
+    global sink
+    sink = telemetry
+    return telemetry
+
+
+def uninstall():
+    global sink
+    previous, sink = sink, _NullTelemetry()
+    previous.close()